@@ -24,23 +24,110 @@ ENABLE_MONITOR_MODE = os.getenv('ENABLE_MONITOR_MODE', 'false').lower() == 'true
 # Scanning Configuration
 SCAN_INTERVAL = int(os.getenv('SCAN_INTERVAL', '60'))  # seconds
 DEEP_SCAN_INTERVAL = int(os.getenv('DEEP_SCAN_INTERVAL', '300'))  # seconds
+DEEP_SCAN_REUSE_AGE = int(os.getenv('DEEP_SCAN_REUSE_AGE', '30'))  # seconds a regular scan's results stand in for the deep scan's
+SCAN_ADAPTIVE_ENABLED = os.getenv('SCAN_ADAPTIVE_ENABLED', 'true').lower() == 'true'  # adjust SCAN_INTERVAL to RF churn
+SCAN_INTERVAL_MIN = int(os.getenv('SCAN_INTERVAL_MIN', '15'))  # seconds
+SCAN_INTERVAL_MAX = int(os.getenv('SCAN_INTERVAL_MAX', '240'))  # seconds; below the server's 5 min active window
+SCAN_INTERVAL_BACKOFF = float(os.getenv('SCAN_INTERVAL_BACKOFF', '1.5'))  # multiplier after a quiet scan
+SCAN_CHURN_HIGH = float(os.getenv('SCAN_CHURN_HIGH', '0.10'))  # share of BSSIDs new or lost
+SCAN_CHURN_LOW = float(os.getenv('SCAN_CHURN_LOW', '0.02'))
+SCAN_RSSI_CHANGE_HIGH = float(os.getenv('SCAN_RSSI_CHANGE_HIGH', '6'))  # dB RMS between scans
+SCAN_RSSI_CHANGE_LOW = float(os.getenv('SCAN_RSSI_CHANGE_LOW', '2'))
 MAX_SCAN_RETRIES = int(os.getenv('MAX_SCAN_RETRIES', '3'))
+SCAN_BACKEND = os.getenv('SCAN_BACKEND', 'auto')  # auto, nl80211 or iwlist
+SCAN_INTERFACES = os.getenv('SCAN_INTERFACES', '')  # extra radios scanned alongside MONITOR_INTERFACE, comma-separated
+SCAN_INTERFACE_CHANNELS = os.getenv('SCAN_INTERFACE_CHANNELS', '')  # e.g. wlan0=2.4GHz;wlan1=5GHz or wlan1=36,40,44,48
+SCAN_TIMEOUT = int(os.getenv('SCAN_TIMEOUT', '10'))  # seconds
+NL80211_FIXTURE_PATH = os.getenv('NL80211_FIXTURE_PATH', '')  # replay recorded netlink messages
+NL80211_RECORD_PATH = os.getenv('NL80211_RECORD_PATH', '')  # record netlink messages for replay
+SCAN_CACHE_ENABLED = os.getenv('SCAN_CACHE_ENABLED', 'false').lower() == 'true'  # read cached BSS table between active scans
+ACTIVE_SCAN_EVERY = int(os.getenv('ACTIVE_SCAN_EVERY', '5'))  # scan ticks
+SCAN_CACHE_MAX_AGE = int(os.getenv('SCAN_CACHE_MAX_AGE', '300'))  # seconds
+
+# Network Upload Configuration
+NETWORK_DELTA_ENABLED = os.getenv('NETWORK_DELTA_ENABLED', 'true').lower() == 'true'
+NETWORK_RSSI_DEADBAND = int(os.getenv('NETWORK_RSSI_DEADBAND', '3'))  # dBm
+NETWORK_QUALITY_DEADBAND = int(os.getenv('NETWORK_QUALITY_DEADBAND', '5'))  # percentage points
+NETWORK_KEYFRAME_INTERVAL = int(os.getenv('NETWORK_KEYFRAME_INTERVAL', '240'))  # seconds; keep under the server's 5 min active window
+
+# On-device BSSID History
+BSSID_HISTORY_SIZE = int(os.getenv('BSSID_HISTORY_SIZE', '120'))  # samples per BSSID
+BSSID_HISTORY_MAX_ENTRIES = int(os.getenv('BSSID_HISTORY_MAX_ENTRIES', '4096'))  # BSSIDs
 
 # Data Collection Configuration
 COLLECT_CONNECTED_DEVICES = os.getenv('COLLECT_CONNECTED_DEVICES', 'true').lower() == 'true'
 COLLECT_SIGNAL_STRENGTH = os.getenv('COLLECT_SIGNAL_STRENGTH', 'true').lower() == 'true'
 COLLECT_CHANNEL_INFO = os.getenv('COLLECT_CHANNEL_INFO', 'true').lower() == 'true'
 COLLECT_ENCRYPTION_INFO = os.getenv('COLLECT_ENCRYPTION_INFO', 'true').lower() == 'true'
+TRAFFIC_SAMPLE_INTERVAL = float(os.getenv('TRAFFIC_SAMPLE_INTERVAL', '1'))  # seconds between counter samples
+TRAFFIC_RING_SIZE = int(os.getenv('TRAFFIC_RING_SIZE', '600'))  # samples kept per interface
+LINK_STATE_TTL = float(os.getenv('LINK_STATE_TTL', '15'))  # seconds a link-state snapshot is reused
+LINK_EVENTS_ENABLED = os.getenv('LINK_EVENTS_ENABLED', 'true').lower() == 'true'  # nl80211/rtnetlink connection events
+CONNECTION_POLL_INTERVAL = int(os.getenv('CONNECTION_POLL_INTERVAL', '30'))  # seconds, without link events
+CONNECTION_SAFETY_POLL_INTERVAL = int(os.getenv('CONNECTION_SAFETY_POLL_INTERVAL', '120'))  # seconds, with link events
+ROAM_TRACKING_ENABLED = os.getenv('ROAM_TRACKING_ENABLED', 'true').lower() == 'true'
+ROAM_MAX_GAP = float(os.getenv('ROAM_MAX_GAP', '10'))  # seconds between leaving one BSSID and joining the next
+ROAM_RSSI_SAMPLE_INTERVAL = float(os.getenv('ROAM_RSSI_SAMPLE_INTERVAL', '1'))  # seconds between signal samples
+ROAM_BATCH_SIZE = int(os.getenv('ROAM_BATCH_SIZE', '100'))  # transitions per metrics upload
+ROAM_MAX_PAIRS = int(os.getenv('ROAM_MAX_PAIRS', '256'))  # AP pairs with histograms kept in memory
+
+# Device Discovery
+ARP_SWEEP_ENABLED = os.getenv('ARP_SWEEP_ENABLED', 'true').lower() == 'true'
+ARP_SWEEP_DURATION = float(os.getenv('ARP_SWEEP_DURATION', '10'))  # target seconds per sweep
+ARP_SWEEP_MAX_RATE = int(os.getenv('ARP_SWEEP_MAX_RATE', '100'))  # requests per second
+ARP_SWEEP_MAX_HOSTS = int(os.getenv('ARP_SWEEP_MAX_HOSTS', '1024'))  # addresses per sweep
+ARP_REPLY_WAIT = float(os.getenv('ARP_REPLY_WAIT', '1'))  # seconds to wait for late replies
+ARP_FIXTURE_PATH = os.getenv('ARP_FIXTURE_PATH', '')  # replay captured ARP frames
+ARP_RECORD_PATH = os.getenv('ARP_RECORD_PATH', '')  # record ARP frames for replay
+DEVICE_SEEN_WINDOW = int(os.getenv('DEVICE_SEEN_WINDOW', '300'))  # seconds a device counts as present
+DEVICE_DELTA_ENABLED = os.getenv('DEVICE_DELTA_ENABLED', 'true').lower() == 'true'
+HOSTNAME_RESOLUTION_ENABLED = os.getenv('HOSTNAME_RESOLUTION_ENABLED', 'true').lower() == 'true'
+HOSTNAME_TIMEOUT = float(os.getenv('HOSTNAME_TIMEOUT', '1.5'))  # seconds per rDNS/mDNS/NetBIOS query
+HOSTNAME_CACHE_TTL = int(os.getenv('HOSTNAME_CACHE_TTL', '3600'))  # seconds a resolved name is reused
+HOSTNAME_NEGATIVE_TTL = int(os.getenv('HOSTNAME_NEGATIVE_TTL', '600'))  # seconds before retrying a device with no name
+HOSTNAME_CACHE_SIZE = int(os.getenv('HOSTNAME_CACHE_SIZE', '1024'))  # devices
+HOSTNAME_MAX_CONCURRENT = int(os.getenv('HOSTNAME_MAX_CONCURRENT', '16'))  # lookups in flight
+OUI_DB_PATH = os.getenv('OUI_DB_PATH', '/var/lib/pi-monitor/oui.bin')  # compiled by scripts/install.sh
+DEVICE_ROSTER_INTERVAL = int(os.getenv('DEVICE_ROSTER_INTERVAL', '240'))  # seconds; keep under the server's 5 min offline cutoff
+DEVICE_FORGET_AFTER = int(os.getenv('DEVICE_FORGET_AFTER', '86400'))  # seconds offline before a device is dropped from memory
+DEVICE_TABLE_MAX = int(os.getenv('DEVICE_TABLE_MAX', '2048'))  # devices kept in memory, online ones always included
 
 # Performance Monitoring
 PING_TEST_ENABLED = os.getenv('PING_TEST_ENABLED', 'true').lower() == 'true'
 PING_TEST_HOST = os.getenv('PING_TEST_HOST', '8.8.8.8')
+PING_INTERVAL = float(os.getenv('PING_INTERVAL', '0.2'))  # seconds between echo requests to one host
+DNS_TEST_ENABLED = os.getenv('DNS_TEST_ENABLED', 'true').lower() == 'true'
+DNS_RESOLVERS = [r.strip() for r in os.getenv('DNS_RESOLVERS', '8.8.8.8,1.1.1.1').split(',') if r.strip()]
+DNS_TEST_NAMES = [n.strip() for n in os.getenv('DNS_TEST_NAMES', 'google.com').split(',') if n.strip()]
+DNS_TIMEOUT = float(os.getenv('DNS_TIMEOUT', '2'))  # seconds per query
+DNS_HISTORY_SIZE = int(os.getenv('DNS_HISTORY_SIZE', '100'))  # queries kept per resolver for percentiles
 BANDWIDTH_TEST_ENABLED = os.getenv('BANDWIDTH_TEST_ENABLED', 'false').lower() == 'true'
 
+# Throughput Tests (SSID reports)
+THROUGHPUT_TEST_ENABLED = os.getenv('THROUGHPUT_TEST_ENABLED', 'true').lower() == 'true'
+THROUGHPUT_TEST_METHOD = os.getenv('THROUGHPUT_TEST_METHOD', 'auto')  # auto, http, iperf3 or speedtest
+THROUGHPUT_TEST_INTERVAL = int(os.getenv('THROUGHPUT_TEST_INTERVAL', '3600'))  # seconds
+THROUGHPUT_DAILY_BUDGET_MB = int(os.getenv('THROUGHPUT_DAILY_BUDGET_MB', '500'))
+THROUGHPUT_TEST_BYTES = int(os.getenv('THROUGHPUT_TEST_BYTES', str(10 * 1024 * 1024)))  # per direction
+THROUGHPUT_TEST_URL = os.getenv('THROUGHPUT_TEST_URL', '')  # e.g. http://192.168.1.10:8080/10MB.bin
+THROUGHPUT_UPLOAD_URL = os.getenv('THROUGHPUT_UPLOAD_URL', '')  # optional HTTP endpoint accepting POSTs
+THROUGHPUT_IPERF_SERVER = os.getenv('THROUGHPUT_IPERF_SERVER', '')  # host[:port] of an iperf3 server
+
 # Data Storage
 LOCAL_STORAGE_ENABLED = os.getenv('LOCAL_STORAGE_ENABLED', 'true').lower() == 'true'
 LOCAL_STORAGE_PATH = os.getenv('LOCAL_STORAGE_PATH', '/var/lib/pi-monitor/data')
 MAX_LOCAL_STORAGE_DAYS = int(os.getenv('MAX_LOCAL_STORAGE_DAYS', '7'))
+LOCAL_STORAGE_MAX_MB = float(os.getenv('LOCAL_STORAGE_MAX_MB', '100'))  # cap on queued uploads
+UPLOAD_QUEUE_WORKERS = int(os.getenv('UPLOAD_QUEUE_WORKERS', '2'))  # endpoints drained at once
+UPLOAD_RETRY_MAX = int(os.getenv('UPLOAD_RETRY_MAX', '300'))  # seconds between attempts while the server is unreachable
+
+# Job Scheduling
+SCHEDULER_MAX_WORKERS = int(os.getenv('SCHEDULER_MAX_WORKERS', '8'))  # threads for blocking jobs
+SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', '10'))  # seconds of random offset on each job's first run
+SCHEDULER_OVERRUN_POLICIES = os.getenv('SCHEDULER_OVERRUN_POLICIES', '')  # e.g. collect_metrics=queue;run_network_scan=skip
+SCHEDULER_MAX_QUEUE = int(os.getenv('SCHEDULER_MAX_QUEUE', '10'))  # ticks held per job under the queue policy
+SCHEDULER_STATS_PATH = os.getenv('SCHEDULER_STATS_PATH', '/run/pi-monitor/jobs.json')  # tmpfs, spares the SD card
+SCHEDULER_STATS_INTERVAL = int(os.getenv('SCHEDULER_STATS_INTERVAL', '300'))  # seconds between writes of the stats file
 
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
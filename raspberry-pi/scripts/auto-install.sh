@@ -236,6 +236,23 @@ step7_create_directories() {
     sudo chown -R $PI_USER:$PI_USER "$INSTALL_DIR"
     
     print_success "Directories created with proper permissions"
+    
+    # Compile the IEEE OUI registry used for vendor names
+    cd "$INSTALL_DIR/raspberry-pi"
+    OUI_TMP=$(mktemp -d)
+    if curl -fsSL -o "$OUI_TMP/oui.csv" https://standards-oui.ieee.org/oui/oui.csv \
+        && curl -fsSL -o "$OUI_TMP/mam.csv" https://standards-oui.ieee.org/oui28/mam.csv \
+        && curl -fsSL -o "$OUI_TMP/oui36.csv" https://standards-oui.ieee.org/oui36/oui36.csv; then
+        venv/bin/python -m src.oui build -o /var/lib/pi-monitor/oui.bin \
+            "$OUI_TMP/oui.csv" "$OUI_TMP/mam.csv" "$OUI_TMP/oui36.csv"
+        print_success "OUI vendor database built"
+    elif [ -f /usr/share/arp-scan/ieee-oui.txt ]; then
+        venv/bin/python -m src.oui build -o /var/lib/pi-monitor/oui.bin /usr/share/arp-scan/ieee-oui.txt
+        print_success "OUI vendor database built from arp-scan's registry"
+    else
+        print_warning "Could not download the IEEE registry - vendor names will be Unknown"
+    fi
+    rm -rf "$OUI_TMP"
 }
 
 step8_create_configuration() {
@@ -300,6 +317,8 @@ Environment="PATH=$INSTALL_DIR/raspberry-pi/venv/bin:/usr/local/sbin:/usr/local/
 ExecStart=$INSTALL_DIR/raspberry-pi/venv/bin/python $INSTALL_DIR/raspberry-pi/src/main.py
 Restart=always
 RestartSec=10
+# /run/pi-monitor (tmpfs) for the job timings file
+RuntimeDirectory=pi-monitor
 
 # Logging
 StandardOutput=journal
@@ -31,6 +31,7 @@ sudo apt-get install -y \
     wireless-tools \
     net-tools \
     arp-scan \
+    curl \
     git
 
 # Create virtual environment
@@ -55,6 +56,21 @@ sudo mkdir -p /var/lib/pi-monitor/data
 sudo chown -R pi:pi /var/log/pi-monitor
 sudo chown -R pi:pi /var/lib/pi-monitor
 
+# Compile the IEEE OUI registry used for vendor names
+echo "Building OUI vendor database..."
+OUI_TMP=$(mktemp -d)
+if curl -fsSL -o "$OUI_TMP/oui.csv" https://standards-oui.ieee.org/oui/oui.csv \
+    && curl -fsSL -o "$OUI_TMP/mam.csv" https://standards-oui.ieee.org/oui28/mam.csv \
+    && curl -fsSL -o "$OUI_TMP/oui36.csv" https://standards-oui.ieee.org/oui36/oui36.csv; then
+    python -m src.oui build -o /var/lib/pi-monitor/oui.bin \
+        "$OUI_TMP/oui.csv" "$OUI_TMP/mam.csv" "$OUI_TMP/oui36.csv"
+elif [ -f /usr/share/arp-scan/ieee-oui.txt ]; then
+    python -m src.oui build -o /var/lib/pi-monitor/oui.bin /usr/share/arp-scan/ieee-oui.txt
+else
+    echo "Warning: could not download the IEEE registry; vendor names will be Unknown"
+fi
+rm -rf "$OUI_TMP"
+
 # Copy environment file
 if [ ! -f .env ]; then
     echo "Creating .env file..."
@@ -6,6 +6,7 @@ import os
 import sys
 import json
 import time
+import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import requests
@@ -17,6 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import config
 from src.utils.logger import get_logger
 from src.config_manager import ConfigManager
+from src.upload_queue import UploadQueue
 
 logger = get_logger('api_client')
 
@@ -34,6 +36,7 @@ class APIClient:
         }
         self.is_registered = False
         self.config_manager = ConfigManager()
+        self.outbox = self._create_outbox() if config.LOCAL_STORAGE_ENABLED else None
         logger.info(f"API Client initialized for server: {config.SERVER_URL}")
     
     def _create_session(self) -> requests.Session:
@@ -63,6 +66,14 @@ class APIClient:
         
         return session
     
+    def _create_outbox(self) -> Optional[UploadQueue]:
+        """Open the store-and-forward queue; without it uploads are sent directly"""
+        try:
+            return UploadQueue(self._deliver)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Upload queue unavailable, sending directly: {e}")
+            return None
+    
     def register_monitor(self) -> bool:
         """Register this monitor with the server"""
         try:
@@ -94,7 +105,7 @@ class APIClient:
             logger.exception(f"Error registering monitor: {e}")
             return False
     
-    def send_heartbeat(self) -> bool:
+    def send_heartbeat(self, jobs: Dict = None) -> bool:
         """Send heartbeat to server and check for configuration changes"""
         try:
             data = {
@@ -103,6 +114,10 @@ class APIClient:
                 'status': 'active',
                 'uptime': self._get_uptime()
             }
+            if jobs is not None:
+                data['jobs'] = jobs
+            if self.outbox:
+                data['upload_queue'] = self.outbox.stats()
             
             response = self._post('heartbeat', data)
             
@@ -120,8 +135,10 @@ class APIClient:
             logger.error(f"Error sending heartbeat: {e}")
             return False
     
-    def send_network_data(self, networks: List[Dict]) -> bool:
-        """Send network scan data to server"""
+    def send_network_data(self, networks: List[Dict], keyframe: bool = True,
+                          removed: List[str] = None, sequence: int = None,
+                          scan_interval: Dict = None) -> bool:
+        """Send network scan data to server, either a full keyframe or only changed networks"""
         if not networks:
             logger.debug("No networks to send")
             return True
@@ -130,13 +147,19 @@ class APIClient:
             data = {
                 'monitor_id': config.MONITOR_ID,
                 'timestamp': datetime.utcnow().isoformat(),
-                'networks': networks
+                'networks': networks,
+                'keyframe': keyframe,
+                'removed': removed or []
             }
+            if sequence is not None:
+                data['sequence'] = sequence
+            if scan_interval is not None:
+                data['scan_interval'] = scan_interval
             
-            response = self._post('networks', data)
+            response = self._send('networks', data)
             
             if response:
-                logger.info(f"Sent data for {len(networks)} networks")
+                logger.info(f"Sent {'keyframe' if keyframe else 'delta'} data for {len(networks)} networks")
                 return True
             return False
             
@@ -144,9 +167,10 @@ class APIClient:
             logger.error(f"Error sending network data: {e}")
             return False
     
-    def send_device_data(self, devices: List[Dict]) -> bool:
-        """Send connected device data to server"""
-        if not devices:
+    def send_device_data(self, devices: List[Dict], roster: bool = True,
+                         events: List[Dict] = None) -> bool:
+        """Send connected device data to server, either a full roster or only changed devices"""
+        if not devices and not events:
             logger.debug("No devices to send")
             return True
         
@@ -154,13 +178,16 @@ class APIClient:
             data = {
                 'monitor_id': config.MONITOR_ID,
                 'timestamp': datetime.utcnow().isoformat(),
-                'devices': devices
+                'devices': devices,
+                'roster': roster,
+                'events': events or []
             }
             
-            response = self._post('devices', data)
+            response = self._send('devices', data)
             
             if response:
-                logger.info(f"Sent data for {len(devices)} devices")
+                logger.info(f"Sent {'roster' if roster else 'changes'} for {len(devices)} devices"
+                            f"{f', {len(events)} events' if events else ''}")
                 return True
             return False
             
@@ -177,7 +204,7 @@ class APIClient:
                 'metrics': metrics
             }
             
-            response = self._post('metrics', data)
+            response = self._send('metrics', data)
             
             if response:
                 logger.debug("Metrics sent successfully")
@@ -197,7 +224,7 @@ class APIClient:
                 'alert': alert
             }
             
-            response = self._post('alerts', data)
+            response = self._send('alerts', data)
             
             if response:
                 logger.warning(f"Alert sent: {alert['message']}")
@@ -245,6 +272,40 @@ class APIClient:
             logger.exception(f"Unexpected error in API request: {e}")
             return None
     
+    def _send(self, endpoint: str, data: Dict) -> Optional[Dict]:
+        """Queue a record for upload (sent directly when local storage is disabled)"""
+        if not self.outbox:
+            return self._post(endpoint, data)
+        try:
+            self.outbox.put(endpoint, data)
+            return {'queued': True}
+        except sqlite3.Error as e:
+            logger.error(f"Could not queue {endpoint} upload, sending directly: {e}")
+            return self._post(endpoint, data)
+    
+    def _deliver(self, endpoint: str, data: Dict) -> Optional[bool]:
+        """POST a queued record: True when accepted, False when rejected for good, None to retry later"""
+        url = config.API_ENDPOINTS[endpoint]
+        try:
+            response = self.session.post(
+                url,
+                json=data,
+                headers=self.headers,
+                timeout=config.API_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Upload to {url} failed: {e}")
+            return None
+        
+        if response.status_code in [200, 201]:
+            return True
+        if response.status_code in [401, 408, 429] or response.status_code >= 500:
+            # The record is fine; the server (or its API key check) is not, for now
+            logger.warning(f"Upload to {url} deferred: {response.status_code}")
+            return None
+        logger.error(f"Upload to {url} rejected, dropping it: {response.status_code} - {response.text}")
+        return False
+    
     def _get(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
         """Make GET request to API endpoint"""
         url = config.API_ENDPOINTS.get(endpoint)
@@ -535,6 +596,7 @@ class APIClient:
                 # Phase 3: New performance metrics
                 'downloadThroughput': connection_data.get('download_throughput'),
                 'uploadThroughput': connection_data.get('upload_throughput'),
+                'throughputAge': connection_data.get('throughput_age'),
                 'jitter': connection_data.get('jitter'),
                 'dnsLatency': connection_data.get('dns_latency'),
                 'retransmissions': connection_data.get('retransmissions', 0),
@@ -542,7 +604,7 @@ class APIClient:
                 'stabilityScore': connection_data.get('stability_score')
             }
             
-            response = self._post('ssid-analyzer/connection', payload)
+            response = self._send('ssid-analyzer/connection', payload)
             
             if response:
                 logger.debug("SSID connection status sent successfully")
@@ -0,0 +1,179 @@
+"""
+BSSID History Store for Pi Wireless Monitor
+Bounded on-device RSSI/quality/channel history for every BSSID seen
+"""
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('bssid_history')
+
+# Per-sample fields and the array typecode used to store them
+SAMPLE_FIELDS = {
+    'rssi': 'h',      # dBm
+    'quality': 'h',   # percentage
+    'channel': 'h',
+    'time': 'I'       # unix seconds
+}
+
+
+class BssidRecord:
+    """Fixed-size ring buffers of samples for one BSSID"""
+
+    __slots__ = ('bssid', 'ssid', 'first_seen', 'last_seen', 'count', 'pos',
+                 'rssi', 'quality', 'channel', 'time')
+
+    def __init__(self, bssid: str, ssid: str, size: int, now: int):
+        self.bssid = bssid
+        self.ssid = sys.intern(ssid)
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.pos = 0
+        self.rssi = array('h', bytes(2 * size))
+        self.quality = array('h', bytes(2 * size))
+        self.channel = array('h', bytes(2 * size))
+        self.time = array('I', bytes(4 * size))
+
+    @property
+    def size(self) -> int:
+        return len(self.rssi)
+
+    def add(self, rssi: int, quality: int, channel: int, now: int) -> None:
+        """Append one sample, overwriting the oldest once the ring is full"""
+        pos = self.pos
+        self.rssi[pos] = max(-32768, min(32767, int(rssi)))
+        self.quality[pos] = int(quality)
+        self.channel[pos] = int(channel)
+        self.time[pos] = now
+        self.pos = (pos + 1) % self.size
+        self.count += 1
+        self.last_seen = now
+
+    def samples(self, field: str, window: int = None) -> List[int]:
+        """Return up to `window` of the most recent samples, oldest first"""
+        ring = getattr(self, field)
+        stored = min(self.count, self.size)
+        if window is not None:
+            stored = min(stored, window)
+        start = (self.pos - stored) % self.size
+        if start + stored <= self.size:
+            return ring[start:start + stored].tolist()
+        return ring[start:].tolist() + ring[:self.pos].tolist()
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the ring buffers"""
+        return sum(getattr(self, field).buffer_info()[1] * getattr(self, field).itemsize
+                   for field in SAMPLE_FIELDS)
+
+
+class BssidHistory:
+    """Table of BssidRecords, bounded by entry count with least-recently-seen eviction"""
+
+    def __init__(self, ring_size: int = None, max_entries: int = None):
+        self.ring_size = ring_size or config.BSSID_HISTORY_SIZE
+        self.max_entries = max_entries or config.BSSID_HISTORY_MAX_ENTRIES
+        self.records: 'OrderedDict[str, BssidRecord]' = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[BssidRecord]:
+        return iter(self.records.values())
+
+    def get(self, bssid: str) -> Optional[BssidRecord]:
+        return self.records.get(bssid)
+
+    def record_scan(self, networks: List[Dict], now: int = None) -> None:
+        """Add one sample per network from a normalized scan"""
+        now = int(now if now is not None else time.time())
+        for network in networks:
+            bssid = network.get('bssid')
+            if not bssid:
+                continue
+
+            record = self.records.get(bssid)
+            if record is None:
+                if len(self.records) >= self.max_entries:
+                    self.records.popitem(last=False)
+                    self.evicted += 1
+                record = BssidRecord(bssid, network.get('ssid', ''), self.ring_size, now)
+                self.records[bssid] = record
+            else:
+                self.records.move_to_end(bssid)
+                if network.get('ssid') and network['ssid'] != record.ssid:
+                    record.ssid = sys.intern(network['ssid'])
+
+            record.add(network.get('signal_strength', -100),
+                       network.get('quality_percentage', 0),
+                       network.get('channel', 0) or 0,
+                       now)
+
+    def rolling_mean(self, bssid: str, field: str = 'rssi', window: int = None) -> Optional[float]:
+        record = self.records.get(bssid)
+        if not record or not record.count:
+            return None
+        values = record.samples(field, window)
+        return sum(values) / len(values)
+
+    def rolling_min(self, bssid: str, field: str = 'rssi', window: int = None) -> Optional[int]:
+        record = self.records.get(bssid)
+        if not record or not record.count:
+            return None
+        return min(record.samples(field, window))
+
+    def rolling_max(self, bssid: str, field: str = 'rssi', window: int = None) -> Optional[int]:
+        record = self.records.get(bssid)
+        if not record or not record.count:
+            return None
+        return max(record.samples(field, window))
+
+    def last_seen(self, bssid: str) -> Optional[int]:
+        """Unix time the BSSID was last seen, or None if never seen"""
+        record = self.records.get(bssid)
+        return record.last_seen if record else None
+
+    def seen_since(self, since: int) -> List[str]:
+        """BSSIDs seen at or after the given unix time, most recent last"""
+        return [bssid for bssid, record in self.records.items() if record.last_seen >= since]
+
+    def not_seen_since(self, since: int) -> List[str]:
+        """BSSIDs whose last sighting is older than the given unix time"""
+        return [bssid for bssid, record in self.records.items() if record.last_seen < since]
+
+    def summary(self, bssid: str, window: int = None) -> Optional[Dict]:
+        """Rolling RSSI statistics and sighting times for one BSSID"""
+        record = self.records.get(bssid)
+        if not record or not record.count:
+            return None
+        rssi = record.samples('rssi', window)
+        return {
+            'bssid': bssid,
+            'ssid': record.ssid,
+            'samples': len(rssi),
+            'rssi_mean': round(sum(rssi) / len(rssi), 1),
+            'rssi_min': min(rssi),
+            'rssi_max': max(rssi),
+            'first_seen': record.first_seen,
+            'last_seen': record.last_seen
+        }
+
+    def memory_usage(self) -> Dict:
+        """Approximate bytes held by the ring buffers"""
+        ring_bytes = sum(record.nbytes() for record in self.records.values())
+        return {
+            'entries': len(self.records),
+            'max_entries': self.max_entries,
+            'ring_size': self.ring_size,
+            'ring_bytes': ring_bytes,
+            'evicted': self.evicted
+        }
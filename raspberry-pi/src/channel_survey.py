@@ -0,0 +1,118 @@
+"""
+Channel Survey Tracker for Pi Wireless Monitor
+Turns cumulative per-frequency survey counters into channel utilization
+"""
+import os
+import sys
+import time
+import threading
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import get_logger
+from src.nl80211 import frequency_to_channel
+
+logger = get_logger('channel_survey')
+
+
+class ChannelSurvey:
+    """Per-channel busy/rx/tx percentages from the deltas between survey samples"""
+
+    def __init__(self):
+        self.previous: Dict[int, Dict] = {}
+        self.utilization: Dict[int, Dict] = {}
+        self.last_sample: Optional[float] = None
+        # The scan job samples; metrics and API callers read from other threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _percent(part: Optional[int], whole: int) -> Optional[float]:
+        if part is None or whole <= 0:
+            return None
+        return round(min(100.0, max(0.0, part * 100.0 / whole)), 1)
+
+    @staticmethod
+    def _advanced(previous: Dict, current: Dict) -> bool:
+        """Check that no counter went backwards (drivers reset them on some scans)"""
+        for key in ('active_ms', 'busy_ms', 'rx_ms', 'tx_ms'):
+            before, after = previous.get(key), current.get(key)
+            if before is not None and after is not None and after < before:
+                return False
+        return previous.get('active_ms') is not None
+
+    def update(self, surveys: List[Dict]) -> Dict[int, Dict]:
+        """Fold one survey dump into the tracker and return utilization keyed by channel.
+        Each call measures the interval since the previous one, so only the scan path samples."""
+        with self._lock:
+            return self._update(surveys)
+
+    def _update(self, surveys: List[Dict]) -> Dict[int, Dict]:
+        utilization = {}
+
+        for survey in surveys:
+            frequency = survey.get('frequency')
+            active = survey.get('active_ms')
+            if not frequency or active is None:
+                continue
+
+            previous = self.previous.get(frequency)
+            if previous and self._advanced(previous, survey):
+                window = active - previous['active_ms']
+                if window == 0:
+                    # Channel not visited since the last sample; keep the previous figure
+                    if frequency in self.utilization:
+                        utilization[self.utilization[frequency]['channel']] = self.utilization[frequency]
+                    continue
+                # Report this interval only
+                deltas = {key: (survey[key] - previous[key]
+                                if survey.get(key) is not None and previous.get(key) is not None else None)
+                          for key in ('busy_ms', 'rx_ms', 'tx_ms')}
+            else:
+                # First sample or counters reset by the driver: fall back to totals
+                window = active
+                deltas = {key: survey.get(key) for key in ('busy_ms', 'rx_ms', 'tx_ms')}
+
+            self.previous[frequency] = survey
+            if window <= 0:
+                continue
+
+            channel = frequency_to_channel(frequency)
+            entry = {
+                'channel': channel,
+                'frequency': frequency,
+                'utilization': self._percent(deltas['busy_ms'], window),
+                'rx_percent': self._percent(deltas['rx_ms'], window),
+                'tx_percent': self._percent(deltas['tx_ms'], window),
+                'window_ms': window,
+                'noise': survey.get('noise'),
+                'in_use': bool(survey.get('in_use'))
+            }
+            if entry['utilization'] is None:
+                continue
+
+            self.utilization[frequency] = entry
+            # Prefer the in-use or busiest frequency when two map to one channel number
+            existing = utilization.get(channel)
+            if existing is None or entry['in_use'] or entry['utilization'] > existing['utilization']:
+                utilization[channel] = entry
+
+        self.last_sample = time.monotonic()
+        logger.debug(f"Channel survey updated for {len(utilization)} channels")
+        return utilization
+
+    def get(self, channel: int) -> Optional[Dict]:
+        """Most recent utilization entry for a channel number"""
+        with self._lock:
+            for entry in self.utilization.values():
+                if entry['channel'] == channel:
+                    return entry
+        return None
+
+    def in_use(self) -> Optional[Dict]:
+        """Most recent utilization entry for the channel the interface is tuned to"""
+        with self._lock:
+            for entry in self.utilization.values():
+                if entry['in_use']:
+                    return entry
+        return None
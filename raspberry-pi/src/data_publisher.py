@@ -0,0 +1,104 @@
+"""
+Data Publisher for Pi Wireless Monitor
+Reduces network scans to deltas against the last uploaded snapshot
+"""
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('data_publisher')
+
+# Fields whose change always makes a network worth re-sending
+IDENTITY_FIELDS = ('ssid', 'channel', 'frequency', 'encryption_type', 'band', 'stale')
+
+
+class DeltaPublisher:
+    """Tracks the last uploaded network snapshot, keyed by BSSID"""
+
+    def __init__(self, rssi_deadband: int = None, quality_deadband: int = None,
+                 keyframe_interval: int = None):
+        self.rssi_deadband = config.NETWORK_RSSI_DEADBAND if rssi_deadband is None else rssi_deadband
+        self.quality_deadband = (config.NETWORK_QUALITY_DEADBAND
+                                 if quality_deadband is None else quality_deadband)
+        self.keyframe_interval = (config.NETWORK_KEYFRAME_INTERVAL
+                                  if keyframe_interval is None else keyframe_interval)
+        self.snapshot: Dict[str, Dict] = {}
+        self.last_keyframe: Optional[float] = None
+        self.sequence = 0
+
+    def _keyframe_due(self, now: float, next_interval: float) -> bool:
+        """A keyframe is due when waiting for the next scan would leave the last one
+        older than the interval (the server only shows networks seen in the last 5 minutes)"""
+        if self.last_keyframe is None:
+            return True
+        return now - self.last_keyframe + next_interval > self.keyframe_interval
+
+    def _has_changed(self, previous: Dict, current: Dict) -> bool:
+        """Check whether a network differs from what the server last received"""
+        for field in IDENTITY_FIELDS:
+            if previous.get(field) != current.get(field):
+                return True
+        if abs(current.get('signal_strength', -100) - previous.get('signal_strength', -100)) >= self.rssi_deadband:
+            return True
+        return abs(current.get('quality_percentage', 0) - previous.get('quality_percentage', 0)) >= self.quality_deadband
+
+    def build_update(self, networks: List[Dict], next_interval: float = 0) -> Dict:
+        """Build the next upload for a scan: a full keyframe or only the changes.
+        next_interval is the time in seconds until the following scan."""
+        current = {n['bssid']: n for n in networks if n.get('bssid')}
+        built = time.monotonic()
+        keyframe = self._keyframe_due(built, next_interval)
+
+        if keyframe:
+            changed = list(current.values())
+            added_count = len(current.keys() - self.snapshot.keys())
+        else:
+            changed = []
+            added_count = 0
+            for bssid, network in current.items():
+                previous = self.snapshot.get(bssid)
+                if previous is None:
+                    added_count += 1
+                    changed.append(network)
+                elif self._has_changed(previous, network):
+                    changed.append(network)
+
+        removed = sorted(self.snapshot.keys() - current.keys())
+
+        return {
+            'keyframe': keyframe,
+            'sequence': self.sequence + 1,
+            'networks': changed,
+            'removed': removed,
+            'added_count': added_count,
+            'unchanged_count': len(current) - len(changed),
+            'current': current,
+            'built': built
+        }
+
+    def commit(self, update: Dict) -> None:
+        """Record an update as delivered, making it the new baseline"""
+        self.sequence = update['sequence']
+        if update['keyframe']:
+            self.snapshot = dict(update['current'])
+            # Timed from the scan, not the upload, so upload time does not push the next one back
+            self.last_keyframe = update['built']
+        else:
+            for bssid in update['removed']:
+                self.snapshot.pop(bssid, None)
+            for network in update['networks']:
+                self.snapshot[network['bssid']] = network
+
+        logger.debug(f"Published {'keyframe' if update['keyframe'] else 'delta'} #{self.sequence}: "
+                     f"{len(update['networks'])} sent, {len(update['removed'])} removed, "
+                     f"{update['unchanged_count']} unchanged")
+
+    def force_keyframe(self) -> None:
+        """Send a full snapshot on the next update, e.g. after the server lost state"""
+        self.last_keyframe = None
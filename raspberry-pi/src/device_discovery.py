@@ -0,0 +1,352 @@
+"""
+Device Discovery for Pi Wireless Monitor
+Neighbor-table reads plus a rate-limited ARP sweep over a raw packet socket
+"""
+import os
+import sys
+import time
+import errno
+import socket
+import struct
+import asyncio
+import ipaddress
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.link_reader import LinkReader, PersistentFile
+from src.oui import lookup_vendor
+from src import parsers
+
+logger = get_logger('device_discovery')
+
+ETH_P_ARP = 0x0806
+ETH_P_IP = 0x0800
+ARPHRD_ETHER = 1
+ARP_REQUEST = 1
+ARP_REPLY = 2
+
+BROADCAST_MAC = b'\xff' * 6
+ZERO_MAC = b'\x00' * 6
+
+_ETHERNET = struct.Struct('!6s6sH')
+_ARP = struct.Struct('!HHBBH6s4s6s4s')
+_RECORD_LEN = struct.Struct('<I')
+
+
+def _mac_bytes(mac: str) -> bytes:
+    return bytes.fromhex(mac.replace(':', '')) if mac else ZERO_MAC
+
+
+def _mac_text(mac: bytes) -> str:
+    return ':'.join(f'{b:02x}' for b in mac)
+
+
+def build_arp_request(src_mac: bytes, src_ip: bytes, target_ip: bytes) -> bytes:
+    """Broadcast Ethernet frame asking who has target_ip"""
+    return (_ETHERNET.pack(BROADCAST_MAC, src_mac, ETH_P_ARP)
+            + _ARP.pack(ARPHRD_ETHER, ETH_P_IP, 6, 4, ARP_REQUEST,
+                        src_mac, src_ip, ZERO_MAC, target_ip))
+
+
+def parse_arp_frame(frame: bytes) -> Optional[Tuple[int, str, str]]:
+    """Decode an Ethernet ARP frame into (operation, sender MAC, sender IP)"""
+    if len(frame) < _ETHERNET.size + _ARP.size:
+        return None
+    _, _, ethertype = _ETHERNET.unpack_from(frame)
+    if ethertype != ETH_P_ARP:
+        return None
+    htype, ptype, hlen, plen, op, sha, spa, _, _ = _ARP.unpack_from(frame, _ETHERNET.size)
+    if htype != ARPHRD_ETHER or ptype != ETH_P_IP or hlen != 6 or plen != 4:
+        return None
+    return op, _mac_text(sha), socket.inet_ntoa(spa)
+
+
+def sweep_targets(network: ipaddress.IPv4Network, address: str, limit: int) -> List[str]:
+    """Host addresses of the subnet, excluding the interface's own, capped at `limit`"""
+    targets = []
+    for host in network.hosts():
+        if len(targets) >= limit:
+            logger.warning(f"Subnet {network} is larger than ARP_SWEEP_MAX_HOSTS; sweeping the first {limit} hosts")
+            break
+        if str(host) != address:
+            targets.append(str(host))
+    return targets
+
+
+def sweep_rate(hosts: int) -> float:
+    """Requests per second: finish within ARP_SWEEP_DURATION, never above ARP_SWEEP_MAX_RATE"""
+    if hosts <= 0:
+        return config.ARP_SWEEP_MAX_RATE
+    return min(float(config.ARP_SWEEP_MAX_RATE), max(1.0, hosts / config.ARP_SWEEP_DURATION))
+
+
+class PacketSocket:
+    """Non-blocking AF_PACKET socket for ARP frames, optionally recording received frames"""
+
+    def __init__(self, interface: str, record_path: str = None):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        try:
+            self.sock.bind((interface, ETH_P_ARP))
+            self.sock.setblocking(False)
+        except OSError:
+            self.sock.close()
+            raise
+        self.record_file = open(record_path, 'ab') if record_path else None
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def send(self, frame: bytes) -> None:
+        self.sock.send(frame)
+
+    def recv(self) -> Optional[bytes]:
+        """Return one pending frame, or None when nothing is queued"""
+        try:
+            frame = self.sock.recv(2048)
+        except BlockingIOError:
+            return None
+        if self.record_file:
+            self.record_file.write(_RECORD_LEN.pack(len(frame)) + frame)
+            self.record_file.flush()
+        return frame
+
+    def close(self) -> None:
+        self.sock.close()
+        if self.record_file:
+            self.record_file.close()
+
+
+class ReplayPacketSocket:
+    """Replays frames recorded by PacketSocket for offline testing"""
+
+    def __init__(self, fixture_path: str):
+        with open(fixture_path, 'rb') as f:
+            data = f.read()
+        self.frames = []
+        offset = 0
+        while offset + _RECORD_LEN.size <= len(data):
+            (length,) = _RECORD_LEN.unpack_from(data, offset)
+            offset += _RECORD_LEN.size
+            self.frames.append(data[offset:offset + length])
+            offset += length
+        self.sent = []
+
+    def fileno(self) -> int:
+        return -1
+
+    def send(self, frame: bytes) -> None:
+        self.sent.append(frame)
+
+    def recv(self) -> Optional[bytes]:
+        if not self.frames:
+            return None
+        return self.frames.pop(0)
+
+    def close(self) -> None:
+        pass
+
+
+class DeviceDiscovery:
+    """Keeps a table of neighbors seen on the interface's subnet, keyed by MAC.
+
+    The kernel neighbor table is read on every snapshot; ARP sweeps run on the
+    shared background loop so callers never wait for one to finish.
+    """
+
+    def __init__(self, interface: str, reader: LinkReader = None, fixture_path: str = None,
+                 network: str = None):
+        self.interface = interface
+        self.reader = reader or LinkReader(interface)
+        self.fixture_path = fixture_path if fixture_path is not None else config.ARP_FIXTURE_PATH
+        self.network = network
+        self.arp_table = PersistentFile('/proc/net/arp')
+        self.devices: Dict[str, Dict] = {}
+        self.last_sweep: Optional[Dict] = None
+        self.raw_denied = False
+        self._sweep_future = None
+        self._lock = threading.Lock()
+
+    def _seen(self, mac: str, ip: str, source: str, vendor: str = None) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self.devices.get(mac)
+            if entry is None:
+                entry = self.devices[mac] = {'mac': mac, 'ip': ip, 'vendor': lookup_vendor(mac),
+                                             'source': source, 'last_seen': now}
+            entry['ip'] = ip
+            entry['source'] = source
+            entry['last_seen'] = now
+            if vendor and vendor != 'Unknown':
+                entry['vendor'] = vendor
+
+    def read_neighbors(self) -> int:
+        """Merge complete entries from the kernel neighbor table; returns how many were read"""
+        try:
+            neighbors = parsers.parse_proc_net_arp(self.arp_table.read(), self.interface)
+        except OSError as e:
+            logger.debug(f"Could not read neighbor table: {e}")
+            return 0
+        for ip, mac in neighbors:
+            self._seen(mac, ip, 'neighbor')
+        return len(neighbors)
+
+    def snapshot(self, max_age: float = None) -> List[Dict]:
+        """Devices seen within max_age seconds (DEVICE_SEEN_WINDOW by default)"""
+        self.read_neighbors()
+        now = time.time()
+        max_age = config.DEVICE_SEEN_WINDOW if max_age is None else max_age
+        cutoff = now - max_age
+        # Devices past the seen window are never reported again until they reappear
+        stale = now - max(max_age, config.DEVICE_SEEN_WINDOW)
+        with self._lock:
+            for mac in [mac for mac, entry in self.devices.items() if entry['last_seen'] < stale]:
+                del self.devices[mac]
+            return [dict(entry) for entry in self.devices.values() if entry['last_seen'] >= cutoff]
+
+    def request_sweep(self) -> bool:
+        """Start a sweep on the background loop unless one is already running"""
+        if not config.ARP_SWEEP_ENABLED:
+            return False
+        if self._sweep_future is not None and not self._sweep_future.done():
+            return False
+        self._sweep_future = asyncio.run_coroutine_threadsafe(self._run_sweep(), get_background_loop())
+        return True
+
+    async def _run_sweep(self) -> None:
+        try:
+            await self.sweep()
+        except Exception as e:
+            logger.error(f"ARP sweep failed: {e}")
+
+    def _subnet(self) -> Tuple[Optional[ipaddress.IPv4Network], str]:
+        """The subnet to sweep and our address on it (the network override wins)"""
+        address = self.reader.ip_address()
+        if self.network:
+            return ipaddress.IPv4Network(self.network, strict=False), address
+        netmask = self.reader.netmask()
+        if not address or not netmask:
+            return None, address
+        return ipaddress.IPv4Network(f'{address}/{netmask}', strict=False), address
+
+    def _open_socket(self):
+        if self.fixture_path:
+            return ReplayPacketSocket(self.fixture_path)
+        return PacketSocket(self.interface, config.ARP_RECORD_PATH or None)
+
+    def _drain(self, sock, own_mac: str, subnet: ipaddress.IPv4Network) -> int:
+        """Record the sender of every queued ARP frame (replies and other hosts' requests)"""
+        count = 0
+        while True:
+            frame = sock.recv()
+            if frame is None:
+                return count
+            parsed = parse_arp_frame(frame)
+            if not parsed:
+                continue
+            op, mac, ip = parsed
+            if mac == own_mac or ip == '0.0.0.0':
+                continue
+            if ipaddress.IPv4Address(ip) not in subnet:
+                continue
+            self._seen(mac, ip, 'arp')
+            count += 1
+
+    async def sweep(self) -> Dict:
+        """ARP every host on the subnet at a rate scaled to its size, then wait for late replies"""
+        subnet, address = self._subnet()
+        if subnet is None:
+            logger.debug(f"No IPv4 subnet on {self.interface}; skipping ARP sweep")
+            return {}
+        targets = sweep_targets(subnet, address, config.ARP_SWEEP_MAX_HOSTS)
+
+        try:
+            sock = self._open_socket()
+        except PermissionError:
+            if not self.raw_denied:
+                logger.warning("ARP sweep needs CAP_NET_RAW; falling back to arp-scan")
+                self.raw_denied = True
+            return await self._sweep_arp_scan()
+        except OSError as e:
+            if e.errno in (errno.ENODEV, errno.ENXIO):
+                logger.debug(f"{self.interface} is not available for an ARP sweep")
+                return {}
+            raise
+
+        loop = asyncio.get_running_loop()
+        own_mac = self.reader.mac_address().lower()
+        src_mac = _mac_bytes(own_mac)
+        src_ip = socket.inet_aton(address or '0.0.0.0')
+        rate = sweep_rate(len(targets))
+        replies = 0
+        live = sock.fileno() >= 0
+        start = loop.time()
+
+        def on_readable():
+            nonlocal replies
+            replies += self._drain(sock, own_mac, subnet)
+
+        if live:
+            loop.add_reader(sock.fileno(), on_readable)
+        try:
+            for i, target in enumerate(targets):
+                delay = start + i / rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    sock.send(build_arp_request(src_mac, src_ip, socket.inet_aton(target)))
+                except OSError as e:
+                    if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                        raise
+            if live:
+                await asyncio.sleep(config.ARP_REPLY_WAIT)
+            else:
+                on_readable()
+        finally:
+            if live:
+                loop.remove_reader(sock.fileno())
+            sock.close()
+
+        self.last_sweep = {
+            'targets': len(targets),
+            'replies': replies,
+            'rate': round(rate, 1),
+            'duration': round(loop.time() - start, 2),
+            'finished_at': time.time()
+        }
+        logger.info(f"ARP sweep of {len(targets)} hosts at {rate:.0f}/s: "
+                    f"{replies} replies in {self.last_sweep['duration']}s")
+        return self.last_sweep
+
+    async def _sweep_arp_scan(self) -> Dict:
+        """Run arp-scan without blocking the loop when raw sockets are not permitted"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'sudo', 'arp-scan', '--localnet', '-I', self.interface,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except FileNotFoundError:
+            logger.warning("arp-scan not installed. Install with: sudo apt-get install arp-scan")
+            return {}
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), 30)
+        except asyncio.TimeoutError:
+            process.kill()
+            logger.error("arp-scan timed out")
+            return {}
+        if process.returncode != 0:
+            logger.error(f"ARP scan failed: {stderr.decode(errors='replace')}")
+            return {}
+
+        found = 0
+        for ip, mac, vendor in parsers.parse_arp_scan(stdout):
+            if ip == '0.0.0.0' or mac == '00:00:00:00:00:00':
+                continue
+            self._seen(mac.lower(), ip, 'arp-scan', vendor)
+            found += 1
+        self.last_sweep = {'targets': None, 'replies': found, 'rate': None,
+                           'duration': None, 'finished_at': time.time()}
+        return self.last_sweep
@@ -0,0 +1,213 @@
+"""
+Device Tracker for Pi Wireless Monitor
+Per-MAC presence sessions that reduce device uploads to join/leave changes
+"""
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('device_tracker')
+
+# Fields whose change makes a device row worth re-sending
+IDENTITY_FIELDS = ('ip', 'vendor', 'hostname', 'device_type')
+
+MAX_PENDING_EVENTS = 1000
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+class DeviceTracker:
+    """In-memory device table keyed by MAC, with secondary indexes by IP and online state.
+
+    observe() takes the full set of devices currently present (as reported by
+    DeviceDiscovery.snapshot); devices missing from it end their session.
+    """
+
+    def __init__(self, roster_interval: int = None, forget_after: int = None, max_devices: int = None):
+        self.roster_interval = (config.DEVICE_ROSTER_INTERVAL
+                                if roster_interval is None else roster_interval)
+        self.forget_after = config.DEVICE_FORGET_AFTER if forget_after is None else forget_after
+        self.max_devices = config.DEVICE_TABLE_MAX if max_devices is None else max_devices
+        self.table: Dict[str, Dict] = {}
+        self.by_ip: Dict[str, str] = {}
+        self.online: Set[str] = set()
+        self.dirty: Set[str] = set()
+        self.events: Deque[Dict] = deque(maxlen=MAX_PENDING_EVENTS)
+        self.last_roster: Optional[float] = None
+
+    def _event(self, kind: str, entry: Dict, timestamp: float) -> Dict:
+        event = {
+            'type': kind,
+            'macAddress': entry['mac'],
+            'ipAddress': entry['ip'],
+            'timestamp': _iso(timestamp)
+        }
+        self.events.append(event)
+        logger.info(f"Device {entry['mac']} ({entry['ip']}) {kind}")
+        return event
+
+    def _index_ip(self, entry: Dict, ip: str) -> None:
+        if self.by_ip.get(entry['ip']) == entry['mac']:
+            del self.by_ip[entry['ip']]
+        entry['ip'] = ip
+        self.by_ip[ip] = entry['mac']
+
+    def observe(self, devices: List[Dict]) -> List[Dict]:
+        """Fold one scan into the table and return the join/leave events it caused"""
+        now = time.time()
+        events = []
+        present = set()
+
+        for device in devices:
+            mac = device['mac']
+            present.add(mac)
+            last_seen = device.get('last_seen', now)
+            entry = self.table.get(mac)
+            if entry is None:
+                entry = self.table[mac] = {
+                    'mac': mac, 'ip': None, 'vendor': None, 'hostname': None, 'device_type': None,
+                    'first_seen': last_seen, 'last_seen': last_seen, 'session_start': last_seen,
+                    'sessions': 0, 'online': False
+                }
+            if not entry['online']:
+                entry['online'] = True
+                entry['session_start'] = last_seen
+                entry['sessions'] += 1
+                self.online.add(mac)
+                self.dirty.add(mac)
+                self._index_ip(entry, device['ip'])
+                events.append(self._event('join', entry, last_seen))
+            elif entry['ip'] != device['ip']:
+                self._index_ip(entry, device['ip'])
+                self.dirty.add(mac)
+            if device.get('vendor') and device['vendor'] != entry['vendor']:
+                entry['vendor'] = device['vendor']
+                self.dirty.add(mac)
+            entry['last_seen'] = max(entry['last_seen'], last_seen)
+
+        for mac in self.online - present:
+            entry = self.table[mac]
+            entry['online'] = False
+            self.online.discard(mac)
+            self.dirty.discard(mac)
+            events.append(self._event('leave', entry, entry['last_seen']))
+
+        self._prune(now)
+        return events
+
+    def _forget(self, mac: str) -> None:
+        entry = self.table.pop(mac)
+        if self.by_ip.get(entry['ip']) == mac:
+            del self.by_ip[entry['ip']]
+
+    def _prune(self, now: float) -> None:
+        """Forget devices offline for longer than forget_after, then the longest-gone ones beyond max_devices"""
+        offline = sorted((entry for entry in self.table.values() if not entry['online']),
+                         key=lambda entry: entry['last_seen'])
+        cutoff = now - self.forget_after
+        excess = len(self.table) - self.max_devices
+        forgotten = 0
+        for entry in offline:
+            if entry['last_seen'] >= cutoff and forgotten >= excess:
+                break
+            self._forget(entry['mac'])
+            forgotten += 1
+        if forgotten:
+            logger.debug(f"Forgot {forgotten} offline devices ({len(self.table)} tracked)")
+
+    def update_device(self, mac: str, **fields) -> bool:
+        """Attach late-arriving details (hostname, device_type) to a known device"""
+        entry = self.table.get(mac)
+        if entry is None:
+            return False
+        changed = False
+        for field, value in fields.items():
+            if field in IDENTITY_FIELDS and value and entry.get(field) != value:
+                entry[field] = value
+                changed = True
+        if changed and entry['online']:
+            self.dirty.add(mac)
+        return changed
+
+    def find_by_ip(self, ip: str) -> Optional[Dict]:
+        mac = self.by_ip.get(ip)
+        return self.table.get(mac) if mac else None
+
+    def get(self, mac: str) -> Optional[Dict]:
+        return self.table.get(mac)
+
+    def row(self, entry: Dict) -> Dict:
+        """Full device row in the server's format"""
+        vendor = entry['vendor'] or 'Unknown'
+        return {
+            'ipAddress': entry['ip'],  # camelCase to match server
+            'macAddress': entry['mac'],  # camelCase to match server
+            'manufacturer': vendor,
+            'vendor': vendor,  # alias for manufacturer
+            'hostname': entry['hostname'] or 'Unknown',
+            'deviceType': entry['device_type'] or 'Unknown',
+            'firstSeen': _iso(entry['first_seen']),
+            'sessionStart': _iso(entry['session_start']),
+            'timestamp': _iso(entry['last_seen'])
+        }
+
+    @staticmethod
+    def compact_row(entry: Dict) -> Dict:
+        """Presence-only row; the server keeps the fields it already has"""
+        return {
+            'ipAddress': entry['ip'],
+            'macAddress': entry['mac'],
+            'timestamp': _iso(entry['last_seen'])
+        }
+
+    def _roster_due(self, now: float, next_interval: float) -> bool:
+        """A roster is due when waiting for the next scan would leave the last one
+        older than the interval (the server marks devices offline after 5 minutes)"""
+        if self.last_roster is None:
+            return True
+        return now - self.last_roster + next_interval > self.roster_interval
+
+    def build_update(self, next_interval: float = 0) -> Dict:
+        """Rows for joined or changed devices, or a compact roster of every online device when due.
+        next_interval is the time in seconds until the following device scan."""
+        built = time.monotonic()
+        roster = self._roster_due(built, next_interval)
+        changed = [self.table[mac] for mac in sorted(self.dirty)]
+        rows = [self.row(entry) for entry in changed]
+        if roster:
+            rows += [self.compact_row(self.table[mac]) for mac in sorted(self.online - self.dirty)]
+        return {
+            'roster': roster,
+            'devices': rows,
+            'events': list(self.events),
+            'changed': {entry['mac'] for entry in changed},
+            'online_count': len(self.online),
+            'built': built
+        }
+
+    def commit(self, update: Dict) -> None:
+        """Record an update as delivered"""
+        self.dirty -= update['changed']
+        for _ in update['events']:
+            self.events.popleft()
+        if update['roster']:
+            self.last_roster = update['built']
+
+        logger.debug(f"Published {'roster' if update['roster'] else 'changes'}: "
+                     f"{len(update['devices'])} rows, {len(update['events'])} events, "
+                     f"{update['online_count']} online")
+
+    def force_roster(self) -> None:
+        """Send every online device on the next update, e.g. after the server lost state"""
+        self.last_roster = None
+        self.dirty |= self.online
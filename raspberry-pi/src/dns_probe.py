@@ -0,0 +1,249 @@
+"""
+DNS Latency Prober for Pi Wireless Monitor
+Concurrent UDP (with TCP fallback) queries to a list of resolvers, with rolling percentiles
+"""
+import os
+import sys
+import math
+import time
+import random
+import struct
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import run_sync
+
+logger = get_logger('dns_probe')
+
+QTYPE_A = 1
+QTYPE_PTR = 12
+QCLASS_IN = 1
+
+FLAG_QR = 0x8000
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+_HEADER = struct.Struct('!HHHHHH')
+_TCP_LENGTH = struct.Struct('!H')
+
+
+def build_query(name: str, query_id: int, qtype: int = QTYPE_A) -> bytes:
+    """Build a recursive DNS query for one name"""
+    qname = b''.join(bytes([len(label)]) + label
+                     for label in name.rstrip('.').encode('idna').split(b'.') if label)
+    return (_HEADER.pack(query_id, FLAG_RD, 1, 0, 0, 0) + qname + b'\x00'
+            + struct.pack('!HH', qtype, QCLASS_IN))
+
+
+def parse_header(data: bytes) -> Optional[Dict]:
+    """Decode the fields of a response header needed to judge the answer"""
+    if len(data) < _HEADER.size:
+        return None
+    query_id, flags, _, answers, _, _ = _HEADER.unpack_from(data)
+    return {
+        'id': query_id,
+        'response': bool(flags & FLAG_QR),
+        'truncated': bool(flags & FLAG_TC),
+        'rcode': flags & 0x000f,
+        'answers': answers
+    }
+
+
+def read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decode a possibly compressed name, returning it and the offset just past it"""
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xc0 == 0xc0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3f) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('utf-8', errors='replace'))
+        offset += length
+    else:
+        raise ValueError("DNS name compression loop")
+    return '.'.join(labels), end if end is not None else offset
+
+
+def parse_ptr_answers(data: bytes) -> List[str]:
+    """Target names of the PTR records in a response's answer section"""
+    _, _, questions, answers, _, _ = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    for _ in range(questions):
+        _, offset = read_name(data, offset)
+        offset += 4
+    names = []
+    for _ in range(answers):
+        _, offset = read_name(data, offset)
+        rtype, _, _, length = struct.unpack_from('!HHIH', data, offset)
+        offset += 10
+        if rtype == QTYPE_PTR:
+            names.append(read_name(data, offset)[0])
+        offset += length
+    return names
+
+
+def parse_resolver(resolver: str) -> Tuple[str, int]:
+    """Split 'host', 'host:port' or '[v6]:port' into address and port"""
+    if resolver.startswith('['):
+        host, _, port = resolver[1:].partition(']')
+        return host, int(port.lstrip(':') or 53)
+    if resolver.count(':') == 1:
+        host, port = resolver.split(':')
+        return host, int(port)
+    return resolver, 53
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class _UdpQuery(asyncio.DatagramProtocol):
+    """Waits for the datagram answering one query id"""
+
+    def __init__(self, query_id: int, future: asyncio.Future):
+        self.query_id = query_id
+        self.future = future
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        header = parse_header(data)
+        if header and header['response'] and header['id'] == self.query_id and not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def query_udp(host: str, port: int, packet: bytes, query_id: int, timeout: float) -> bytes:
+    """Send one datagram and wait for the response carrying query_id (DNS, mDNS or NBNS)"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _UdpQuery(query_id, future), remote_addr=(host, port))
+    try:
+        transport.sendto(packet)
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        transport.close()
+
+
+async def _query_tcp(host: str, port: int, packet: bytes, query_id: int, timeout: float) -> bytes:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(_TCP_LENGTH.pack(len(packet)) + packet)
+        await writer.drain()
+        (length,) = _TCP_LENGTH.unpack(await asyncio.wait_for(reader.readexactly(2), timeout))
+        data = await asyncio.wait_for(reader.readexactly(length), timeout)
+        header = parse_header(data)
+        if not header or header['id'] != query_id:
+            raise ValueError("Mismatched DNS response over TCP")
+        return data
+    finally:
+        writer.close()
+
+
+async def query(resolver: str, name: str, timeout: float = 2.0) -> Dict:
+    """Time one query over UDP, retrying over TCP when the answer is truncated or UDP fails"""
+    host, port = parse_resolver(resolver)
+    query_id = random.getrandbits(16)
+    packet = build_query(name, query_id)
+    result = {'resolver': resolver, 'name': name, 'latency': None, 'rcode': None,
+              'transport': 'udp', 'error': None}
+
+    start = time.monotonic()
+    try:
+        data = await query_udp(host, port, packet, query_id, timeout)
+        if parse_header(data)['truncated']:
+            raise BufferError("truncated")
+    except asyncio.TimeoutError:
+        result['error'] = 'timeout'
+        return result
+    except (OSError, BufferError) as e:
+        result['transport'] = 'tcp'
+        start = time.monotonic()
+        try:
+            data = await _query_tcp(host, port, packet, query_id, timeout)
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError) as tcp_error:
+            result['error'] = f"udp: {e or type(e).__name__}; tcp: {tcp_error or type(tcp_error).__name__}"
+            return result
+
+    latency = (time.monotonic() - start) * 1000.0
+    rcode = parse_header(data)['rcode']
+    result['rcode'] = rcode
+    if rcode in (RCODE_NOERROR, RCODE_NXDOMAIN):
+        result['latency'] = round(latency, 3)
+    else:
+        result['error'] = f'rcode {rcode}'
+    return result
+
+
+class DnsProber:
+    """Probes every (resolver, name) pair concurrently and keeps rolling per-resolver statistics"""
+
+    def __init__(self, resolvers: List[str] = None, names: List[str] = None,
+                 timeout: float = None, history_size: int = None):
+        self.resolvers = resolvers or config.DNS_RESOLVERS
+        self.names = names or config.DNS_TEST_NAMES
+        self.timeout = config.DNS_TIMEOUT if timeout is None else timeout
+        history_size = history_size or config.DNS_HISTORY_SIZE
+        self.latencies: Dict[str, Deque[float]] = {r: deque(maxlen=history_size) for r in self.resolvers}
+        self.outcomes: Dict[str, Deque[bool]] = {r: deque(maxlen=history_size) for r in self.resolvers}
+
+    async def probe(self) -> Dict:
+        """Run one round of queries and return its results with the rolling statistics"""
+        results = await asyncio.gather(*(query(resolver, name, self.timeout)
+                                         for resolver in self.resolvers for name in self.names))
+        for result in results:
+            ok = result['latency'] is not None
+            self.outcomes[result['resolver']].append(ok)
+            if ok:
+                self.latencies[result['resolver']].append(result['latency'])
+            else:
+                logger.debug(f"DNS query {result['name']} @{result['resolver']} failed: {result['error']}")
+
+        latencies = [r['latency'] for r in results if r['latency'] is not None]
+        return {
+            'latency': percentile(latencies, 50),
+            'queries': results,
+            'resolvers': [self.summary(resolver) for resolver in self.resolvers]
+        }
+
+    def probe_sync(self) -> Dict:
+        """Blocking wrapper for synchronous callers"""
+        return run_sync(self.probe(), timeout=self.timeout * 2 + 30)
+
+    def summary(self, resolver: str) -> Dict:
+        """Rolling latency percentiles and failure rate for one resolver"""
+        latencies = list(self.latencies[resolver])
+        outcomes = self.outcomes[resolver]
+        failures = sum(1 for ok in outcomes if not ok)
+        return {
+            'resolver': resolver,
+            'queries': len(outcomes),
+            'failures': failures,
+            'failure_rate': round(failures * 100.0 / len(outcomes), 1) if outcomes else None,
+            'min': min(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else None
+        }
@@ -0,0 +1,164 @@
+"""
+Hostname Resolver for Pi Wireless Monitor
+Concurrent reverse DNS, mDNS and NetBIOS lookups behind an LRU cache with TTLs
+"""
+import os
+import sys
+import time
+import random
+import struct
+import asyncio
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.dns_probe import QTYPE_PTR, build_query, parse_ptr_answers, query_udp
+
+logger = get_logger('hostname_resolver')
+
+MDNS_PORT = 5353
+NETBIOS_PORT = 137
+
+NBSTAT_TYPE = 0x0021
+NB_GROUP = 0x8000
+NB_WORKSTATION = 0x00
+
+# Wildcard name '*' padded with NULs, in NetBIOS first-level encoding
+_NBSTAT_NAME = b'\x20' + b'CK' + b'A' * 30 + b'\x00'
+_NB_NAME_ENTRY = struct.Struct('!15sBH')
+
+
+def read_nameservers(path: str = '/etc/resolv.conf') -> List[str]:
+    """Nameservers configured for the system resolver"""
+    servers = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver':
+                    servers.append(fields[1])
+    except OSError:
+        pass
+    return servers
+
+
+def build_nbstat_query(query_id: int) -> bytes:
+    """NetBIOS node status request for the wildcard name"""
+    return (struct.pack('!HHHHHH', query_id, 0, 1, 0, 0, 0) + _NBSTAT_NAME
+            + struct.pack('!HH', NBSTAT_TYPE, 1))
+
+
+def parse_nbstat_response(data: bytes) -> Optional[str]:
+    """Workstation name from a node status response"""
+    offset = 12 + len(_NBSTAT_NAME)
+    rtype, _, _, _ = struct.unpack_from('!HHIH', data, offset)
+    if rtype != NBSTAT_TYPE:
+        return None
+    offset += 10
+    count = data[offset]
+    offset += 1
+    for i in range(count):
+        name, suffix, flags = _NB_NAME_ENTRY.unpack_from(data, offset + i * _NB_NAME_ENTRY.size)
+        if suffix == NB_WORKSTATION and not flags & NB_GROUP:
+            return name.decode('ascii', errors='replace').strip() or None
+    return None
+
+
+class HostnameResolver:
+    """Resolves device names off the scan path and caches answers (and misses) per MAC"""
+
+    def __init__(self, timeout: float = None, ttl: int = None, negative_ttl: int = None,
+                 cache_size: int = None, nameservers: List[str] = None):
+        self.timeout = config.HOSTNAME_TIMEOUT if timeout is None else timeout
+        self.ttl = config.HOSTNAME_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = config.HOSTNAME_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.cache_size = cache_size or config.HOSTNAME_CACHE_SIZE
+        self.nameservers = nameservers if nameservers is not None else read_nameservers()
+        # mac -> (ip, hostname or None, expires)
+        self.cache: 'OrderedDict[str, Tuple[str, Optional[str], float]]' = OrderedDict()
+        self.pending: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def resolve(self, mac: str, ip: str) -> Optional[str]:
+        """Cached name for a device; on a miss a lookup is started and None returned"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self.cache.get(mac)
+            if cached and cached[0] == ip and cached[2] > now:
+                self.cache.move_to_end(mac)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            if mac in self.pending:
+                return None
+            self.pending[mac] = ip
+        asyncio.run_coroutine_threadsafe(self._lookup(mac, ip), get_background_loop())
+        return None
+
+    def _store(self, mac: str, ip: str, hostname: Optional[str]) -> None:
+        expires = time.monotonic() + (self.ttl if hostname else self.negative_ttl)
+        with self._lock:
+            self.pending.pop(mac, None)
+            self.cache[mac] = (ip, hostname, expires)
+            self.cache.move_to_end(mac)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    async def _lookup(self, mac: str, ip: str) -> None:
+        hostname = None
+        try:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(config.HOSTNAME_MAX_CONCURRENT)
+            async with self._semaphore:
+                hostname = await self.lookup(ip)
+            if hostname:
+                logger.debug(f"Resolved {mac} ({ip}) to {hostname}")
+        except Exception as e:
+            logger.debug(f"Hostname lookup for {ip} failed: {e}")
+        finally:
+            self._store(mac, ip, hostname)
+
+    async def lookup(self, ip: str) -> Optional[str]:
+        """Query reverse DNS, mDNS and NetBIOS at once; the first that answers in that order wins"""
+        names = await asyncio.gather(self._reverse_dns(ip), self._mdns(ip), self._netbios(ip),
+                                     return_exceptions=True)
+        for name in names:
+            if isinstance(name, str) and name:
+                return name.rstrip('.')
+        return None
+
+    async def _ptr(self, server: str, port: int, ip: str) -> Optional[str]:
+        query_id = random.getrandbits(16)
+        packet = build_query(ipaddress.ip_address(ip).reverse_pointer, query_id, QTYPE_PTR)
+        try:
+            data = await query_udp(server, port, packet, query_id, self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        names = parse_ptr_answers(data)
+        return names[0] if names else None
+
+    async def _reverse_dns(self, ip: str) -> Optional[str]:
+        if not self.nameservers:
+            return None
+        return await self._ptr(self.nameservers[0], 53, ip)
+
+    async def _mdns(self, ip: str) -> Optional[str]:
+        """Legacy unicast query straight to the device's mDNS responder"""
+        return await self._ptr(ip, MDNS_PORT, ip)
+
+    async def _netbios(self, ip: str) -> Optional[str]:
+        query_id = random.getrandbits(16)
+        try:
+            data = await query_udp(ip, NETBIOS_PORT, build_nbstat_query(query_id), query_id, self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        return parse_nbstat_response(data)
@@ -0,0 +1,299 @@
+"""
+ICMP Probe Engine for Pi Wireless Monitor
+Asynchronous echo probes multiplexed over one unprivileged ICMP socket per address family
+"""
+import os
+import sys
+import math
+import time
+import errno
+import socket
+import struct
+import asyncio
+import platform
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src import parsers
+from src.utils.background_loop import get_background_loop, run_on, run_sync
+
+logger = get_logger('icmp')
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+_ICMP_HEADER = struct.Struct('!BBHHH')
+_PAYLOAD_SIZE = 56  # same as ping's default
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def summarize(host: str, address: Optional[str], packets: List[Optional[float]]) -> Dict:
+    """Build a probe result from per-packet RTTs in ms (None for a lost packet)"""
+    packets = [round(rtt, 3) if rtt is not None else None for rtt in packets]
+    rtts = [rtt for rtt in packets if rtt is not None]
+    transmitted = len(packets)
+    result = {
+        'host': host,
+        'address': address,
+        'transmitted': transmitted,
+        'received': len(rtts),
+        'packet_loss': round((transmitted - len(rtts)) * 100.0 / transmitted, 1) if transmitted else 100.0,
+        'packets': packets,
+        'rtts': rtts,
+        'min': None,
+        'avg': None,
+        'max': None,
+        'mdev': None,
+        'jitter': None
+    }
+    if rtts:
+        avg = sum(rtts) / len(rtts)
+        result['min'] = round(min(rtts), 3)
+        result['avg'] = round(avg, 3)
+        result['max'] = round(max(rtts), 3)
+        result['mdev'] = round(math.sqrt(sum((rtt - avg) ** 2 for rtt in rtts) / len(rtts)), 3)
+        # Mean difference between consecutive RTTs (RFC 3550 style jitter)
+        diffs = [abs(b - a) for a, b in zip(rtts, rtts[1:])]
+        result['jitter'] = round(sum(diffs) / len(diffs), 3) if diffs else 0.0
+    return result
+
+
+class _IcmpSocket:
+    """One ICMP socket for an address family, demultiplexing replies by sequence number"""
+
+    def __init__(self, family: int, loop: asyncio.AbstractEventLoop):
+        self.family = family
+        self.loop = loop
+        self.raw = False
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            # Unprivileged ping socket (needs net.ipv4.ping_group_range to include our gid);
+            # the kernel sets the identifier and only delivers our own replies
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+        except PermissionError:
+            # Raw socket when running with CAP_NET_RAW
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        self.sock.setblocking(False)
+        self.ident = os.getpid() & 0xffff
+        self.sequence = 0
+        self.pending: Dict[int, Tuple[asyncio.Future, str, float]] = {}
+        self.request_type = ICMP_ECHO_REQUEST if family == socket.AF_INET else ICMPV6_ECHO_REQUEST
+        self.reply_type = ICMP_ECHO_REPLY if family == socket.AF_INET else ICMPV6_ECHO_REPLY
+        loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _next_sequence(self) -> int:
+        for _ in range(0x10000):
+            self.sequence = (self.sequence + 1) & 0xffff
+            if self.sequence not in self.pending:
+                return self.sequence
+        raise OSError(errno.ENOBUFS, "No free ICMP sequence numbers")
+
+    def send(self, address: str) -> Tuple[int, asyncio.Future]:
+        """Send one echo request and return its sequence number and reply future"""
+        seq = self._next_sequence()
+        payload = struct.pack('!d', time.monotonic()).ljust(_PAYLOAD_SIZE, b'\x00')
+        header = _ICMP_HEADER.pack(self.request_type, 0, 0, self.ident, seq)
+        if self.family == socket.AF_INET:
+            # ICMPv6 checksums cover a pseudo-header and are filled in by the kernel
+            header = _ICMP_HEADER.pack(self.request_type, 0, _checksum(header + payload), self.ident, seq)
+
+        future = self.loop.create_future()
+        self.pending[seq] = (future, address, time.monotonic())
+        try:
+            self.sock.sendto(header + payload, (address, 0))
+        except OSError:
+            del self.pending[seq]
+            raise
+        return seq, future
+
+    def discard(self, seq: int) -> None:
+        self.pending.pop(seq, None)
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data, source = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"ICMP receive error: {e}")
+                return
+
+            received = time.monotonic()
+            if self.raw and self.family == socket.AF_INET:
+                # Raw IPv4 sockets include the IP header
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < _ICMP_HEADER.size:
+                continue
+
+            msg_type, _, _, ident, seq = _ICMP_HEADER.unpack_from(data)
+            if msg_type != self.reply_type or (self.raw and ident != self.ident):
+                continue
+
+            entry = self.pending.pop(seq, None)
+            if entry is None:
+                continue
+            future, address, sent = entry
+            if source[0] != address:
+                # Not the host we asked; put it back and keep waiting
+                self.pending[seq] = entry
+                continue
+            if not future.done():
+                future.set_result((received - sent) * 1000.0)
+
+    def close(self) -> None:
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        for future, _, _ in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+
+class IcmpEngine:
+    """Shared asynchronous ping engine.
+
+    Runs on the given event loop, or on the shared background loop when used from
+    synchronous code. Falls back to the ping command when ICMP sockets are not permitted.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.loop = loop
+        self._sockets: Dict[int, _IcmpSocket] = {}
+        self._unavailable = set()
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.loop is None:
+                self.loop = get_background_loop()
+            return self.loop
+
+    def _socket(self, family: int) -> Optional[_IcmpSocket]:
+        if family in self._unavailable:
+            return None
+        icmp = self._sockets.get(family)
+        if icmp is None:
+            try:
+                icmp = self._sockets[family] = _IcmpSocket(family, self.loop)
+                logger.info(f"ICMP engine using {'raw' if icmp.raw else 'datagram'} "
+                            f"{'IPv4' if family == socket.AF_INET else 'IPv6'} socket")
+            except OSError as e:
+                logger.warning(f"ICMP sockets unavailable, falling back to the ping command: {e}")
+                self._unavailable.add(family)
+                return None
+        return icmp
+
+    async def _resolve(self, host: str) -> Tuple[int, str]:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_DGRAM)
+        family, _, _, _, sockaddr = infos[0]
+        return family, sockaddr[0]
+
+    async def _ping(self, host: str, count: int, timeout: float, interval: float) -> Dict:
+        try:
+            family, address = await self._resolve(host)
+        except (socket.gaierror, OSError) as e:
+            logger.debug(f"Could not resolve {host}: {e}")
+            return summarize(host, None, [None] * count)
+
+        icmp = self._socket(family)
+        if icmp is None:
+            return await self._ping_command(host, address, count, timeout, interval)
+
+        async def probe(index: int) -> Optional[float]:
+            await asyncio.sleep(index * interval)
+            try:
+                seq, future = icmp.send(address)
+            except OSError as e:
+                logger.debug(f"ICMP send to {address} failed: {e}")
+                return None
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                icmp.discard(seq)
+
+        packets = await asyncio.gather(*(probe(i) for i in range(count)))
+        return summarize(host, address, list(packets))
+
+    async def _ping_command(self, host: str, address: str, count: int, timeout: float,
+                            interval: float) -> Dict:
+        """Fallback probe through the system ping command"""
+        if platform.system().lower() == 'windows':
+            cmd = ['ping', '-n', str(count), '-w', str(int(timeout * 1000)), address]
+        else:
+            cmd = ['ping', '-c', str(count), '-W', str(max(1, int(math.ceil(timeout)))), address]
+            if interval >= 0.2:
+                cmd[1:1] = ['-i', str(interval)]
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            stdout, _ = await process.communicate()
+        except OSError as e:
+            logger.error(f"ping command failed: {e}")
+            return summarize(host, address, [None] * count)
+
+        ping = parsers.parse_ping(stdout)
+        packets = ping['rtts'] + [None] * max(0, count - len(ping['rtts']))
+        return summarize(host, address, packets)
+
+    async def ping(self, host: str, count: int = 4, timeout: float = 1.0,
+                   interval: float = None) -> Dict:
+        """Send `count` echo requests to host and summarize RTTs, loss and jitter"""
+        interval = config.PING_INTERVAL if interval is None else interval
+        return await run_on(self._ping(host, count, timeout, interval), self._ensure_loop())
+
+    async def ping_many(self, hosts: List[str], count: int = 4, timeout: float = 1.0,
+                        interval: float = None) -> Dict[str, Dict]:
+        """Probe several hosts concurrently"""
+        results = await asyncio.gather(*(self.ping(host, count, timeout, interval) for host in hosts))
+        return dict(zip(hosts, results))
+
+    def ping_sync(self, host: str, count: int = 4, timeout: float = 1.0,
+                  interval: float = None) -> Dict:
+        """Blocking wrapper for synchronous callers"""
+        return self.ping_many_sync([host], count, timeout, interval)[host]
+
+    def ping_many_sync(self, hosts: List[str], count: int = 4, timeout: float = 1.0,
+                       interval: float = None) -> Dict[str, Dict]:
+        """Blocking wrapper around ping_many for synchronous callers"""
+        interval = config.PING_INTERVAL if interval is None else interval
+        return run_sync(self.ping_many(hosts, count, timeout, interval),
+                        timeout=count * interval + timeout + 30, loop=self._ensure_loop())
+
+    def close(self) -> None:
+        for icmp in self._sockets.values():
+            if self.loop.is_running():
+                self.loop.call_soon_threadsafe(icmp.close)
+            else:
+                icmp.close()
+        self._sockets.clear()
+
+
+_engine: Optional[IcmpEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_icmp_engine() -> IcmpEngine:
+    """Process-wide engine shared by the scanner, metrics collector and service monitor"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IcmpEngine()
+        return _engine
@@ -0,0 +1,218 @@
+"""
+Link Event Listener for Pi Wireless Monitor
+Subscribes to nl80211 MLME and rtnetlink link multicast groups for connection changes
+"""
+import os
+import sys
+import time
+import errno
+import asyncio
+import queue
+import struct
+from typing import Dict, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.link_reader import LinkReader
+from src.nl80211 import (
+    Nl80211Client, Nl80211Error, NetlinkSocket, iter_messages, parse_attrs,
+    attr_u16, attr_u32, attr_string, format_mac,
+    NL80211_ATTR_IFINDEX, NL80211_ATTR_MAC, NL80211_ATTR_REASON_CODE,
+    NL80211_ATTR_STATUS_CODE, NL80211_ATTR_DISCONNECTED_BY_AP,
+    NL80211_ATTR_FRAME, NL80211_CMD_AUTHENTICATE, NL80211_CMD_ASSOCIATE,
+    NL80211_CMD_DEAUTHENTICATE, NL80211_CMD_DISASSOCIATE,
+    NL80211_CMD_CONNECT, NL80211_CMD_ROAM, NL80211_CMD_DISCONNECT
+)
+
+logger = get_logger('link_events')
+
+# rtnetlink
+NETLINK_ROUTE = 0
+RTNLGRP_LINK = 1
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+IFLA_IFNAME = 3
+IFF_RUNNING = 0x40
+
+_IFINFOMSG = struct.Struct('=BxHiII')
+
+# Management frame header: frame control, duration, addr1, addr2, addr3 (BSSID), sequence
+_MGMT_BSSID = slice(16, 22)
+_MGMT_BODY = 24
+
+_NL80211_EVENTS = {
+    # SME in wpa_supplicant (mac80211 drivers)
+    NL80211_CMD_AUTHENTICATE: 'authenticate',
+    NL80211_CMD_ASSOCIATE: 'associate',
+    NL80211_CMD_DEAUTHENTICATE: 'deauthenticate',
+    NL80211_CMD_DISASSOCIATE: 'disassociate',
+    # SME in the driver or firmware (e.g. brcmfmac)
+    NL80211_CMD_CONNECT: 'connect',
+    NL80211_CMD_ROAM: 'roam',
+    NL80211_CMD_DISCONNECT: 'disconnect'
+}
+
+
+class LinkEventListener:
+    """Queues (re)association, roam, disconnect and link up/down events for one interface.
+
+    Sockets are read on the shared background loop; consumers on that loop await
+    next(), others take events with get() on their own thread. Each event
+    carries the wall-clock time it was received.
+    """
+
+    def __init__(self, interface: str):
+        self.interface = interface
+        self.events: 'queue.Queue[Dict]' = queue.Queue(maxsize=1000)
+        self.nl80211: Optional[Nl80211Client] = None
+        self.rtnl: Optional[NetlinkSocket] = None
+        self.running = False
+        self._waiter: Optional[asyncio.Future] = None
+        self.ifindex = self._ifindex()
+        # Operational state before the first rtnetlink message
+        self.link_up = LinkReader(interface).operstate() == 'up'
+
+    def _ifindex(self) -> int:
+        try:
+            with open(f'/sys/class/net/{self.interface}/ifindex') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def start(self) -> bool:
+        """Subscribe to whatever event sources the kernel offers; False when none are available"""
+        try:
+            self.nl80211 = Nl80211Client(record_path=config.NL80211_RECORD_PATH or None)
+            self.nl80211.subscribe('mlme')
+        except (Nl80211Error, OSError) as e:
+            logger.info(f"nl80211 connection events unavailable: {e}")
+            if self.nl80211:
+                self.nl80211.close()
+            self.nl80211 = None
+
+        try:
+            self.rtnl = NetlinkSocket(NETLINK_ROUTE)
+            self.rtnl.add_membership(RTNLGRP_LINK)
+        except OSError as e:
+            logger.info(f"rtnetlink link events unavailable: {e}")
+            self.rtnl = None
+
+        if not self.nl80211 and not self.rtnl:
+            return False
+
+        loop = get_background_loop()
+        if self.nl80211:
+            loop.call_soon_threadsafe(loop.add_reader, self.nl80211.sock.fileno(), self._read_nl80211)
+        if self.rtnl:
+            loop.call_soon_threadsafe(loop.add_reader, self.rtnl.fileno(), self._read_rtnl)
+        self.running = True
+        sources = ', '.join(name for name, sock in (('nl80211', self.nl80211), ('rtnetlink', self.rtnl)) if sock)
+        logger.info(f"Listening for {self.interface} link events via {sources}")
+        return True
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self.running = False
+        loop = get_background_loop()
+
+        def close():
+            if self.nl80211:
+                loop.remove_reader(self.nl80211.sock.fileno())
+                self.nl80211.close()
+            if self.rtnl:
+                loop.remove_reader(self.rtnl.fileno())
+                self.rtnl.close()
+
+        loop.call_soon_threadsafe(close)
+
+    def get(self, timeout: float = None) -> Optional[Dict]:
+        """Next event, waiting up to timeout seconds"""
+        try:
+            return self.events.get(timeout=timeout) if timeout else self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    async def next(self) -> Dict:
+        """Wait for the next event; only from a coroutine on the shared background loop"""
+        while True:
+            event = self.get()
+            if event is not None:
+                return event
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+    def _emit(self, kind: str, **details) -> None:
+        event = {'type': kind, 'interface': self.interface, 'timestamp': time.time()}
+        event.update(details)
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            logger.warning(f"Dropping {kind} event: queue full")
+            return
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        logger.debug(f"Link event: {event}")
+
+    def _read_nl80211(self) -> None:
+        try:
+            while True:
+                event = self.nl80211.next_event(0)
+                if event is None:
+                    return
+                cmd, attrs = event
+                kind = _NL80211_EVENTS.get(cmd)
+                ifindex = attr_u32(attrs, NL80211_ATTR_IFINDEX)
+                if kind is None or (self.ifindex and ifindex is not None and ifindex != self.ifindex):
+                    continue
+                mac = attrs.get(NL80211_ATTR_MAC)
+                status = attr_u16(attrs, NL80211_ATTR_STATUS_CODE)
+                frame = attrs.get(NL80211_ATTR_FRAME)
+                if frame and len(frame) >= _MGMT_BODY:
+                    mac = mac or frame[_MGMT_BSSID]
+                    if kind == 'associate' and len(frame) >= _MGMT_BODY + 4:
+                        # Association response body: capability, status code, AID
+                        status = struct.unpack_from('<H', frame, _MGMT_BODY + 2)[0]
+                if kind in ('connect', 'associate') and status:
+                    kind = 'connect_failed'
+                self._emit(kind,
+                           bssid=format_mac(mac) if mac else None,
+                           status=status,
+                           reason=attr_u16(attrs, NL80211_ATTR_REASON_CODE),
+                           by_ap=NL80211_ATTR_DISCONNECTED_BY_AP in attrs)
+        except OSError as e:
+            logger.error(f"Error reading nl80211 events: {e}")
+
+    def _read_rtnl(self) -> None:
+        try:
+            while True:
+                datagram = self.rtnl.recv(0)
+                if datagram is None:
+                    return
+                for msg_type, _flags, _seq, payload in iter_messages(datagram):
+                    if msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(payload) >= _IFINFOMSG.size:
+                        self._link_message(msg_type, payload)
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                # Events were lost; the safety-net poll catches up
+                logger.warning("rtnetlink event buffer overrun")
+            else:
+                logger.error(f"Error reading rtnetlink events: {e}")
+
+    def _link_message(self, msg_type: int, payload: bytes) -> None:
+        _, _, index, flags, _ = _IFINFOMSG.unpack_from(payload)
+        name = attr_string(parse_attrs(payload[_IFINFOMSG.size:]), IFLA_IFNAME)
+        if name != self.interface:
+            return
+        # The interface may have been re-created with a new index
+        self.ifindex = index
+        up = msg_type == RTM_NEWLINK and bool(flags & IFF_RUNNING)
+        if up != self.link_up:
+            self.link_up = up
+            self._emit('link_up' if up else 'link_down')
@@ -0,0 +1,149 @@
+"""
+Link Reader for Pi Wireless Monitor
+Subprocess-free link metrics from /proc and /sys over persistent file descriptors
+"""
+import os
+import sys
+import errno
+import fcntl
+import socket
+import struct
+from typing import Dict, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import get_logger
+from src import parsers
+
+logger = get_logger('link_reader')
+
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+
+# Counters exposed under /sys/class/net/<if>/statistics
+STATISTICS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+              'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped')
+
+
+class PersistentFile:
+    """A /proc or /sys file opened once and re-read from offset 0 on every read"""
+
+    __slots__ = ('path', 'fd')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+
+    def read(self) -> bytes:
+        """Return the current contents, reopening once if the descriptor went stale"""
+        for attempt in (0, 1):
+            try:
+                if self.fd is None:
+                    self.fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+                chunks = []
+                offset = 0
+                while True:
+                    chunk = os.pread(self.fd, 4096, offset)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    offset += len(chunk)
+                return b''.join(chunks)
+            except OSError as e:
+                # The interface was removed and re-added: reopen the new file
+                self.close()
+                if attempt or e.errno not in (errno.ENODEV, errno.EBADF, errno.ESTALE):
+                    raise
+        return b''
+
+    def close(self) -> None:
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+class LinkReader:
+    """Reads interface addresses, state, counters, wireless link quality and the default gateway"""
+
+    def __init__(self, interface: str):
+        self.interface = interface
+        self.sys_path = f'/sys/class/net/{interface}'
+        self._files: Dict[str, PersistentFile] = {}
+        self._sock: Optional[socket.socket] = None
+
+    def _file(self, path: str) -> PersistentFile:
+        handle = self._files.get(path)
+        if handle is None:
+            handle = self._files[path] = PersistentFile(path)
+        return handle
+
+    def _read_sys(self, name: str) -> Optional[bytes]:
+        try:
+            return self._file(f'{self.sys_path}/{name}').read().strip()
+        except OSError:
+            return None
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.sys_path)
+
+    def mac_address(self) -> str:
+        value = self._read_sys('address')
+        return value.decode() if value else ''
+
+    def operstate(self) -> str:
+        """Kernel operational state such as 'up', 'down' or 'dormant'"""
+        value = self._read_sys('operstate')
+        return value.decode() if value else 'unknown'
+
+    def _ifreq_address(self, request_code: int) -> str:
+        try:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            request = struct.pack('256s', self.interface.encode()[:15])
+            reply = fcntl.ioctl(self._sock.fileno(), request_code, request)
+            return socket.inet_ntoa(reply[20:24])
+        except OSError:
+            return ''
+
+    def ip_address(self) -> str:
+        """First IPv4 address of the interface, or '' when none is configured"""
+        return self._ifreq_address(SIOCGIFADDR)
+
+    def netmask(self) -> str:
+        """Netmask of the first IPv4 address, or '' when none is configured"""
+        return self._ifreq_address(SIOCGIFNETMASK)
+
+    def counters(self) -> Dict[str, int]:
+        """Cumulative traffic, error and drop counters from /sys/class/net/<if>/statistics"""
+        counters = {}
+        for name in STATISTICS:
+            value = self._read_sys(f'statistics/{name}')
+            if value:
+                counters[name] = int(value)
+        return counters
+
+    def wireless(self) -> Dict:
+        """Link quality, signal and noise from /proc/net/wireless ({} when not associated)"""
+        try:
+            return parsers.parse_proc_net_wireless(self._file('/proc/net/wireless').read(),
+                                                   self.interface)
+        except OSError:
+            return {}
+
+    def default_gateway(self) -> Optional[str]:
+        """Default gateway from /proc/net/route, preferring a route via this interface"""
+        try:
+            return parsers.parse_proc_net_route(self._file('/proc/net/route').read(), self.interface)
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
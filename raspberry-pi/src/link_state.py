@@ -0,0 +1,208 @@
+"""
+Link State Snapshot for Pi Wireless Monitor
+Gathers interface, association and link-quality state in one pass and caches it
+"""
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+from typing import Dict, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src import parsers
+from src.link_reader import LinkReader
+from src.nl80211 import Nl80211Client, Nl80211Error, frequency_to_channel
+
+logger = get_logger('link_state')
+
+# nmcli columns needed by every consumer of the snapshot
+NMCLI_FIELDS = ['ACTIVE', 'SSID', 'BSSID', 'CHAN', 'FREQ', 'RATE', 'SIGNAL', 'MODE']
+
+
+class LinkState:
+    """Point-in-time view of one wireless interface"""
+
+    __slots__ = ('interface', 'taken_at', 'address', 'association', 'wireless',
+                 'operstate', 'gateway', 'source')
+
+    def __init__(self, interface: str):
+        self.interface = interface
+        self.taken_at = time.monotonic()
+        self.address: Dict = {}        # mac_address / ip_address
+        self.association: Dict = {}    # ssid, bssid, channel, frequency, signal_strength, rx_rate, tx_rate
+        self.wireless: Dict = {}       # /proc/net/wireless columns
+        self.operstate = 'unknown'
+        self.gateway: Optional[str] = None
+        self.source: Optional[str] = None  # where the association came from
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.taken_at
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.association)
+
+
+class LinkStateProvider:
+    """Hands out LinkState snapshots, re-gathering only once the cached one is older than the TTL.
+
+    Values come from /proc, /sys and nl80211; ip, nmcli and iwconfig are only run
+    when those sources are unavailable.
+    """
+
+    def __init__(self, interface: str, ttl: float = None):
+        self.interface = interface
+        self.ttl = config.LINK_STATE_TTL if ttl is None else ttl
+        self.reader = LinkReader(interface)
+        self.snapshot: Optional[LinkState] = None
+        self.hits = 0
+        self.misses = 0
+        self._nl80211: Optional[Nl80211Client] = None
+        self._nl80211_unavailable = False
+        self._lock = threading.Lock()
+
+    def get(self, max_age: float = None) -> LinkState:
+        """Return the cached snapshot if it is fresh enough, otherwise take a new one"""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self.snapshot is not None and self.snapshot.age <= max_age:
+                self.hits += 1
+                return self.snapshot
+            self.misses += 1
+            self.snapshot = self._gather()
+            return self.snapshot
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot, e.g. after a known link change"""
+        with self._lock:
+            self.snapshot = None
+
+    def close(self) -> None:
+        self.reader.close()
+        if self._nl80211:
+            self._nl80211.close()
+            self._nl80211 = None
+
+    def _gather(self) -> LinkState:
+        """Collect addresses, the active association and link quality in one pass"""
+        state = LinkState(self.interface)
+
+        try:
+            if self.reader.exists():
+                state.address = {
+                    'mac_address': self.reader.mac_address(),
+                    'ip_address': self.reader.ip_address()
+                }
+                state.operstate = self.reader.operstate()
+            else:
+                output = self._run(['ip', 'addr', 'show', self.interface])
+                if output:
+                    state.address = parsers.parse_ip_addr(output)
+
+            state.wireless = self.reader.wireless()
+            state.gateway = self.reader.default_gateway()
+
+            association = self._nl80211_association()
+            if association is not None:
+                state.source = 'nl80211'
+            else:
+                association = self._nmcli_association()
+                state.source = 'nmcli'
+                # Fall back to iwconfig only when NetworkManager reports no association
+                if not association:
+                    association = self._iwconfig_association()
+                    state.source = 'iwconfig'
+
+            state.association = association
+            if association and association.get('signal_strength') is None and state.wireless:
+                association['signal_strength'] = state.wireless['signal_level']
+
+        except Exception as e:
+            logger.error(f"Error gathering link state: {e}")
+
+        return state
+
+    def _run(self, cmd) -> Optional[bytes]:
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=10)
+            if result.returncode == 0:
+                return result.stdout
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            logger.debug(f"{cmd[0]} unavailable: {e}")
+        return None
+
+    def _nl80211_association(self) -> Optional[Dict]:
+        """Association from nl80211 interface and station info; None when nl80211 is unusable"""
+        if self._nl80211_unavailable:
+            return None
+        if self._nl80211 is None:
+            try:
+                self._nl80211 = Nl80211Client()
+            except (Nl80211Error, OSError) as e:
+                logger.info(f"nl80211 link state unavailable, using nmcli/iwconfig: {e}")
+                self._nl80211_unavailable = True
+                return None
+
+        try:
+            ifindex = socket.if_nametoindex(self.interface)
+            interface = self._nl80211.get_interface(ifindex)
+            if not interface.get('ssid'):
+                return {}
+            station = self._nl80211.get_station(ifindex) or {}
+            return {
+                'ssid': interface['ssid'],
+                'bssid': station.get('bssid'),
+                'channel': interface['channel'],
+                'frequency': interface['frequency'],
+                'signal_strength': station.get('signal_strength'),
+                'rx_rate': station.get('rx_rate'),
+                'tx_rate': station.get('tx_rate')
+            }
+        except (Nl80211Error, OSError) as e:
+            logger.debug(f"nl80211 link state query failed: {e}")
+            return None
+
+    def _nmcli_association(self) -> Dict:
+        output = self._run(['nmcli', '-t', '-f', ','.join(NMCLI_FIELDS), 'device', 'wifi', 'list'])
+        active = parsers.parse_nmcli_active(output, NMCLI_FIELDS) if output else None
+        if not active:
+            return {}
+
+        channel = parsers.parse_number(active['CHAN'])
+        frequency = parsers.parse_number(active['FREQ'])
+        signal = parsers.parse_number(active['SIGNAL'])
+        rate = parsers.parse_number(active['RATE'])
+        return {
+            'ssid': active['SSID'] if active['SSID'] != '--' else '',
+            'bssid': active['BSSID'] if active['BSSID'] and active['BSSID'] != '--' else None,
+            'channel': int(channel) if channel is not None else None,
+            'frequency': int(frequency) if frequency is not None else None,
+            # nmcli gives signal as percentage, convert to approximate dBm
+            'signal_strength': int(signal / 2 - 100) if signal is not None else None,
+            'rx_rate': rate,
+            'tx_rate': rate
+        }
+
+    def _iwconfig_association(self) -> Dict:
+        output = self._run(['iwconfig', self.interface])
+        parsed = parsers.parse_iwconfig(output) if output else {}
+        if not parsed:
+            return {}
+
+        rate = parsed.get('bit_rate')
+        frequency = parsed.get('frequency')
+        return {
+            'ssid': parsed['ssid'],
+            'bssid': parsed.get('bssid'),
+            'channel': frequency_to_channel(frequency) if frequency else None,
+            'frequency': frequency,
+            'signal_strength': parsed.get('signal_strength'),
+            'rx_rate': rate,
+            'tx_rate': rate
+        }
@@ -6,7 +6,6 @@ import os
 import sys
 import time
 import signal
-import schedule
 import asyncio
 import threading
 from datetime import datetime
@@ -16,13 +15,26 @@ from typing import Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import config
 from src.utils.logger import get_logger
+from src.utils.single_flight import SingleFlight
 from src.scanner import WiFiScanner
 from src.metrics import MetricsCollector
 from src.api_client import APIClient
+from src.data_publisher import DeltaPublisher
+from src.scan_interval import AdaptiveScanInterval
+from src.scheduler import JobScheduler
+from src.supervisor import TaskSupervisor
+from src.device_tracker import DeviceTracker
+from src.hostname_resolver import HostnameResolver
+from src.link_events import LinkEventListener
+from src.roaming import RoamTracker
+from src.bssid_history import BssidHistory
 from src.service_monitor import ServiceMonitor
 
 logger = get_logger('main')
 
+# Scheduler group of the jobs that use the scan radio
+RADIO = ('radio',)
+
 
 class PiWirelessMonitor:
     """Main monitoring application"""
@@ -32,15 +44,28 @@ class PiWirelessMonitor:
         self.scanner = None
         self.metrics_collector = None
         self.api_client = None
+        self.data_publisher = None
+        self.scan_interval = None
+        self.scheduler = None
+        self.supervisor = None
+        self.scan_job = None
+        self.device_job = None
+        # Network scans, device scans and metrics uploads never run twice at once
+        self.flights = SingleFlight()
+        self.bssid_history = None
         self.service_monitor = None
         self.last_deep_scan = None
-        self.service_monitor_task = None
-        self.loop = None
+        self.link_events = None
+        self.roam_tracker = None
         
         # Connection state tracking for incident detection
         self.last_connection_status = None
         self.connection_lost_time = None
         self.active_incidents = {}  # Track active incidents by type
+        # Link event handling and the connection poll run on different job threads
+        self.connection_lock = threading.Lock()
+        # Set once stop() has run; start() returns when it is
+        self.stopped = threading.Event()
         
         # Set up signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -58,17 +83,33 @@ class PiWirelessMonitor:
             
             # Initialize scanner
             self.scanner = WiFiScanner(config.MONITOR_INTERFACE)
+            self.link_events = LinkEventListener(self.scanner.interface)
+            if config.ROAM_TRACKING_ENABLED:
+                self.roam_tracker = RoamTracker(self.scanner.interface)
+                self.roam_tracker.start()
             
             # Initialize metrics collector
-            self.metrics_collector = MetricsCollector()
+            self.metrics_collector = MetricsCollector(scanner=self.scanner)
             
             # Initialize API client
             self.api_client = APIClient()
             
+            # Initialize network delta publisher
+            self.data_publisher = DeltaPublisher()
+            self.scan_interval = AdaptiveScanInterval()
+            
+            # Initialize device presence tracker
+            self.device_tracker = DeviceTracker()
+            self.hostname_resolver = HostnameResolver()
+            
+            # Initialize on-device BSSID history
+            self.bssid_history = BssidHistory()
+            
             # Initialize service monitor
             self.service_monitor = ServiceMonitor(
                 monitor_id=config.MONITOR_ID,
-                server_url=config.SERVER_URL
+                server_url=config.SERVER_URL,
+                session=self.api_client.session
             )
             
             # Test server connection
@@ -94,17 +135,26 @@ class PiWirelessMonitor:
             logger.exception(f"Initialization failed: {e}")
             return False
     
-    def run_network_scan(self):
+    def run_network_scan(self, max_age: float = 0):
+        """Run a network scan, joining one in progress or skipping if one finished within max_age seconds"""
+        self.flights.do('network_scan', self._run_network_scan, max_age)
+    
+    def _run_network_scan(self):
         """Run a network scan and send results"""
         try:
             logger.debug("Starting network scan...")
             
             # Scan for networks
             networks = self.scanner.scan_networks()
+            self.bssid_history.record_scan(networks)
+            if config.SCAN_ADAPTIVE_ENABLED:
+                interval = self.scan_interval.observe(networks)
+                if self.scan_job:
+                    self.scan_job.interval = round(interval)
             
             # Send to server
             if networks:
-                self.api_client.send_network_data(networks)
+                self.publish_networks(networks)
             
             # Check for weak signals
             for network in networks:
@@ -122,7 +172,35 @@ class PiWirelessMonitor:
         except Exception as e:
             logger.error(f"Network scan failed: {e}")
     
-    def run_device_scan(self):
+    def publish_networks(self, networks):
+        """Upload a scan as a keyframe or as a delta against the last upload"""
+        report = self.scan_interval.build_report() if config.SCAN_ADAPTIVE_ENABLED else None
+        if not config.NETWORK_DELTA_ENABLED:
+            if self.api_client.send_network_data(networks, scan_interval=report) and report:
+                self.scan_interval.commit(report)
+            return
+        
+        next_scan = self.scan_job.interval if self.scan_job else config.SCAN_INTERVAL
+        update = self.data_publisher.build_update(networks, next_interval=next_scan)
+        if not update['networks']:
+            # Removals ride along with the next upload that has rows to send
+            logger.debug(f"No significant network changes ({update['unchanged_count']} unchanged)")
+            return
+        
+        if self.api_client.send_network_data(update['networks'],
+                                             keyframe=update['keyframe'],
+                                             removed=update['removed'],
+                                             sequence=update['sequence'],
+                                             scan_interval=report):
+            self.data_publisher.commit(update)
+            if report:
+                self.scan_interval.commit(report)
+    
+    def run_device_scan(self, max_age: float = 0):
+        """Run a device scan, joining one in progress or skipping if one finished within max_age seconds"""
+        self.flights.do('device_scan', self._run_device_scan, max_age)
+    
+    def _run_device_scan(self):
         """Run a device scan and send results"""
         try:
             if not config.COLLECT_CONNECTED_DEVICES:
@@ -132,15 +210,48 @@ class PiWirelessMonitor:
             
             # Scan for connected devices
             devices = self.scanner.scan_connected_devices()
+            self.device_tracker.observe(devices)
+            if config.HOSTNAME_RESOLUTION_ENABLED:
+                self.attach_hostnames()
             
             # Send to server
-            if devices:
-                self.api_client.send_device_data(devices)
+            self.publish_devices()
                 
         except Exception as e:
             logger.error(f"Device scan failed: {e}")
     
-    def collect_metrics(self):
+    def attach_hostnames(self):
+        """Attach cached names; lookups for the rest run in the background for later scans"""
+        tracker = self.device_tracker
+        for mac in sorted(tracker.online):
+            entry = tracker.get(mac)
+            hostname = self.hostname_resolver.resolve(mac, entry['ip'])
+            if hostname:
+                tracker.update_device(mac, hostname=hostname)
+    
+    def publish_devices(self):
+        """Upload joined and changed devices, plus a compact roster when one is due"""
+        tracker = self.device_tracker
+        if not config.DEVICE_DELTA_ENABLED:
+            rows = [tracker.row(tracker.get(mac)) for mac in sorted(tracker.online)]
+            self.api_client.send_device_data(rows)
+            return
+        
+        next_scan = self.device_job.interval if self.device_job else config.SCAN_INTERVAL * 2
+        update = tracker.build_update(next_interval=next_scan)
+        if not update['devices'] and not update['events']:
+            logger.debug(f"No device changes ({update['online_count']} online)")
+            return
+        
+        if self.api_client.send_device_data(update['devices'], roster=update['roster'],
+                                            events=update['events']):
+            tracker.commit(update)
+    
+    def collect_metrics(self, max_age: float = 0):
+        """Collect metrics, joining a collection in progress or skipping if one finished within max_age seconds"""
+        self.flights.do('metrics', self._collect_metrics, max_age)
+    
+    def _collect_metrics(self):
         """Collect performance metrics and send results"""
         try:
             logger.debug("Collecting metrics...")
@@ -148,8 +259,14 @@ class PiWirelessMonitor:
             # Collect all metrics
             metrics = self.metrics_collector.collect_all_metrics()
             
+            # Roams since the last upload ride along with the metrics
+            roams = self.roam_tracker.build_batch() if self.roam_tracker else None
+            if roams:
+                metrics['network']['roaming'] = roams
+            
             # Send to server
-            self.api_client.send_metrics(metrics)
+            if self.api_client.send_metrics(metrics) and roams:
+                self.roam_tracker.commit(roams)
             
             # Check thresholds and send alerts
             alerts = self.metrics_collector.check_thresholds(metrics)
@@ -160,9 +277,10 @@ class PiWirelessMonitor:
             logger.error(f"Metrics collection failed: {e}")
     
     def send_heartbeat(self):
-        """Send heartbeat to server"""
+        """Send heartbeat to server, with job timings"""
         try:
-            self.api_client.send_heartbeat()
+            self.scheduler.write_stats()
+            self.api_client.send_heartbeat(jobs=self.scheduler.summary())
         except Exception as e:
             logger.error(f"Heartbeat failed: {e}")
     
@@ -187,6 +305,10 @@ class PiWirelessMonitor:
     
     def monitor_ssid_connection(self):
         """Monitor current SSID connection status"""
+        with self.connection_lock:
+            self._poll_ssid_connection()
+    
+    def _poll_ssid_connection(self):
         try:
             # Get current SSID connection status
             connection_status = self.scanner.get_current_ssid_connection_status()
@@ -219,13 +341,75 @@ class PiWirelessMonitor:
         except Exception as e:
             logger.error(f"SSID connection monitoring failed: {e}")
     
-    def _detect_connection_incidents(self, current_status):
-        """Detect and report connection incidents"""
+    async def consume_link_events(self):
+        """Hand kernel link events to the job executor as they arrive, in order"""
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self.link_events.next()
+            await loop.run_in_executor(None, self.process_link_events, event)
+    
+    def process_link_events(self, event):
+        """Handle an event and every one queued behind it"""
+        while event is not None:
+            with self.connection_lock:
+                self.handle_link_event(event)
+            event = self.link_events.get()
+    
+    def handle_link_event(self, event):
+        """Feed a kernel connect/disconnect/roam/link event into roam tracking and incident detection"""
+        try:
+            event_time = datetime.utcfromtimestamp(event['timestamp'])
+            if event['type'] == 'authenticate':
+                # Start of a roam (or connection); association follows
+                if self.roam_tracker:
+                    self.roam_tracker.observe_event(event)
+                return
+            
+            self.scanner.link_state.invalidate()
+            last = self.last_connection_status or {}
+            
+            if event['type'] in ('disconnect', 'deauthenticate', 'disassociate', 'connect_failed', 'link_down'):
+                status = {
+                    'ssid': last.get('ssid'),
+                    'bssid': None,
+                    'connection_status': 'disconnected',
+                    'timestamp': event_time.isoformat()
+                }
+            else:
+                association = self.scanner.link_state.get().association
+                if not association:
+                    return
+                status = {
+                    'ssid': association['ssid'] or 'Hidden',
+                    'bssid': association['bssid'],
+                    'signal_strength': association['signal_strength'],
+                    'channel': association['channel'],
+                    'frequency': association['frequency'],
+                    'connection_status': 'connected',
+                    'timestamp': event_time.isoformat()
+                }
+            
+            logger.info(f"Link event {event['type']} on {event['interface']} "
+                        f"(bssid {event.get('bssid')}, reason {event.get('reason')})")
+            if self.roam_tracker:
+                self.roam_tracker.observe_event(event, status['ssid'])
+            self._detect_connection_incidents(status, event_time)
+            self.last_connection_status = status
+            
+        except Exception as e:
+            logger.error(f"Error handling link event: {e}")
+    
+    def _detect_connection_incidents(self, current_status, event_time=None):
+        """Detect and report connection incidents (event_time: when the change happened, if known)"""
         try:
             current_ssid = current_status.get('ssid')
             current_state = current_status.get('connection_status')
             current_signal = current_status.get('signal_strength', 0)
             
+            # BSSID changes under the same SSID are roams, not incidents
+            if self.roam_tracker:
+                self.roam_tracker.observe_status(current_status)
+            
             # If we have previous state, compare for incidents
             if self.last_connection_status:
                 last_ssid = self.last_connection_status.get('ssid')
@@ -238,11 +422,11 @@ class PiWirelessMonitor:
                         'previousSignalStrength': last_signal,
                         'signalStrength': current_signal,
                         'threshold': 'connection_lost'
-                    })
+                    }, event_time)
                 
                 # Detect reconnection (resolve disconnection incident)
                 elif last_state in ['disconnected', 'connecting'] and current_state == 'connected':
-                    self._resolve_incident('disconnection', current_ssid)
+                    self._resolve_incident('disconnection', current_ssid, event_time)
                 
                 # Detect significant signal drop
                 elif (current_state == 'connected' and last_state == 'connected' and 
@@ -285,19 +469,20 @@ class PiWirelessMonitor:
         except Exception as e:
             logger.error(f"Error handling connection loss: {e}")
     
-    def _report_incident(self, incident_type, ssid, trigger_condition):
+    def _report_incident(self, incident_type, ssid, trigger_condition, detected_at=None):
         """Report a new incident to the server"""
         try:
             if incident_type in self.active_incidents:
                 logger.debug(f"Incident {incident_type} already active for SSID {ssid}")
                 return
             
+            detected_at = detected_at or datetime.utcnow()
             incident_data = {
                 'ssid': ssid,
                 'incidentType': incident_type,
                 'triggerCondition': trigger_condition,
                 'metadata': {
-                    'detectionTime': datetime.utcnow().isoformat(),
+                    'detectionTime': detected_at.isoformat(),
                     'monitorLocation': config.MONITOR_LOCATION,
                     'previousConnection': self.last_connection_status
                 }
@@ -309,7 +494,7 @@ class PiWirelessMonitor:
             if success:
                 self.active_incidents[incident_type] = {
                     'ssid': ssid,
-                    'start_time': datetime.utcnow(),
+                    'start_time': detected_at,
                     'trigger': trigger_condition
                 }
                 logger.warning(f"Reported {incident_type} incident for SSID '{ssid}': {trigger_condition.get('threshold', 'unknown')}")
@@ -319,18 +504,19 @@ class PiWirelessMonitor:
         except Exception as e:
             logger.error(f"Error reporting incident: {e}")
     
-    def _resolve_incident(self, incident_type, ssid):
+    def _resolve_incident(self, incident_type, ssid, resolved_at=None):
         """Resolve an active incident"""
         try:
             if incident_type not in self.active_incidents:
                 return
             
+            resolved_at = resolved_at or datetime.utcnow()
             incident = self.active_incidents[incident_type]
-            duration = (datetime.utcnow() - incident['start_time']).total_seconds()
+            duration = (resolved_at - incident['start_time']).total_seconds()
             
             resolution_data = {
                 'duration': duration,
-                'resolvedAt': datetime.utcnow().isoformat(),
+                'resolvedAt': resolved_at.isoformat(),
                 'finalStatus': 'resolved'
             }
             
@@ -346,66 +532,85 @@ class PiWirelessMonitor:
         except Exception as e:
             logger.error(f"Error resolving incident: {e}")
     
-    def run_deep_scan(self):
-        """Run a comprehensive scan (less frequent)"""
+    def run_throughput_test(self):
+        """Run a throughput test when one is due"""
+        try:
+            self.scanner.throughput.run_if_due()
+        except Exception as e:
+            logger.error(f"Throughput test failed: {e}")
+    
+    async def run_deep_scan(self):
+        """Run a comprehensive scan (less frequent); the device scan runs alongside the radio work"""
         try:
             logger.info("Running deep scan...")
             self.last_deep_scan = datetime.utcnow()
-            
-            # Run all scans
-            self.run_network_scan()
-            self.run_device_scan()
-            self.collect_metrics()
-            
-            # If bandwidth test is enabled, run it during deep scan
-            if config.BANDWIDTH_TEST_ENABLED:
-                bandwidth_metrics = self.metrics_collector.measure_bandwidth()
-                self.api_client.send_metrics({'bandwidth': bandwidth_metrics})
+            started = time.monotonic()
+            durations = {}
+            
+            async def timed(name, func, groups=()):
+                begun = time.monotonic()
+                await self.scheduler.run_blocking(func, config.DEEP_SCAN_REUSE_AGE, groups=groups)
+                durations[name] = time.monotonic() - begun
+            
+            # Each collector takes the same groups as its regular job, then joins a run
+            # in progress or is skipped if one just finished
+            await asyncio.gather(timed('networks', self.run_network_scan, RADIO),
+                                 timed('devices', self.run_device_scan),
+                                 timed('metrics', self.collect_deep_metrics, RADIO))
+            
+            logger.info(f"Deep scan finished in {time.monotonic() - started:.1f}s ("
+                        + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in durations.items()) + ")")
                 
         except Exception as e:
             logger.error(f"Deep scan failed: {e}")
     
+    def collect_deep_metrics(self, max_age: float = 0):
+        """Collect metrics, then run the bandwidth test if enabled (after, so it cannot skew latency)"""
+        self.collect_metrics(max_age)
+        if config.BANDWIDTH_TEST_ENABLED:
+            bandwidth_metrics = self.metrics_collector.measure_bandwidth()
+            self.api_client.send_metrics({'bandwidth': bandwidth_metrics})
+    
     def setup_schedule(self):
         """Set up the monitoring schedule"""
-        # Regular network scan
-        schedule.every(config.SCAN_INTERVAL).seconds.do(self.run_network_scan)
+        self.scheduler = JobScheduler()
+        every = self.scheduler.every
+        
+        # Jobs in the same group never overlap. Network scans and metrics share the
+        # 'radio' group: a scan takes the radio off-channel (skewing latency probes)
+        # and both use its nl80211 socket. The deep scan takes the same groups.
+        
+        # Regular network scan; the adaptive interval retunes the job after every scan
+        scan_interval = round(self.scan_interval.interval) if config.SCAN_ADAPTIVE_ENABLED else config.SCAN_INTERVAL
+        self.scan_job = every(scan_interval, self.run_network_scan, groups=RADIO, overrun='coalesce')
         
         # Device scan (if enabled)
         if config.COLLECT_CONNECTED_DEVICES:
-            schedule.every(config.SCAN_INTERVAL * 2).seconds.do(self.run_device_scan)
+            self.device_job = every(config.SCAN_INTERVAL * 2, self.run_device_scan, overrun='coalesce')
         
         # Metrics collection
-        schedule.every(60).seconds.do(self.collect_metrics)
+        every(60, self.collect_metrics, groups=RADIO, overrun='coalesce')
         
         # Heartbeat
-        schedule.every(30).seconds.do(self.send_heartbeat)
+        every(30, self.send_heartbeat)
         # WiFi connection info
-        schedule.every(60).seconds.do(self.send_wifi_connection_info)
+        every(60, self.send_wifi_connection_info)
         
-        # SSID connection monitoring (more frequent for stability tracking)
-        schedule.every(30).seconds.do(self.monitor_ssid_connection)
+        # SSID connection monitoring; with kernel link events it is only a safety net
+        poll_interval = config.CONNECTION_POLL_INTERVAL
+        if config.LINK_EVENTS_ENABLED and self.link_events.start():
+            poll_interval = config.CONNECTION_SAFETY_POLL_INTERVAL
+        every(poll_interval, self.monitor_ssid_connection)
         
         # Deep scan
-        schedule.every(config.DEEP_SCAN_INTERVAL).seconds.do(self.run_deep_scan)
-        
-        logger.info(f"Schedule configured - Network scan: {config.SCAN_INTERVAL}s, "
-                   f"Deep scan: {config.DEEP_SCAN_INTERVAL}s")
-    
-    def run_service_monitor_async(self):
-        """Run service monitor in a separate thread with its own event loop"""
-        async def run_monitor():
-            await self.service_monitor.run()
+        every(config.DEEP_SCAN_INTERVAL, self.run_deep_scan)
         
-        # Create new event loop for this thread
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
+        # Throughput tests (the tester enforces its own interval and daily budget)
+        if config.THROUGHPUT_TEST_ENABLED:
+            every(60, self.run_throughput_test, deadline=0)
         
-        try:
-            self.loop.run_until_complete(run_monitor())
-        except Exception as e:
-            logger.error(f"Service monitor error: {e}")
-        finally:
-            self.loop.close()
+        logger.info(f"Schedule configured - Network scan: {scan_interval}s, "
+                   f"Deep scan: {config.DEEP_SCAN_INTERVAL}s")
     
     def start(self):
         """Start the monitoring service"""
@@ -416,41 +621,42 @@ class PiWirelessMonitor:
         self.running = True
         self.setup_schedule()
         
-        # Start service monitor in a separate thread
-        self.service_monitor_task = threading.Thread(
-            target=self.run_service_monitor_async,
-            daemon=True
-        )
-        self.service_monitor_task.start()
-        logger.info("Service monitor started in background")
+        # Everything runs on the shared event loop: scheduled jobs, the service
+        # monitor and link event handling, with blocking work on one executor
+        self.supervisor = TaskSupervisor(self.scheduler.loop, self.scheduler.executor)
+        self.supervisor.spawn('service_monitor', self.service_monitor.run)
+        if self.link_events.running:
+            self.supervisor.spawn('link_events', self.consume_link_events)
+        if self.api_client.outbox:
+            self.supervisor.spawn('upload_queue', self.api_client.outbox.drain)
         
-        # Run initial scans
+        # Run initial scans without holding up the schedule
         logger.info("Running initial scans...")
-        self.run_deep_scan()
+        self.scheduler.submit(self.run_deep_scan)
+        self.scheduler.start()
         
         logger.info("Monitoring service started")
         
-        # Main loop
-        while self.running:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                time.sleep(5)
+        # This thread only waits for a shutdown signal
+        self.stopped.wait()
     
     def stop(self):
         """Stop the monitoring service"""
+        if self.stopped.is_set():
+            return
         logger.info("Stopping monitoring service...")
         self.running = False
         
-        # Stop the async event loop if it's running
-        if self.loop and self.loop.is_running():
-            self.loop.call_soon_threadsafe(self.loop.stop)
-        
-        # Wait for service monitor thread to finish
-        if self.service_monitor_task and self.service_monitor_task.is_alive():
-            self.service_monitor_task.join(timeout=5)
+        # Tasks first, so nothing submits new jobs, then the jobs and their executor
+        if self.supervisor:
+            self.supervisor.stop()
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.link_events:
+            self.link_events.stop()
+        if self.roam_tracker:
+            self.roam_tracker.stop()
+        self.stopped.set()
 
 
 def main():
@@ -5,8 +5,6 @@ Measures network performance metrics like latency, packet loss, and bandwidth
 import os
 import sys
 import subprocess
-import re
-import statistics
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
@@ -17,6 +15,10 @@ import speedtest
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import config
 from src.utils.logger import get_logger
+from src import parsers
+from src.icmp import get_icmp_engine
+from src.dns_probe import DnsProber
+from src.traffic_sampler import TrafficSampler
 
 logger = get_logger('metrics')
 
@@ -24,8 +26,12 @@ logger = get_logger('metrics')
 class MetricsCollector:
     """Collects network performance metrics"""
     
-    def __init__(self):
+    def __init__(self, scanner=None):
         logger.info("Metrics Collector initialized")
+        self.scanner = scanner
+        self.dns_prober = DnsProber()
+        self.traffic_samplers: Dict[str, TrafficSampler] = {}
+        self._traffic_sampler(config.MONITOR_INTERFACE)
         self.speedtest_client = None
         if config.BANDWIDTH_TEST_ENABLED:
             try:
@@ -48,6 +54,13 @@ class MetricsCollector:
             ping_results = self.measure_latency(config.PING_TEST_HOST)
             metrics['network']['ping'] = ping_results
         
+        # DNS latency per resolver
+        if config.DNS_TEST_ENABLED:
+            try:
+                metrics['network']['dns'] = self.dns_prober.probe_sync()
+            except Exception as e:
+                logger.error(f"Error probing DNS: {e}")
+        
         # Bandwidth test (only if enabled as it takes time)
         if config.BANDWIDTH_TEST_ENABLED and self.speedtest_client:
             bandwidth_results = self.measure_bandwidth()
@@ -57,10 +70,20 @@ class MetricsCollector:
         interface_stats = self.get_interface_stats(config.MONITOR_INTERFACE)
         metrics['network']['interface'] = interface_stats
         
+        # Utilization of the channel the interface is tuned to, as of the last network
+        # scan (sampling here too would shorten the scan's measurement window)
+        if config.COLLECT_CHANNEL_INFO and self.scanner:
+            try:
+                channel = self.scanner.channel_survey.in_use()
+                if channel:
+                    metrics['network']['channel_utilization'] = channel
+            except Exception as e:
+                logger.error(f"Error reading channel survey: {e}")
+        
         return metrics
     
     def measure_latency(self, host: str, count: int = 10) -> Dict:
-        """Measure latency using ping"""
+        """Measure latency with ICMP echo probes"""
         results = {
             'host': host,
             'packets_sent': count,
@@ -70,80 +93,36 @@ class MetricsCollector:
             'max': 0.0,
             'avg': 0.0,
             'stddev': 0.0,
+            'jitter': 0.0,
             'raw_times': []
         }
         
         try:
             logger.debug(f"Pinging {host} with {count} packets...")
             
-            # Use system ping command
-            result = subprocess.run(
-                ['ping', '-c', str(count), '-W', '1', host],
-                capture_output=True,
-                text=True,
-                timeout=count + 5
-            )
+            ping = get_icmp_engine().ping_sync(host, count=count, timeout=1)
+            results.update({
+                'packets_received': ping['received'],
+                'packet_loss': ping['packet_loss'],
+                'min': ping['min'] or 0.0,
+                'max': ping['max'] or 0.0,
+                'avg': ping['avg'] or 0.0,
+                'stddev': ping['mdev'] or 0.0,
+                'jitter': ping['jitter'] or 0.0,
+                'raw_times': ping['rtts']
+            })
             
-            if result.returncode == 0:
-                results = self._parse_ping_output(result.stdout, host, count)
+            if ping['received']:
                 logger.debug(f"Ping results: {results['avg']}ms avg, {results['packet_loss']}% loss")
             else:
-                logger.error(f"Ping failed: {result.stderr}")
-                results['packet_loss'] = 100.0
+                logger.error(f"Ping to {host} failed: no replies")
                 
-        except subprocess.TimeoutExpired:
-            logger.error(f"Ping to {host} timed out")
-            results['packet_loss'] = 100.0
         except Exception as e:
             logger.exception(f"Error measuring latency: {e}")
             results['packet_loss'] = 100.0
         
         return results
     
-    def _parse_ping_output(self, output: str, host: str, count: int) -> Dict:
-        """Parse ping command output"""
-        results = {
-            'host': host,
-            'packets_sent': count,
-            'packets_received': 0,
-            'packet_loss': 0.0,
-            'min': 0.0,
-            'max': 0.0,
-            'avg': 0.0,
-            'stddev': 0.0,
-            'raw_times': []
-        }
-        
-        # Extract RTT times
-        rtt_pattern = r'time=(\d+\.?\d*) ms'
-        rtt_matches = re.findall(rtt_pattern, output)
-        results['raw_times'] = [float(t) for t in rtt_matches]
-        results['packets_received'] = len(results['raw_times'])
-        
-        # Calculate packet loss
-        if results['packets_sent'] > 0:
-            results['packet_loss'] = ((results['packets_sent'] - results['packets_received']) 
-                                    / results['packets_sent']) * 100
-        
-        # Extract statistics
-        stats_pattern = r'min/avg/max/(?:mdev|stddev) = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms'
-        stats_match = re.search(stats_pattern, output)
-        
-        if stats_match:
-            results['min'] = float(stats_match.group(1))
-            results['avg'] = float(stats_match.group(2))
-            results['max'] = float(stats_match.group(3))
-            results['stddev'] = float(stats_match.group(4))
-        elif results['raw_times']:
-            # Calculate manually if regex fails
-            results['min'] = min(results['raw_times'])
-            results['max'] = max(results['raw_times'])
-            results['avg'] = statistics.mean(results['raw_times'])
-            if len(results['raw_times']) > 1:
-                results['stddev'] = statistics.stdev(results['raw_times'])
-        
-        return results
-    
     def measure_bandwidth(self) -> Dict:
         """Measure bandwidth using speedtest"""
         results = {
@@ -192,38 +171,26 @@ class MetricsCollector:
         
         return results
     
+    def _traffic_sampler(self, interface: str) -> TrafficSampler:
+        """Counter sampler for an interface, started on first use"""
+        sampler = self.traffic_samplers.get(interface)
+        if sampler is None:
+            sampler = self.traffic_samplers[interface] = TrafficSampler(interface)
+            sampler.start()
+        return sampler
+    
     def get_interface_stats(self, interface: str) -> Dict:
-        """Get network interface statistics"""
+        """Get network interface throughput, error and drop rates for the reporting window"""
         stats = {
             'interface': interface,
             'is_up': False,
             'speed': 0,  # Mbps
-            'bytes_sent': 0,
-            'bytes_recv': 0,
-            'packets_sent': 0,
-            'packets_recv': 0,
-            'errors_in': 0,
-            'errors_out': 0,
-            'drops_in': 0,
-            'drops_out': 0
+            'samples': 0
         }
         
         try:
-            # Get interface stats
-            net_stats = psutil.net_io_counters(pernic=True)
-            
-            if interface in net_stats:
-                nic_stats = net_stats[interface]
-                stats.update({
-                    'bytes_sent': nic_stats.bytes_sent,
-                    'bytes_recv': nic_stats.bytes_recv,
-                    'packets_sent': nic_stats.packets_sent,
-                    'packets_recv': nic_stats.packets_recv,
-                    'errors_in': nic_stats.errin,
-                    'errors_out': nic_stats.errout,
-                    'drops_in': nic_stats.dropin,
-                    'drops_out': nic_stats.dropout
-                })
+            # Rates since the previous report, from the counter sampler
+            stats.update(self._traffic_sampler(interface).report())
             
             # Check if interface is up
             addrs = psutil.net_if_addrs()
@@ -294,14 +261,11 @@ class MetricsCollector:
             # Try vcgencmd (Raspberry Pi specific)
             result = subprocess.run(
                 ['vcgencmd', 'measure_temp'],
-                capture_output=True,
-                text=True
+                capture_output=True
             )
             
             if result.returncode == 0:
-                temp_match = re.search(r'temp=([\d.]+)', result.stdout)
-                if temp_match:
-                    return float(temp_match.group(1))
+                return parsers.parse_vcgencmd_temp(result.stdout)
                     
         except Exception:
             pass
@@ -326,6 +290,20 @@ class MetricsCollector:
                     'value': ping_data['packet_loss']
                 })
         
+        # Check channel utilization
+        if 'network' in metrics and 'channel_utilization' in metrics['network']:
+            channel = metrics['network']['channel_utilization']
+            
+            if channel['utilization'] > config.MAX_CHANNEL_UTILIZATION:
+                alerts.append({
+                    'type': 'channel_utilization',
+                    'severity': 'medium',
+                    'message': f"High channel utilization on channel {channel['channel']}: "
+                               f"{channel['utilization']}%",
+                    'threshold': config.MAX_CHANNEL_UTILIZATION,
+                    'value': channel['utilization']
+                })
+        
         # Check system metrics
         if 'system' in metrics:
             system = metrics['system']
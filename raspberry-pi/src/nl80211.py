@@ -0,0 +1,640 @@
+"""
+nl80211 Netlink Client for Pi Wireless Monitor
+Talks to the kernel wireless stack directly over a generic-netlink socket
+"""
+import os
+import sys
+import errno
+import select
+import socket
+import struct
+import time
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import get_logger
+
+logger = get_logger('nl80211')
+
+# Netlink protocol constants
+NETLINK_GENERIC = 16
+SOL_NETLINK = 270
+NETLINK_ADD_MEMBERSHIP = 1
+
+NLM_F_REQUEST = 0x01
+NLM_F_MULTI = 0x02
+NLM_F_ACK = 0x04
+NLM_F_DUMP = 0x300
+
+NLMSG_ERROR = 0x02
+NLMSG_DONE = 0x03
+
+NLA_F_NESTED = 0x8000
+NLA_TYPE_MASK = 0x3fff
+
+# Generic netlink controller
+GENL_ID_CTRL = 0x10
+CTRL_CMD_GETFAMILY = 3
+CTRL_ATTR_FAMILY_ID = 1
+CTRL_ATTR_FAMILY_NAME = 2
+CTRL_ATTR_MCAST_GROUPS = 7
+CTRL_ATTR_MCAST_GRP_NAME = 1
+CTRL_ATTR_MCAST_GRP_ID = 2
+
+# nl80211 commands
+NL80211_CMD_GET_INTERFACE = 5
+NL80211_CMD_GET_STATION = 17
+NL80211_CMD_GET_SCAN = 32
+NL80211_CMD_TRIGGER_SCAN = 33
+NL80211_CMD_NEW_SCAN_RESULTS = 34
+NL80211_CMD_SCAN_ABORTED = 35
+NL80211_CMD_AUTHENTICATE = 37
+NL80211_CMD_ASSOCIATE = 38
+NL80211_CMD_DEAUTHENTICATE = 39
+NL80211_CMD_DISASSOCIATE = 40
+NL80211_CMD_CONNECT = 46
+NL80211_CMD_ROAM = 47
+NL80211_CMD_DISCONNECT = 48
+NL80211_CMD_GET_SURVEY = 50
+
+# nl80211 attributes
+NL80211_ATTR_IFINDEX = 3
+NL80211_ATTR_MAC = 6
+NL80211_ATTR_STA_INFO = 21
+NL80211_ATTR_WIPHY_FREQ = 38
+NL80211_ATTR_SCAN_FREQUENCIES = 44
+NL80211_ATTR_SCAN_SSIDS = 45
+NL80211_ATTR_BSS = 47
+NL80211_ATTR_FRAME = 51
+NL80211_ATTR_SSID = 52
+NL80211_ATTR_REASON_CODE = 54
+NL80211_ATTR_DISCONNECTED_BY_AP = 71
+NL80211_ATTR_STATUS_CODE = 72
+NL80211_ATTR_SURVEY_INFO = 84
+
+# nl80211 BSS attributes (nested in NL80211_ATTR_BSS)
+NL80211_BSS_BSSID = 1
+NL80211_BSS_FREQUENCY = 2
+NL80211_BSS_CAPABILITY = 5
+NL80211_BSS_INFORMATION_ELEMENTS = 6
+NL80211_BSS_SIGNAL_MBM = 7
+NL80211_BSS_STATUS = 9
+NL80211_BSS_SEEN_MS_AGO = 10
+NL80211_BSS_BEACON_IES = 11
+
+# nl80211 station attributes (nested in NL80211_ATTR_STA_INFO)
+NL80211_STA_INFO_INACTIVE_TIME = 1
+NL80211_STA_INFO_RX_BYTES = 2
+NL80211_STA_INFO_TX_BYTES = 3
+NL80211_STA_INFO_SIGNAL = 7
+NL80211_STA_INFO_TX_BITRATE = 8
+NL80211_STA_INFO_RX_BITRATE = 14
+NL80211_STA_INFO_CONNECTED_TIME = 16
+
+# nl80211 rate attributes (nested in the station bitrate attributes)
+NL80211_RATE_INFO_BITRATE = 1      # u16, units of 100 kbit/s
+NL80211_RATE_INFO_BITRATE32 = 5    # u32, units of 100 kbit/s
+
+# nl80211 survey attributes (nested in NL80211_ATTR_SURVEY_INFO)
+NL80211_SURVEY_INFO_FREQUENCY = 1
+NL80211_SURVEY_INFO_NOISE = 2
+NL80211_SURVEY_INFO_IN_USE = 3
+NL80211_SURVEY_INFO_TIME = 4
+NL80211_SURVEY_INFO_TIME_BUSY = 5
+NL80211_SURVEY_INFO_TIME_RX = 7
+NL80211_SURVEY_INFO_TIME_TX = 8
+
+# 802.11 information element IDs
+WLAN_EID_SSID = 0
+WLAN_EID_DS_PARAMS = 3
+WLAN_EID_RSN = 48
+WLAN_EID_VENDOR_SPECIFIC = 221
+
+WLAN_CAPABILITY_PRIVACY = 0x0010
+WPA_OUI_TYPE = b'\x00\x50\xf2\x01'
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_GENLMSGHDR = struct.Struct('=BBH')
+_NLATTR = struct.Struct('=HH')
+_NLMSGERR = struct.Struct('=i')
+
+# Recorded fixtures are a sequence of length-prefixed datagrams
+_RECORD_LEN = struct.Struct('<I')
+
+
+class Nl80211Error(Exception):
+    """Raised when an nl80211 request fails or the kernel returns an error"""
+
+    def __init__(self, message: str, code: int = 0):
+        super().__init__(message)
+        self.errno = code
+
+
+def _align(length: int) -> int:
+    """Round a length up to the 4-byte netlink alignment"""
+    return (length + 3) & ~3
+
+
+def pack_attr(attr_type: int, payload: bytes) -> bytes:
+    """Encode a single netlink attribute with padding"""
+    length = _NLATTR.size + len(payload)
+    return _NLATTR.pack(length, attr_type) + payload + b'\x00' * (_align(length) - length)
+
+
+def pack_u32(attr_type: int, value: int) -> bytes:
+    """Encode a u32 netlink attribute"""
+    return pack_attr(attr_type, struct.pack('=I', value))
+
+
+def pack_string(attr_type: int, value: str) -> bytes:
+    """Encode a NUL-terminated string netlink attribute"""
+    return pack_attr(attr_type, value.encode() + b'\x00')
+
+
+def parse_attrs(data: bytes) -> Dict[int, bytes]:
+    """Decode a run of netlink attributes into a type -> payload mapping"""
+    attrs = {}
+    offset = 0
+    end = len(data)
+    while offset + _NLATTR.size <= end:
+        length, attr_type = _NLATTR.unpack_from(data, offset)
+        if length < _NLATTR.size:
+            break
+        attrs[attr_type & NLA_TYPE_MASK] = data[offset + _NLATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def parse_attr_list(data: bytes) -> List[bytes]:
+    """Decode a nested attribute array, ignoring the index types"""
+    return list(parse_attrs(data).values())
+
+
+def attr_u8(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return value[0] if value else default
+
+
+def attr_s8(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return struct.unpack_from('=b', value)[0] if value else default
+
+
+def attr_u16(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return struct.unpack_from('=H', value)[0] if value and len(value) >= 2 else default
+
+
+def attr_u32(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return struct.unpack_from('=I', value)[0] if value and len(value) >= 4 else default
+
+
+def attr_s32(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return struct.unpack_from('=i', value)[0] if value and len(value) >= 4 else default
+
+
+def attr_u64(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return struct.unpack_from('=Q', value)[0] if value and len(value) >= 8 else default
+
+
+def attr_string(attrs: Dict[int, bytes], key: int, default=None):
+    value = attrs.get(key)
+    return value.split(b'\x00', 1)[0].decode(errors='replace') if value is not None else default
+
+
+def iter_messages(datagram: bytes) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Yield (type, flags, seq, payload) for every netlink message in a datagram"""
+    offset = 0
+    end = len(datagram)
+    while offset + _NLMSGHDR.size <= end:
+        length, msg_type, flags, seq, _pid = _NLMSGHDR.unpack_from(datagram, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, flags, seq, datagram[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def build_genl_message(family: int, cmd: int, flags: int, seq: int,
+                       attrs: bytes = b'', version: int = 1) -> bytes:
+    """Build a complete generic-netlink request"""
+    payload = _GENLMSGHDR.pack(cmd, version, 0) + attrs
+    return _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), family, flags, seq, 0) + payload
+
+
+def format_mac(raw: bytes) -> str:
+    """Format 6 raw bytes as an upper-case colon separated MAC address"""
+    return ':'.join(f'{b:02X}' for b in raw[:6])
+
+
+def frequency_to_channel(freq_mhz: int) -> int:
+    """Map a centre frequency in MHz to its 802.11 channel number"""
+    if freq_mhz == 2484:
+        return 14
+    if 2412 <= freq_mhz < 2484:
+        return (freq_mhz - 2407) // 5
+    if freq_mhz == 5935:
+        return 2
+    if 5955 <= freq_mhz <= 7115:
+        return (freq_mhz - 5950) // 5
+    if 4910 <= freq_mhz <= 4980:
+        # 4.9 GHz public safety band: channels 182-196 count from 4000 MHz
+        return (freq_mhz - 4000) // 5
+    if 5000 <= freq_mhz <= 5885:
+        return (freq_mhz - 5000) // 5
+    return 0
+
+
+def channel_to_frequency(channel: int, band: str = None) -> int:
+    """Map an 802.11 channel number to its centre frequency in MHz; channels up to 14
+    are taken as 2.4 GHz unless band is '6GHz'"""
+    if band == '6GHz':
+        return 5935 if channel == 2 else 5950 + channel * 5
+    if channel == 14:
+        return 2484
+    if 1 <= channel <= 13:
+        return 2407 + channel * 5
+    if 182 <= channel <= 196:
+        return 4000 + channel * 5
+    return 5000 + channel * 5
+
+
+def parse_information_elements(ies: bytes) -> Dict:
+    """Extract SSID, channel and WPA/RSN markers from raw 802.11 IEs"""
+    info = {}
+    offset = 0
+    end = len(ies)
+    while offset + 2 <= end:
+        eid = ies[offset]
+        length = ies[offset + 1]
+        body = ies[offset + 2:offset + 2 + length]
+        offset += 2 + length
+        if len(body) < length:
+            break
+
+        if eid == WLAN_EID_SSID and 'ssid' not in info:
+            info['ssid'] = body.rstrip(b'\x00').decode('utf-8', errors='replace')
+        elif eid == WLAN_EID_DS_PARAMS and length >= 1:
+            info['channel'] = body[0]
+        elif eid == WLAN_EID_RSN:
+            info.setdefault('wpa_version', []).append('WPA2')
+        elif eid == WLAN_EID_VENDOR_SPECIFIC and body[:4] == WPA_OUI_TYPE:
+            info.setdefault('wpa_version', []).append('WPA')
+    return info
+
+
+def parse_bss(bss: Dict[int, bytes]) -> Dict:
+    """Convert nested NL80211_ATTR_BSS attributes into a raw network record"""
+    network = {}
+
+    bssid = bss.get(NL80211_BSS_BSSID)
+    if bssid:
+        network['bssid'] = format_mac(bssid)
+
+    freq = attr_u32(bss, NL80211_BSS_FREQUENCY)
+    if freq:
+        network['frequency'] = freq / 1000.0
+        network['channel'] = frequency_to_channel(freq)
+
+    signal_mbm = attr_s32(bss, NL80211_BSS_SIGNAL_MBM)
+    if signal_mbm is not None:
+        signal = round(signal_mbm / 100)
+        network['signal_strength'] = signal
+        # Same scale iwlist reports for dBm capable drivers
+        network['quality'] = max(0, min(70, signal + 110))
+        network['quality_max'] = 70
+
+    capability = attr_u16(bss, NL80211_BSS_CAPABILITY)
+    if capability is not None:
+        network['encryption'] = bool(capability & WLAN_CAPABILITY_PRIVACY)
+
+    ies = bss.get(NL80211_BSS_INFORMATION_ELEMENTS) or bss.get(NL80211_BSS_BEACON_IES)
+    if ies:
+        ie_info = parse_information_elements(ies)
+        if 'channel' in ie_info and not network.get('channel'):
+            network['channel'] = ie_info['channel']
+        if 'ssid' in ie_info:
+            network['ssid'] = ie_info['ssid']
+        if 'wpa_version' in ie_info:
+            network['wpa_version'] = ie_info['wpa_version']
+
+    seen_ms_ago = attr_u32(bss, NL80211_BSS_SEEN_MS_AGO)
+    if seen_ms_ago is not None:
+        network['last_seen_ms'] = seen_ms_ago
+
+    status = attr_u32(bss, NL80211_BSS_STATUS)
+    if status is not None:
+        network['associated'] = True
+
+    return network
+
+
+def parse_survey(info: Dict[int, bytes]) -> Dict:
+    """Convert nested NL80211_ATTR_SURVEY_INFO attributes into a survey record"""
+    return {
+        'frequency': attr_u32(info, NL80211_SURVEY_INFO_FREQUENCY),
+        'noise': attr_s8(info, NL80211_SURVEY_INFO_NOISE),
+        'in_use': NL80211_SURVEY_INFO_IN_USE in info,
+        'active_ms': attr_u64(info, NL80211_SURVEY_INFO_TIME),
+        'busy_ms': attr_u64(info, NL80211_SURVEY_INFO_TIME_BUSY),
+        'rx_ms': attr_u64(info, NL80211_SURVEY_INFO_TIME_RX),
+        'tx_ms': attr_u64(info, NL80211_SURVEY_INFO_TIME_TX)
+    }
+
+
+def parse_bitrate(rate: Optional[bytes]) -> Optional[float]:
+    """Decode a nested rate-info attribute into Mbit/s"""
+    if not rate:
+        return None
+    info = parse_attrs(rate)
+    value = attr_u32(info, NL80211_RATE_INFO_BITRATE32)
+    if value is None:
+        value = attr_u16(info, NL80211_RATE_INFO_BITRATE)
+    return value / 10.0 if value is not None else None
+
+
+def parse_station(attrs: Dict[int, bytes]) -> Dict:
+    """Convert a station reply (the AP we are associated with) into a link record"""
+    info = parse_attrs(attrs.get(NL80211_ATTR_STA_INFO, b''))
+    mac = attrs.get(NL80211_ATTR_MAC)
+    return {
+        'bssid': format_mac(mac) if mac else None,
+        'signal_strength': attr_s8(info, NL80211_STA_INFO_SIGNAL),
+        'rx_rate': parse_bitrate(info.get(NL80211_STA_INFO_RX_BITRATE)),
+        'tx_rate': parse_bitrate(info.get(NL80211_STA_INFO_TX_BITRATE)),
+        'rx_bytes': attr_u32(info, NL80211_STA_INFO_RX_BYTES),
+        'tx_bytes': attr_u32(info, NL80211_STA_INFO_TX_BYTES),
+        'inactive_ms': attr_u32(info, NL80211_STA_INFO_INACTIVE_TIME),
+        'connected_time': attr_u32(info, NL80211_STA_INFO_CONNECTED_TIME)
+    }
+
+
+class NetlinkSocket:
+    """Raw netlink socket, optionally recording received datagrams to a fixture file"""
+
+    def __init__(self, protocol: int = NETLINK_GENERIC, record_path: str = None):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, protocol)
+        self.sock.bind((0, 0))
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.record_file = open(record_path, 'ab') if record_path else None
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def send(self, data: bytes) -> None:
+        self.sock.send(data)
+
+    def recv(self, timeout: float = None) -> Optional[bytes]:
+        """Receive one datagram, returning None on timeout"""
+        if timeout is not None:
+            ready, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+            if not ready:
+                return None
+        data = self.sock.recv(65536)
+        if self.record_file:
+            self.record_file.write(_RECORD_LEN.pack(len(data)) + data)
+            self.record_file.flush()
+        return data
+
+    def add_membership(self, group: int) -> None:
+        self.sock.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, group)
+
+    def close(self) -> None:
+        self.sock.close()
+        if self.record_file:
+            self.record_file.close()
+
+
+class ReplayNetlinkSocket:
+    """Replays datagrams recorded by NetlinkSocket for offline testing"""
+
+    def __init__(self, fixture_path: str):
+        with open(fixture_path, 'rb') as f:
+            data = f.read()
+        self.datagrams = []
+        offset = 0
+        while offset + _RECORD_LEN.size <= len(data):
+            (length,) = _RECORD_LEN.unpack_from(data, offset)
+            offset += _RECORD_LEN.size
+            self.datagrams.append(data[offset:offset + length])
+            offset += length
+        self.sent = []
+
+    def fileno(self) -> int:
+        return -1
+
+    def send(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    def recv(self, timeout: float = None) -> Optional[bytes]:
+        if not self.datagrams:
+            return None
+        return self.datagrams.pop(0)
+
+    def add_membership(self, group: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class Nl80211Client:
+    """Minimal nl80211 client for scans over generic netlink"""
+
+    def __init__(self, sock=None, fixture_path: str = None, record_path: str = None):
+        if sock is None:
+            if fixture_path:
+                sock = ReplayNetlinkSocket(fixture_path)
+            else:
+                sock = NetlinkSocket(NETLINK_GENERIC, record_path=record_path)
+        self.sock = sock
+        self.seq = 0
+        # One socket carries replies and events: callers on different threads take turns,
+        # and a scan holds it from trigger to results so nothing reads its events meanwhile
+        self.lock = threading.RLock()
+        self.pending_events: List[Tuple[int, Dict[int, bytes]]] = []
+        self.family_id, self.mcast_groups = self._resolve_family('nl80211')
+        self.subscribed = set()
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def _resolve_family(self, name: str) -> Tuple[int, Dict[str, int]]:
+        """Look up the generic netlink family id and multicast groups"""
+        replies = self._transact(GENL_ID_CTRL, CTRL_CMD_GETFAMILY,
+                                 pack_string(CTRL_ATTR_FAMILY_NAME, name))
+        if not replies:
+            raise Nl80211Error(f"Generic netlink family {name} not found", errno.ENOENT)
+
+        attrs = replies[0]
+        family_id = attr_u16(attrs, CTRL_ATTR_FAMILY_ID)
+        if family_id is None:
+            raise Nl80211Error(f"Generic netlink family {name} has no id", errno.ENOENT)
+
+        groups = {}
+        for group in parse_attr_list(attrs.get(CTRL_ATTR_MCAST_GROUPS, b'')):
+            group_attrs = parse_attrs(group)
+            group_name = attr_string(group_attrs, CTRL_ATTR_MCAST_GRP_NAME)
+            group_id = attr_u32(group_attrs, CTRL_ATTR_MCAST_GRP_ID)
+            if group_name and group_id is not None:
+                groups[group_name] = group_id
+        return family_id, groups
+
+    def subscribe(self, group_name: str) -> None:
+        """Join an nl80211 multicast group such as 'scan' or 'mlme'"""
+        if group_name in self.subscribed:
+            return
+        group_id = self.mcast_groups.get(group_name)
+        if group_id is None:
+            raise Nl80211Error(f"nl80211 multicast group {group_name} not available", errno.ENOENT)
+        self.sock.add_membership(group_id)
+        self.subscribed.add(group_name)
+
+    def _transact(self, family: int, cmd: int, attrs: bytes = b'',
+                  dump: bool = False, timeout: float = 5.0) -> List[Dict[int, bytes]]:
+        """Send a request and collect the attribute sets of every reply"""
+        with self.lock:
+            return self._transact_locked(family, cmd, attrs, dump, timeout)
+
+    def _transact_locked(self, family: int, cmd: int, attrs: bytes, dump: bool,
+                         timeout: float) -> List[Dict[int, bytes]]:
+        seq = self._next_seq()
+        flags = NLM_F_REQUEST | NLM_F_ACK | (NLM_F_DUMP if dump else 0)
+        self.sock.send(build_genl_message(family, cmd, flags, seq, attrs))
+
+        replies = []
+        deadline = time.monotonic() + timeout
+        while True:
+            datagram = self.sock.recv(deadline - time.monotonic())
+            if datagram is None:
+                raise Nl80211Error(f"Timed out waiting for reply to command {cmd}", errno.ETIMEDOUT)
+
+            for msg_type, msg_flags, msg_seq, payload in iter_messages(datagram):
+                if msg_seq == 0 and msg_type == family and family != GENL_ID_CTRL:
+                    # Multicast event that arrived while we were waiting
+                    self.pending_events.append(self._decode_genl(payload))
+                    continue
+                if msg_seq != seq:
+                    continue
+                if msg_type == NLMSG_ERROR:
+                    (code,) = _NLMSGERR.unpack_from(payload)
+                    if code < 0:
+                        raise Nl80211Error(
+                            f"Command {cmd} failed: {os.strerror(-code)}", -code)
+                    return replies
+                if msg_type == NLMSG_DONE:
+                    # Dumps are followed by an ACK, but DONE already ends the reply
+                    return replies
+                replies.append(self._decode_genl(payload)[1])
+
+    @staticmethod
+    def _decode_genl(payload: bytes) -> Tuple[int, Dict[int, bytes]]:
+        cmd = payload[0] if payload else 0
+        return cmd, parse_attrs(payload[_GENLMSGHDR.size:])
+
+    def request(self, cmd: int, attrs: bytes = b'', dump: bool = False,
+                timeout: float = 5.0) -> List[Dict[int, bytes]]:
+        """Run an nl80211 command and return the decoded replies"""
+        return self._transact(self.family_id, cmd, attrs, dump=dump, timeout=timeout)
+
+    def next_event(self, timeout: float) -> Optional[Tuple[int, Dict[int, bytes]]]:
+        """Return the next multicast event as (cmd, attrs), or None on timeout"""
+        with self.lock:
+            return self._next_event_locked(timeout)
+
+    def _next_event_locked(self, timeout: float) -> Optional[Tuple[int, Dict[int, bytes]]]:
+        if self.pending_events:
+            return self.pending_events.pop(0)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            datagram = self.sock.recv(deadline - time.monotonic())
+            if datagram is None:
+                return None
+            for msg_type, _flags, msg_seq, payload in iter_messages(datagram):
+                if msg_type == self.family_id and msg_seq == 0:
+                    self.pending_events.append(self._decode_genl(payload))
+            if self.pending_events:
+                return self.pending_events.pop(0)
+
+    def trigger_scan(self, ifindex: int, frequencies: List[int] = None) -> None:
+        """Start an active scan probing for the wildcard SSID, on the given frequencies (MHz)
+        or on every channel the radio supports"""
+        attrs = pack_u32(NL80211_ATTR_IFINDEX, ifindex)
+        attrs += pack_attr(NL80211_ATTR_SCAN_SSIDS | NLA_F_NESTED, pack_attr(1, b''))
+        if frequencies:
+            attrs += pack_attr(NL80211_ATTR_SCAN_FREQUENCIES | NLA_F_NESTED,
+                               b''.join(pack_u32(i, freq) for i, freq in enumerate(frequencies)))
+        self.request(NL80211_CMD_TRIGGER_SCAN, attrs)
+
+    def wait_for_scan(self, ifindex: int, timeout: float) -> None:
+        """Block until the kernel reports new scan results for the interface"""
+        deadline = time.monotonic() + timeout
+        while True:
+            event = self.next_event(deadline - time.monotonic())
+            if event is None:
+                raise Nl80211Error("Timed out waiting for scan results", errno.ETIMEDOUT)
+
+            cmd, attrs = event
+            event_ifindex = attr_u32(attrs, NL80211_ATTR_IFINDEX)
+            if ifindex and event_ifindex is not None and event_ifindex != ifindex:
+                continue
+            if cmd == NL80211_CMD_NEW_SCAN_RESULTS:
+                return
+            if cmd == NL80211_CMD_SCAN_ABORTED:
+                raise Nl80211Error("Scan aborted by the kernel", errno.ECANCELED)
+
+    def get_scan(self, ifindex: int) -> List[Dict]:
+        """Dump the kernel BSS table for the interface"""
+        replies = self.request(NL80211_CMD_GET_SCAN, pack_u32(NL80211_ATTR_IFINDEX, ifindex),
+                               dump=True)
+        networks = []
+        for attrs in replies:
+            bss = attrs.get(NL80211_ATTR_BSS)
+            if bss:
+                networks.append(parse_bss(parse_attrs(bss)))
+        return networks
+
+    def get_survey(self, ifindex: int) -> List[Dict]:
+        """Dump the per-frequency survey counters for the interface"""
+        replies = self.request(NL80211_CMD_GET_SURVEY, pack_u32(NL80211_ATTR_IFINDEX, ifindex),
+                               dump=True)
+        surveys = []
+        for attrs in replies:
+            info = attrs.get(NL80211_ATTR_SURVEY_INFO)
+            if info:
+                survey = parse_survey(parse_attrs(info))
+                if survey['frequency']:
+                    surveys.append(survey)
+        return surveys
+
+    def get_interface(self, ifindex: int) -> Dict:
+        """Return the SSID and operating frequency of the interface (empty SSID when idle)"""
+        replies = self.request(NL80211_CMD_GET_INTERFACE, pack_u32(NL80211_ATTR_IFINDEX, ifindex))
+        if not replies:
+            return {}
+        attrs = replies[0]
+        frequency = attr_u32(attrs, NL80211_ATTR_WIPHY_FREQ)
+        ssid = attrs.get(NL80211_ATTR_SSID)
+        return {
+            'ssid': ssid.decode(errors='replace') if ssid else '',
+            'frequency': frequency,
+            'channel': frequency_to_channel(frequency) if frequency else None
+        }
+
+    def get_station(self, ifindex: int) -> Optional[Dict]:
+        """Return link statistics for the AP a station-mode interface is associated with"""
+        replies = self.request(NL80211_CMD_GET_STATION, pack_u32(NL80211_ATTR_IFINDEX, ifindex),
+                               dump=True)
+        for attrs in replies:
+            if NL80211_ATTR_STA_INFO in attrs:
+                return parse_station(attrs)
+        return None
@@ -0,0 +1,271 @@
+"""
+OUI Vendor Database for Pi Wireless Monitor
+IEEE MA-L/MA-M/MA-S registry compiled to a sorted fixed-width file and searched through mmap
+"""
+import os
+import re
+import sys
+import csv
+import mmap
+import time
+import random
+import struct
+import argparse
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('oui')
+
+MAGIC = b'PIMOUI01'
+
+# Header: magic, record count, record size, records offset, names offset
+_HEADER = struct.Struct('>8sIIII')
+# Record: 48-bit prefix (masked), prefix length, flags, name offset, name length
+_RECORD = struct.Struct('>6sBBIH2x')
+_KEY_SIZE = 7
+
+FLAG_HAS_SUBBLOCKS = 0x01
+
+REGISTRY_BITS = {'MA-L': 24, 'MA-M': 28, 'MA-S': 36}
+PREFIX_BITS = (36, 28, 24)
+
+_MAX_PREFIX = (1 << 48) - 1
+_SPACES = re.compile(r'\s+')
+_NON_HEX = re.compile(r'[^0-9A-Fa-f]')
+
+
+def _mask(value: int, bits: int) -> bytes:
+    return (value & (_MAX_PREFIX ^ ((1 << (48 - bits)) - 1))).to_bytes(6, 'big')
+
+
+def _clean_name(name: str) -> str:
+    return _SPACES.sub(' ', name).strip()
+
+
+def read_registry(path: str) -> Iterator[Tuple[int, int, str]]:
+    """Yield (prefix, bits, organization) from an IEEE CSV (oui.csv, mam.csv, oui36.csv)
+    or a tab-separated prefix list (arp-scan ieee-oui.txt, Wireshark manuf)"""
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        first = f.readline()
+        f.seek(0)
+        if first.startswith('Registry,'):
+            for row in csv.DictReader(f):
+                bits = REGISTRY_BITS.get(row.get('Registry', ''))
+                assignment = row.get('Assignment', '')
+                if bits and assignment:
+                    yield int(assignment.ljust(12, '0'), 16), bits, _clean_name(row.get('Organization Name', ''))
+            return
+
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split('\t') if '\t' in line else line.split(None, 1)
+            if len(fields) < 2:
+                continue
+            token, _, length = fields[0].partition('/')
+            digits = _NON_HEX.sub('', token)
+            bits = int(length) if length.isdigit() else len(digits) * 4
+            if bits not in PREFIX_BITS or not digits or len(digits) > 12:
+                continue
+            yield int(digits.ljust(12, '0'), 16), bits, _clean_name(fields[-1])
+
+
+def compile_registry(sources: Iterable[str], output_path: str) -> int:
+    """Compile registry files into the binary database; later sources override earlier ones"""
+    entries: Dict[Tuple[bytes, int], str] = {}
+    for source in sources:
+        for prefix, bits, name in read_registry(source):
+            if name:
+                entries[(_mask(prefix, bits), bits)] = name
+
+    parents = {prefix[:3] for prefix, bits in entries if bits > 24}
+    names = bytearray()
+    name_offsets: Dict[str, Tuple[int, int]] = {}
+    records = []
+    for (prefix, bits), name in sorted(entries.items()):
+        location = name_offsets.get(name)
+        if location is None:
+            encoded = name.encode('utf-8')[:0xffff]
+            location = name_offsets[name] = (len(names), len(encoded))
+            names += encoded
+        flags = FLAG_HAS_SUBBLOCKS if bits == 24 and prefix[:3] in parents else 0
+        records.append(_RECORD.pack(prefix, bits, flags, location[0], location[1]))
+
+    records_offset = _HEADER.size
+    names_offset = records_offset + len(records) * _RECORD.size
+    temp_path = f'{output_path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(records), _RECORD.size, records_offset, names_offset))
+        f.writelines(records)
+        f.write(names)
+    # Replace atomically so running monitors keep their mapping of the old file
+    os.replace(temp_path, output_path)
+    logger.info(f"Compiled {len(records)} OUI prefixes ({len(name_offsets)} organizations) to {output_path}")
+    return len(records)
+
+
+class OuiDatabase:
+    """Read-only view of a compiled registry; nothing is parsed at startup"""
+
+    def __init__(self, path: str = None):
+        self.path = path or config.OUI_DB_PATH
+        self._mmap: Optional[mmap.mmap] = None
+        self.count = 0
+        try:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count, record_size, self._records, self._names = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or record_size != _RECORD.size:
+                raise ValueError(f"{self.path} is not a compiled OUI database")
+        except (OSError, ValueError, struct.error) as e:
+            logger.info(f"OUI database unavailable, vendor lookups disabled: {e}")
+            self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _find(self, key: bytes) -> int:
+        """Index of the record whose prefix and length equal key, or -1"""
+        data, base, size = self._mmap, self._records, _RECORD.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * size
+            probe = data[start:start + _KEY_SIZE]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _name(self, index: int) -> str:
+        _, _, _, offset, length = _RECORD.unpack_from(self._mmap, self._records + index * _RECORD.size)
+        start = self._names + offset
+        return self._mmap[start:start + length].decode('utf-8', errors='replace')
+
+    def lookup(self, mac: str) -> Optional[str]:
+        """Organization owning the longest registered prefix of a MAC address"""
+        if self._mmap is None or not mac:
+            return None
+        digits = _NON_HEX.sub('', mac)
+        if len(digits) != 12:
+            return None
+        value = int(digits, 16)
+        if value >> 40 & 0x02:
+            # Locally administered (e.g. randomized) addresses have no registered owner
+            return None
+
+        index = self._find(_mask(value, 24) + b'\x18')
+        if index >= 0:
+            flags = self._mmap[self._records + index * _RECORD.size + 7]
+            if not flags & FLAG_HAS_SUBBLOCKS:
+                return self._name(index)
+        for bits in (36, 28):
+            sub_index = self._find(_mask(value, bits) + bytes((bits,)))
+            if sub_index >= 0:
+                return self._name(sub_index)
+        return self._name(index) if index >= 0 else None
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.count = 0
+
+
+_database: Optional[OuiDatabase] = None
+_database_lock = threading.Lock()
+
+
+def get_oui_database() -> OuiDatabase:
+    """Process-wide database shared by the scanner and device discovery"""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = OuiDatabase()
+        return _database
+
+
+def lookup_vendor(mac: str) -> Optional[str]:
+    return get_oui_database().lookup(mac)
+
+
+def _rss_kb() -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def benchmark(path: str = None, lookups: int = 200000) -> Dict:
+    """Measure open time, resident memory added by opening and lookups per second"""
+    temp_path = None
+    if not path:
+        # Synthetic registry the size of the IEEE one (~50k prefixes)
+        temp_path = path = f'/tmp/oui-bench-{os.getpid()}.bin'
+        source = f'{temp_path}.txt'
+        rng = random.Random(1)
+        with open(source, 'w') as f:
+            for i in range(40000):
+                f.write(f'{rng.getrandbits(24) & 0xfcffff:06X}\tVendor {i % 20000} Inc.\n')
+            for i in range(10000):
+                f.write(f'{rng.getrandbits(36) & 0xfcfffffff:09X}\tSmall Vendor {i}\n')
+        compile_registry([source], path)
+        os.remove(source)
+
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    database = OuiDatabase(path)
+    database.lookup('00:00:00:00:00:00')
+    open_ms = (time.perf_counter() - start) * 1000.0
+    rss_after = _rss_kb()
+
+    rng = random.Random(2)
+    macs = [':'.join(f'{b:02x}' for b in (rng.getrandbits(48) & 0xfcffffffffff).to_bytes(6, 'big'))
+            for _ in range(lookups)]
+    start = time.perf_counter()
+    hits = sum(1 for mac in macs if database.lookup(mac))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'prefixes': len(database),
+        'open_ms': round(open_ms, 3),
+        'startup_rss_kb': rss_after - rss_before,
+        'lookups_per_second': int(lookups / elapsed),
+        'hit_rate': round(hits * 100.0 / lookups, 1)
+    }
+    database.close()
+    if temp_path:
+        os.remove(temp_path)
+    return result
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Build or benchmark the OUI vendor database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='compile IEEE registry files')
+    build.add_argument('sources', nargs='+', help='oui.csv, mam.csv, oui36.csv or ieee-oui.txt')
+    build.add_argument('-o', '--output', default=config.OUI_DB_PATH)
+    bench = commands.add_parser('bench', help='measure startup cost and lookup rate')
+    bench.add_argument('--db', help='compiled database (default: a synthetic one)')
+    bench.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        compile_registry(args.sources, args.output)
+    else:
+        for key, value in benchmark(args.db, args.lookups).items():
+            print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Output Parsers for Pi Wireless Monitor
+Single-pass parsers for iwlist, iwconfig, nmcli, arp-scan, ping and friends.
+
+All parsers take the raw bytes produced by subprocess.run (no text=True) and use
+precompiled byte patterns, so no decode/split pass is made over the whole output.
+"""
+import re
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+# iwlist scan: one alternation per token, dispatched on the outer group name. The lookahead
+# on the tokens' first letters skips most positions without trying every alternative
+_IWLIST_TOKENS = re.compile(
+    rb'(?=[CEFQSIL])(?:'
+    rb'(?P<cell>Cell \d+ - Address: (?P<bssid>[0-9A-Fa-f:]{17}))'
+    rb'|(?P<essid>ESSID:(?:"(?P<ssid>[^"]*)")?)'
+    rb'|(?P<chan>Channel:(?P<channel>\d+))'
+    rb'|(?P<freq>Frequency:(?P<frequency>[\d.]+) GHz)'
+    rb'|(?P<qual>Quality=(?P<quality>\d+)/(?P<quality_max>\d+))'
+    rb'|(?P<sig>Signal level=(?P<signal>-?\d+) dBm)'
+    rb'|(?P<enc>Encryption key:(?P<encryption>on|off))'
+    rb'|(?P<ie>IE: (?:IEEE 802\.11i/)?(?P<wpa>WPA2?)\b)'
+    rb'|(?P<beacon>Last beacon:\s*(?P<last_beacon>\d+)ms ago)'
+    rb')'
+)
+
+# iwconfig <if>
+_IWCONFIG_ESSID = re.compile(rb'ESSID:"([^"]*)"')
+_IWCONFIG_AP = re.compile(rb'Access Point: ([A-Fa-f0-9:]{17})')
+_IWCONFIG_FREQ = re.compile(rb'Frequency:([0-9.]+) GHz')
+_IWCONFIG_SIGNAL = re.compile(rb'Signal level=(-?\d+) dBm')
+_IWCONFIG_RATE = re.compile(rb'Bit Rate=([0-9.]+) Mb/s')
+
+# nmcli -t: fields separated by ':' with '\:' and '\\' escapes
+_NMCLI_FIELD = re.compile(rb'(?:\\.|[^:\\\n])*')
+_NMCLI_UNESCAPE = re.compile(rb'\\(.)')
+_NUMBER = re.compile(rb'(-?\d+(?:\.\d+)?)')
+
+# arp-scan --localnet: "IP<TAB>MAC<TAB>Vendor"
+_ARP_SCAN_LINE = re.compile(
+    rb'^(\d{1,3}(?:\.\d{1,3}){3})\t([0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){5})(?:\t([^\r\n]*))?',
+    re.MULTILINE
+)
+
+# ping (iputils, busybox and Windows)
+_PING_TIME = re.compile(rb'time[=<]\s*(\d+(?:\.\d+)?)\s*ms')
+_PING_SUMMARY = re.compile(
+    rb'(?:rtt|round-trip) min/avg/max(?:/(?:mdev|stddev))? = '
+    rb'([\d.]+)/([\d.]+)/([\d.]+)(?:/([\d.]+))? ms'
+)
+_PING_COUNTS = re.compile(rb'(\d+) packets transmitted, (\d+) (?:packets )?received')
+_PING_LOSS = re.compile(rb'(\d+(?:\.\d+)?)% (?:packet )?loss')
+_PING_WINDOWS_COUNTS = re.compile(rb'Sent = (\d+), Received = (\d+)')
+
+# /proc/net/wireless: "wlan0: 0000   60.  -50.  -256  ..."
+_PROC_WIRELESS = re.compile(
+    rb'^\s*([^\s:]+):\s+[0-9a-fA-F]+\s+(-?\d+)\.?\s+(-?\d+)\.?\s+(-?\d+)\.?',
+    re.MULTILINE
+)
+
+# ip addr / ip route
+_IP_ADDR_MAC = re.compile(rb'link/ether ([a-f0-9:]+)')
+_IP_ADDR_INET = re.compile(rb'inet ([0-9.]+)/')
+_ROUTE_VIA = re.compile(rb'\bvia ([0-9.]+)')
+
+# /proc/net/route: Iface, Destination, Gateway, Flags (hex, little-endian addresses)
+_PROC_ROUTE_DEFAULT = re.compile(rb'^(\S+)\t00000000\t([0-9A-Fa-f]{8})\t([0-9A-Fa-f]{4})', re.MULTILINE)
+_RTF_UP_GATEWAY = 0x0003
+
+# /proc/net/arp: IP address, HW type, Flags, HW address, Mask, Device
+_PROC_ARP_LINE = re.compile(
+    rb'^(\d{1,3}(?:\.\d{1,3}){3})\s+0x[0-9a-fA-F]+\s+(0x[0-9a-fA-F]+)\s+([0-9A-Fa-f:]{17})\s+\S+\s+(\S+)$',
+    re.MULTILINE
+)
+_ATF_COM = 0x02
+
+# iw dev <if> survey dump
+_SURVEY_TOKENS = re.compile(
+    rb'(?P<freq>frequency:\s*(?P<frequency>\d+) MHz(?P<in_use> \[in use\])?)'
+    rb'|(?P<noise_line>noise:\s*(?P<noise>-?\d+) dBm)'
+    rb'|(?P<time_line>channel (?P<counter>active|busy|receive|transmit) time:\s*(?P<ms>\d+) ms)'
+)
+_SURVEY_COUNTERS = {b'active': 'active_ms', b'busy': 'busy_ms', b'receive': 'rx_ms', b'transmit': 'tx_ms'}
+
+# misc tools
+_VCGENCMD_TEMP = re.compile(rb'temp=([\d.]+)')
+
+
+def _text(value: bytes) -> str:
+    return value.decode('utf-8', errors='replace')
+
+
+def parse_iwlist_scan(output: bytes) -> List[Dict]:
+    """Parse `iwlist <if> scan` output into raw network records"""
+    networks = []
+    current = None
+
+    for match in _IWLIST_TOKENS.finditer(output):
+        token = match.lastgroup
+
+        if token == 'cell':
+            current = {'bssid': _text(match.group('bssid'))}
+            networks.append(current)
+            continue
+        if current is None:
+            continue
+
+        if token == 'essid':
+            ssid = match.group('ssid')
+            current['ssid'] = _text(ssid) if ssid is not None else '<hidden>'
+        elif token == 'chan':
+            current['channel'] = int(match.group('channel'))
+        elif token == 'freq':
+            current['frequency'] = float(match.group('frequency'))
+        elif token == 'qual':
+            current['quality'] = int(match.group('quality'))
+            current['quality_max'] = int(match.group('quality_max'))
+        elif token == 'sig':
+            current['signal_strength'] = int(match.group('signal'))
+        elif token == 'enc':
+            current['encryption'] = match.group('encryption') == b'on'
+        elif token == 'ie':
+            current.setdefault('wpa_version', []).append(_text(match.group('wpa')))
+        elif token == 'beacon':
+            current['last_seen_ms'] = int(match.group('last_beacon'))
+
+    return networks
+
+
+def parse_iwconfig(output: bytes) -> Dict:
+    """Parse `iwconfig <if>` output; returns {} when not associated"""
+    ssid_match = _IWCONFIG_ESSID.search(output)
+    if not ssid_match or ssid_match.group(1) == b'off/any':
+        return {}
+
+    info = {'ssid': _text(ssid_match.group(1))}
+
+    ap_match = _IWCONFIG_AP.search(output)
+    if ap_match:
+        info['bssid'] = _text(ap_match.group(1))
+
+    freq_match = _IWCONFIG_FREQ.search(output)
+    if freq_match:
+        info['frequency'] = int(float(freq_match.group(1)) * 1000)
+
+    signal_match = _IWCONFIG_SIGNAL.search(output)
+    if signal_match:
+        info['signal_strength'] = int(signal_match.group(1))
+
+    rate_match = _IWCONFIG_RATE.search(output)
+    if rate_match:
+        info['bit_rate'] = float(rate_match.group(1))
+
+    return info
+
+
+def split_nmcli_fields(line: bytes) -> List[str]:
+    """Split one line of `nmcli -t` output, honouring escaped separators"""
+    fields = []
+    pos = 0
+    end = len(line)
+    while pos <= end:
+        match = _NMCLI_FIELD.match(line, pos)
+        fields.append(_text(_NMCLI_UNESCAPE.sub(rb'\1', match.group(0))))
+        pos = match.end() + 1
+    return fields
+
+
+def parse_nmcli_active(output: bytes, fields: List[str]) -> Optional[Dict[str, str]]:
+    """Return the active row of `nmcli -t -f <fields> dev wifi` as a field -> value dict"""
+    for line in output.splitlines():
+        if not line.startswith(b'yes:'):
+            continue
+        values = split_nmcli_fields(line)
+        if len(values) < len(fields):
+            return None
+        return dict(zip(fields, values))
+    return None
+
+
+def parse_number(value: Optional[str]) -> Optional[float]:
+    """Extract the leading number from values like '5240 MHz' or '540 Mbit/s'"""
+    if not value or value == '--':
+        return None
+    match = _NUMBER.search(value.encode())
+    return float(match.group(1)) if match else None
+
+
+def parse_arp_scan(output: bytes) -> List[Tuple[str, str, str]]:
+    """Parse `arp-scan` output into (ip, mac, vendor) tuples"""
+    return [
+        (_text(ip), _text(mac), _text(vendor).strip() if vendor else 'Unknown')
+        for ip, mac, vendor in _ARP_SCAN_LINE.findall(output)
+    ]
+
+
+def parse_ping(output: bytes) -> Dict:
+    """Parse ping output into counts, loss and RTT statistics (ms)"""
+    rtts = [float(t) for t in _PING_TIME.findall(output)]
+    result = {
+        'transmitted': 0,
+        'received': len(rtts),
+        'packet_loss': None,
+        'rtts': rtts,
+        'min': None,
+        'avg': None,
+        'max': None,
+        'mdev': None
+    }
+
+    counts = _PING_COUNTS.search(output) or _PING_WINDOWS_COUNTS.search(output)
+    if counts:
+        result['transmitted'] = int(counts.group(1))
+        result['received'] = int(counts.group(2))
+
+    loss = _PING_LOSS.search(output)
+    if loss:
+        result['packet_loss'] = float(loss.group(1))
+    elif result['transmitted']:
+        result['packet_loss'] = (result['transmitted'] - result['received']) / result['transmitted'] * 100
+
+    summary = _PING_SUMMARY.search(output)
+    if summary:
+        result['min'] = float(summary.group(1))
+        result['avg'] = float(summary.group(2))
+        result['max'] = float(summary.group(3))
+        if summary.group(4):
+            result['mdev'] = float(summary.group(4))
+    elif rtts:
+        result['min'] = min(rtts)
+        result['avg'] = statistics.mean(rtts)
+        result['max'] = max(rtts)
+
+    if result['mdev'] is None and len(rtts) > 1:
+        result['mdev'] = statistics.pstdev(rtts)
+
+    return result
+
+
+def parse_proc_net_wireless(data: bytes, interface: str) -> Dict:
+    """Parse the link quality, signal and noise columns of /proc/net/wireless"""
+    name = interface.encode()
+    for match in _PROC_WIRELESS.finditer(data):
+        if match.group(1) == name:
+            return {
+                'link_quality': int(match.group(2)),
+                'signal_level': int(match.group(3)),
+                'noise_level': int(match.group(4))
+            }
+    return {}
+
+
+def parse_ip_addr(output: bytes) -> Dict:
+    """Extract the MAC and first IPv4 address from `ip addr show <if>`"""
+    info = {}
+    mac_match = _IP_ADDR_MAC.search(output)
+    if mac_match:
+        info['mac_address'] = _text(mac_match.group(1))
+    ip_match = _IP_ADDR_INET.search(output)
+    if ip_match:
+        info['ip_address'] = _text(ip_match.group(1))
+    return info
+
+
+def parse_iw_survey(output: bytes) -> List[Dict]:
+    """Parse `iw dev <if> survey dump` into per-frequency survey records"""
+    surveys = []
+    current = None
+
+    for match in _SURVEY_TOKENS.finditer(output):
+        token = match.lastgroup
+        if token == 'freq':
+            current = {
+                'frequency': int(match.group('frequency')),
+                'noise': None,
+                'in_use': match.group('in_use') is not None,
+                'active_ms': None,
+                'busy_ms': None,
+                'rx_ms': None,
+                'tx_ms': None
+            }
+            surveys.append(current)
+        elif current is None:
+            continue
+        elif token == 'noise_line':
+            current['noise'] = int(match.group('noise'))
+        elif token == 'time_line':
+            current[_SURVEY_COUNTERS[match.group('counter')]] = int(match.group('ms'))
+
+    return surveys
+
+
+def parse_route_gateway(output: bytes) -> Optional[str]:
+    """Extract the gateway from `ip route show default` or `ip route get` output"""
+    match = _ROUTE_VIA.search(output)
+    return _text(match.group(1)) if match else None
+
+
+def parse_proc_net_route(data: bytes, interface: str = None) -> Optional[str]:
+    """Default gateway from /proc/net/route, preferring routes via the given interface"""
+    name = interface.encode() if interface else None
+    gateway = None
+    for iface, gw, flags in _PROC_ROUTE_DEFAULT.findall(data):
+        if int(flags, 16) & _RTF_UP_GATEWAY != _RTF_UP_GATEWAY:
+            continue
+        value = int(gw, 16)
+        address = '.'.join(str((value >> shift) & 0xff) for shift in (0, 8, 16, 24))
+        if name is None or iface == name:
+            return address
+        if gateway is None:
+            gateway = address
+    return gateway
+
+
+def parse_proc_net_arp(data: bytes, interface: str = None) -> List[Tuple[str, str]]:
+    """Complete neighbor entries from /proc/net/arp as (ip, mac) tuples"""
+    name = interface.encode() if interface else None
+    return [
+        (_text(ip), _text(mac).lower())
+        for ip, flags, mac, device in _PROC_ARP_LINE.findall(data)
+        if int(flags, 16) & _ATF_COM and (name is None or device == name)
+        and mac != b'00:00:00:00:00:00'
+    ]
+
+
+def parse_vcgencmd_temp(output: bytes) -> Optional[float]:
+    """Extract the temperature from `vcgencmd measure_temp`"""
+    match = _VCGENCMD_TEMP.search(output)
+    return float(match.group(1)) if match else None
@@ -0,0 +1,262 @@
+"""
+Roaming Tracker for Pi Wireless Monitor
+BSSID transitions within an SSID, timed from kernel link events, with per-AP-pair gap histograms
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.link_reader import LinkReader
+
+logger = get_logger('roaming')
+
+# Upper edges of the gap histogram buckets; one more bucket counts anything slower
+GAP_BUCKETS_MS = (50, 100, 200, 500, 1000, 2000, 5000)
+
+# Events that mean the station is leaving its current AP (authenticate: to another one)
+DEPARTURES = ('authenticate', 'deauthenticate', 'disassociate', 'disconnect', 'link_down')
+# Events that mean the station is associated with the AP in the event
+ARRIVALS = ('associate', 'connect', 'roam')
+
+RSSI_HISTORY = 120
+# Seconds to wait for a signal sample from the new AP before giving up on rssi_after
+RSSI_AFTER_WAIT = 5.0
+MAX_PENDING_TRANSITIONS = 1000
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+def _bucket(gap_ms: float) -> int:
+    for index, edge in enumerate(GAP_BUCKETS_MS):
+        if gap_ms <= edge:
+            return index
+    return len(GAP_BUCKETS_MS)
+
+
+class RoamTracker:
+    """Turns link events into roam records and keeps gap statistics per (from, to) AP pair.
+
+    The gap is the time between the kernel event that left the old AP
+    (authenticate to the new one, or deauth/disconnect) and the one that
+    completed association with the new AP. Drivers that roam in firmware
+    report a single ROAM event, so those transitions carry no gap.
+    """
+
+    def __init__(self, interface: str, max_gap: float = None, sample_interval: float = None,
+                 reader: LinkReader = None):
+        self.interface = interface
+        self.max_gap = config.ROAM_MAX_GAP if max_gap is None else max_gap
+        self.sample_interval = sample_interval or config.ROAM_RSSI_SAMPLE_INTERVAL
+        self.reader = reader or LinkReader(interface)
+        self.ssid: Optional[str] = None
+        self.bssid: Optional[str] = None
+        self.departure: Optional[Dict] = None
+        self.samples: Deque[Tuple[float, int]] = deque(maxlen=RSSI_HISTORY)
+        self.awaiting_rssi: List[Dict] = []
+        self.pending: Deque[Dict] = deque(maxlen=MAX_PENDING_TRANSITIONS)
+        self.pairs: 'OrderedDict[Tuple[str, str], Dict]' = OrderedDict()
+        self.dirty_pairs: Set[Tuple[str, str]] = set()
+        self.total = 0
+        self._handle = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Begin sampling signal strength on the shared background loop"""
+        get_background_loop().call_soon_threadsafe(self._tick)
+        logger.info(f"Tracking roams on {self.interface}")
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _tick(self) -> None:
+        try:
+            self.sample()
+        except Exception as e:
+            logger.error(f"Error sampling signal level: {e}")
+        self._handle = get_background_loop().call_later(self.sample_interval, self._tick)
+
+    def sample(self) -> None:
+        """Record the current signal level and complete roams waiting for it"""
+        wireless = self.reader.wireless()
+        now = time.time()
+        with self._lock:
+            if wireless.get('signal_level') is not None and self.bssid:
+                self.samples.append((now, wireless['signal_level']))
+            self._finish(now)
+
+    def _rssi_before(self, timestamp: float) -> Optional[int]:
+        for sampled_at, rssi in reversed(self.samples):
+            if sampled_at < timestamp:
+                return rssi
+        return None
+
+    def _rssi_after(self, timestamp: float) -> Optional[int]:
+        for sampled_at, rssi in self.samples:
+            if sampled_at > timestamp:
+                return rssi
+        return None
+
+    def observe_event(self, event: Dict, ssid: Optional[str] = None) -> Optional[Dict]:
+        """Fold a LinkEventListener event in; ssid is the network now associated, for arrivals.
+        Returns the transition when the event completed a roam."""
+        kind, timestamp = event['type'], event['timestamp']
+        with self._lock:
+            if kind in DEPARTURES:
+                if kind == 'authenticate' and (event.get('bssid') or '').upper() == self.bssid:
+                    return None
+                if self.departure is None and self.bssid:
+                    self.departure = {'time': timestamp, 'bssid': self.bssid, 'ssid': self.ssid,
+                                      'rssi': self._rssi_before(timestamp), 'reason': event.get('reason')}
+                if kind != 'authenticate':
+                    self.bssid = None
+                return None
+            if kind in ARRIVALS and event.get('bssid'):
+                return self._arrive(event['bssid'], ssid, timestamp, kind)
+        return None
+
+    def observe_status(self, status: Dict) -> Optional[Dict]:
+        """Catch BSSID changes from a polled connection status (no gap: poll times are too coarse)"""
+        with self._lock:
+            if status.get('connection_status') != 'connected':
+                self.bssid = None
+                return None
+            bssid = (status.get('bssid') or '').upper()
+            if not bssid or bssid == self.bssid:
+                return None
+            if self.departure is not None or not self.bssid:
+                # A kernel event left the old AP; let the arrival event time the roam
+                self.bssid, self.ssid = bssid, status.get('ssid')
+                return None
+            return self._arrive(bssid, status.get('ssid'), time.time(), 'poll')
+
+    def _arrive(self, bssid: str, ssid: Optional[str], timestamp: float, via: str) -> Optional[Dict]:
+        bssid = bssid.upper()
+        departure, self.departure = self.departure, None
+        if departure and timestamp - departure['time'] > self.max_gap:
+            # Too long to be a roam: a disconnection followed by a fresh connection
+            departure = None
+        if departure:
+            gap_ms = round((timestamp - departure['time']) * 1000.0, 1)
+        else:
+            gap_ms = None
+            departure = {'bssid': self.bssid, 'ssid': self.ssid,
+                         'rssi': self._rssi_before(timestamp), 'reason': None}
+
+        ssid = ssid or departure['ssid']
+        self.bssid, self.ssid = bssid, ssid
+        if not departure['bssid'] or departure['bssid'] == bssid or departure['ssid'] != ssid:
+            return None
+
+        transition = {
+            'from_bssid': departure['bssid'],
+            'to_bssid': bssid,
+            'ssid': ssid,
+            'rssi_before': departure['rssi'],
+            'rssi_after': None,
+            'gap_ms': gap_ms,
+            'via': via,
+            'reason': departure['reason'],
+            'timestamp': _iso(timestamp),
+            '_completed': timestamp
+        }
+        self.awaiting_rssi.append(transition)
+        logger.info(f"Roamed {departure['bssid']} -> {bssid} on '{ssid}'"
+                    + (f" in {gap_ms:.0f} ms" if gap_ms is not None else f" ({via}, gap unknown)"))
+        return transition
+
+    def _finish(self, now: float) -> None:
+        """Move roams whose post-roam signal is known (or no longer expected) to the pending batch"""
+        waiting = []
+        for transition in self.awaiting_rssi:
+            completed = transition['_completed']
+            rssi_after = self._rssi_after(completed)
+            if rssi_after is None and now - completed < RSSI_AFTER_WAIT:
+                waiting.append(transition)
+                continue
+            del transition['_completed']
+            transition['rssi_after'] = rssi_after
+            self._record(transition)
+        self.awaiting_rssi = waiting
+
+    def _record(self, transition: Dict) -> None:
+        key = (transition['from_bssid'], transition['to_bssid'])
+        pair = self.pairs.get(key)
+        if pair is None:
+            pair = self.pairs[key] = {
+                'from_bssid': key[0], 'to_bssid': key[1], 'ssid': transition['ssid'],
+                'count': 0, 'gap_count': 0, 'gap_ms_sum': 0.0, 'gap_ms_min': None, 'gap_ms_max': None,
+                'gap_histogram': [0] * (len(GAP_BUCKETS_MS) + 1),
+                'rssi_gain_sum': 0, 'rssi_gain_count': 0
+            }
+            while len(self.pairs) > config.ROAM_MAX_PAIRS:
+                evicted, _ = self.pairs.popitem(last=False)
+                self.dirty_pairs.discard(evicted)
+        self.pairs.move_to_end(key)
+
+        pair['count'] += 1
+        gap_ms = transition['gap_ms']
+        if gap_ms is not None:
+            pair['gap_count'] += 1
+            pair['gap_ms_sum'] += gap_ms
+            pair['gap_ms_min'] = gap_ms if pair['gap_ms_min'] is None else min(pair['gap_ms_min'], gap_ms)
+            pair['gap_ms_max'] = gap_ms if pair['gap_ms_max'] is None else max(pair['gap_ms_max'], gap_ms)
+            pair['gap_histogram'][_bucket(gap_ms)] += 1
+        if transition['rssi_before'] is not None and transition['rssi_after'] is not None:
+            pair['rssi_gain_sum'] += transition['rssi_after'] - transition['rssi_before']
+            pair['rssi_gain_count'] += 1
+
+        self.dirty_pairs.add(key)
+        self.pending.append(transition)
+        self.total += 1
+
+    @staticmethod
+    def _summary(pair: Dict) -> Dict:
+        gaps = pair['gap_count']
+        return {
+            'from_bssid': pair['from_bssid'],
+            'to_bssid': pair['to_bssid'],
+            'ssid': pair['ssid'],
+            'count': pair['count'],
+            'gap_count': gaps,
+            'gap_ms_avg': round(pair['gap_ms_sum'] / gaps, 1) if gaps else None,
+            'gap_ms_min': pair['gap_ms_min'],
+            'gap_ms_max': pair['gap_ms_max'],
+            'gap_histogram': list(pair['gap_histogram']),
+            'rssi_gain_avg': (round(pair['rssi_gain_sum'] / pair['rssi_gain_count'], 1)
+                              if pair['rssi_gain_count'] else None)
+        }
+
+    def build_batch(self) -> Optional[Dict]:
+        """Roams not yet uploaded and the cumulative histograms of the AP pairs they touched"""
+        with self._lock:
+            self._finish(time.time())
+            if not self.pending and not self.dirty_pairs:
+                return None
+            return {
+                'transitions': list(self.pending)[:config.ROAM_BATCH_SIZE],
+                'pairs': [self._summary(self.pairs[key]) for key in sorted(self.dirty_pairs)],
+                'gap_buckets_ms': list(GAP_BUCKETS_MS),
+                'total_roams': self.total
+            }
+
+    def commit(self, batch: Dict) -> None:
+        """Record a batch as delivered"""
+        with self._lock:
+            for _ in batch['transitions']:
+                if self.pending:
+                    self.pending.popleft()
+            self.dirty_pairs -= {(pair['from_bssid'], pair['to_bssid']) for pair in batch['pairs']}
+        logger.debug(f"Uploaded {len(batch['transitions'])} roams, {len(batch['pairs'])} AP pairs")
@@ -0,0 +1,90 @@
+"""
+Adaptive Scan Interval for Pi Wireless Monitor
+Stretches the network scan interval while the RF environment is quiet and shortens it when it churns
+"""
+import os
+import sys
+import math
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('scan_interval')
+
+MAX_PENDING_DECISIONS = 500
+
+
+class AdaptiveScanInterval:
+    """Picks the next scan interval from the change between consecutive scans.
+
+    Churn is the share of BSSIDs that appeared or disappeared; RSSI movement is
+    the RMS change in signal of the BSSIDs seen in both scans. A busy scan
+    halves the interval, a quiet one backs it off, anything else holds it.
+    """
+
+    def __init__(self, interval: float = None, minimum: float = None, maximum: float = None):
+        self.minimum = minimum or config.SCAN_INTERVAL_MIN
+        self.maximum = max(self.minimum, maximum or config.SCAN_INTERVAL_MAX)
+        self.interval = min(self.maximum, max(self.minimum, interval or config.SCAN_INTERVAL))
+        self.previous: Optional[Dict[str, int]] = None
+        self.decisions: Deque[Dict] = deque(maxlen=MAX_PENDING_DECISIONS)
+
+    def observe(self, networks: List[Dict]) -> float:
+        """Fold in a scan and return the interval until the next one"""
+        current = {n['bssid']: n.get('signal_strength', -100) for n in networks if n.get('bssid')}
+        previous, self.previous = self.previous, current
+        if previous is None or not current:
+            # Nothing to compare against, or the scan failed
+            return self.interval
+
+        new = len(current.keys() - previous.keys())
+        lost = len(previous.keys() - current.keys())
+        churn = (new + lost) / len(current.keys() | previous.keys())
+        deltas = [current[bssid] - previous[bssid] for bssid in current.keys() & previous.keys()]
+        rssi_rms = math.sqrt(sum(d * d for d in deltas) / len(deltas)) if deltas else 0.0
+
+        previous_interval = self.interval
+        if churn >= config.SCAN_CHURN_HIGH or rssi_rms >= config.SCAN_RSSI_CHANGE_HIGH:
+            reason = 'busy'
+            self.interval = max(self.minimum, self.interval / 2)
+        elif churn <= config.SCAN_CHURN_LOW and rssi_rms <= config.SCAN_RSSI_CHANGE_LOW:
+            reason = 'quiet'
+            self.interval = min(self.maximum, self.interval * config.SCAN_INTERVAL_BACKOFF)
+        else:
+            reason = 'steady'
+
+        self.decisions.append({
+            'timestamp': datetime.utcnow().isoformat(),
+            'interval': round(self.interval, 1),
+            'previous_interval': round(previous_interval, 1),
+            'reason': reason,
+            'bssids': len(current),
+            'new': new,
+            'lost': lost,
+            'churn': round(churn, 3),
+            'rssi_rms': round(rssi_rms, 2)
+        })
+        if self.interval != previous_interval:
+            logger.info(f"Scan interval {previous_interval:.0f}s -> {self.interval:.0f}s ({reason}: "
+                        f"{new} new, {lost} lost, RSSI RMS change {rssi_rms:.1f} dB)")
+        return self.interval
+
+    def build_report(self) -> Dict:
+        """Current interval and the decisions made since the last delivered report"""
+        return {
+            'current': round(self.interval, 1),
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'decisions': list(self.decisions)
+        }
+
+    def commit(self, report: Dict) -> None:
+        """Record a report as delivered"""
+        for _ in report['decisions']:
+            if self.decisions:
+                self.decisions.popleft()
@@ -0,0 +1,425 @@
+"""
+Job Scheduler for Pi Wireless Monitor
+Periodic jobs as asyncio tasks with concurrency limits, deadlines, jitter, overrun policies and timing histograms
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import functools
+import contextlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.utils.histogram import HdrHistogram
+
+logger = get_logger('scheduler')
+
+# What happens to a tick that falls due while the previous run is still going:
+# skip drops it, coalesce folds all such ticks into one run after the current
+# one, queue keeps each tick (up to SCHEDULER_MAX_QUEUE) and runs them in turn
+OVERRUN_POLICIES = ('skip', 'coalesce', 'queue')
+
+
+def parse_overrun_policies(spec: str) -> Dict[str, str]:
+    """Parse 'run_network_scan=coalesce;send_heartbeat=skip' into a policy per job name"""
+    policies = {}
+    for entry in (spec or '').split(';'):
+        name, _, policy = entry.partition('=')
+        name, policy = name.strip(), policy.strip().lower()
+        if not name:
+            continue
+        if policy in OVERRUN_POLICIES:
+            policies[name] = policy
+        else:
+            logger.warning(f"Ignoring unknown overrun policy '{policy}' for {name}")
+    return policies
+
+
+class Job:
+    """A periodic job. Plain functions run on the scheduler's executor, coroutine functions on the loop.
+
+    Runs start at a fixed rate from a jittered first run. Jobs that share a
+    group never run at the same time, which keeps jobs that drive the same
+    radio or the same state from overlapping. Lag is the time from a tick
+    falling due to the job actually starting (waiting for its groups, a
+    worker thread or an overrunning previous run).
+    """
+
+    def __init__(self, scheduler: 'JobScheduler', name: str, func: Callable, interval: float,
+                 max_concurrent: int = 1, deadline: float = None, groups: Iterable[str] = (),
+                 overrun: str = 'skip'):
+        self.scheduler = scheduler
+        self.name = name
+        self.func = func
+        self._interval = float(interval)
+        self.max_concurrent = max_concurrent
+        self.deadline = deadline
+        self.groups = tuple(sorted(groups))
+        self.overrun = overrun
+        self.is_coroutine = asyncio.iscoroutinefunction(func)
+        self.next_run: Optional[float] = None
+        self.last_start: Optional[float] = None
+        self.pending: Deque[float] = deque()
+        self.running = 0
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.overruns = 0
+        self.missed = 0
+        self.coalesced = 0
+        self.durations = HdrHistogram()
+        self.lag = HdrHistogram()
+        self.last_duration: Optional[float] = None
+        self.last_lag: Optional[float] = None
+        self.last_finished: Optional[str] = None
+        self.tasks = set()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float) -> None:
+        """Change the period (from any thread); the next run moves to one new period after the last start"""
+        self._interval = float(value)
+        self.scheduler.loop.call_soon_threadsafe(self._reschedule)
+
+    def _reschedule(self) -> None:
+        if self.last_start is not None:
+            self.next_run = self.last_start + self._interval
+            self.scheduler.wake()
+
+    def stats(self) -> Dict:
+        """Counters plus duration and lag distributions (ms) since the agent started"""
+        return {
+            'interval': self._interval,
+            'overrun_policy': self.overrun,
+            'running': self.running,
+            'queued': len(self.pending),
+            'runs': self.runs,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'overruns': self.overruns,
+            'missed': self.missed,
+            'coalesced': self.coalesced,
+            'last_duration_ms': round(self.last_duration * 1000.0, 1) if self.last_duration is not None else None,
+            'last_lag_ms': round(self.last_lag * 1000.0, 1) if self.last_lag is not None else None,
+            'last_finished': self.last_finished,
+            'duration_ms': self.durations.snapshot(),
+            'lag_ms': self.lag.snapshot()
+        }
+
+    def summary(self) -> Dict:
+        """Compact stats for the heartbeat"""
+        durations, lag = self.durations, self.lag
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'missed': self.missed,
+            'coalesced': self.coalesced,
+            'duration_ms': {'p50': durations.percentile(50), 'p99': durations.percentile(99),
+                            'max': round((durations.max or 0) / 1000.0, 3)},
+            'lag_ms': {'p50': lag.percentile(50), 'p99': lag.percentile(99),
+                       'max': round((lag.max or 0) / 1000.0, 3)}
+        }
+
+
+class JobScheduler:
+    """Dispatches due jobs on an event loop so a long job never delays the others"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None, max_workers: int = None,
+                 jitter: float = None):
+        self.loop = loop or get_background_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or config.SCHEDULER_MAX_WORKERS,
+                                           thread_name_prefix='job')
+        self.jitter = config.SCHEDULER_JITTER if jitter is None else jitter
+        self.max_queue = config.SCHEDULER_MAX_QUEUE
+        self.policies = parse_overrun_policies(config.SCHEDULER_OVERRUN_POLICIES)
+        self.jobs: Dict[str, Job] = {}
+        self.running = False
+        self._group_locks: Dict[str, asyncio.Lock] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._stats_written: Optional[float] = None
+
+    def every(self, interval: float, func: Callable, name: str = None, max_concurrent: int = 1,
+              deadline: float = None, groups: Iterable[str] = (), overrun: str = 'skip') -> Job:
+        """Register a periodic job; deadline is in seconds (default: the interval, 0: none).
+        SCHEDULER_OVERRUN_POLICIES overrides the overrun policy given here."""
+        name = name or func.__name__
+        job = Job(self, name, func, interval, max_concurrent,
+                  deadline if deadline is not None else interval, groups,
+                  self.policies.get(name, overrun))
+        with self._lock:
+            self.jobs[name] = job
+        if self.running:
+            self.loop.call_soon_threadsafe(self._arm, job)
+        return job
+
+    def submit(self, func: Callable, name: str = None, groups: Iterable[str] = ()) -> 'asyncio.Future':
+        """Run a function once, outside the periodic schedule, respecting its groups"""
+        job = Job(self, name or func.__name__, func, 0, groups=groups)
+        return asyncio.run_coroutine_threadsafe(self._execute(job, time.monotonic()), self.loop)
+
+    async def run_blocking(self, func: Callable, *args, groups: Iterable[str] = ()) -> Any:
+        """Run a blocking call on the job executor, for coroutine jobs that fan work out;
+        it waits for and holds the given groups like a job would"""
+        locks = await self._acquire(groups)
+        try:
+            future = self.loop.run_in_executor(self.executor, functools.partial(func, *args))
+        except BaseException:
+            self._release(locks)
+            raise
+        # A thread cannot be interrupted, so the groups stay held until it returns,
+        # even when the caller is cancelled or times out first
+        future.add_done_callback(lambda _: self._release(locks))
+        return await asyncio.shield(future)
+
+    async def _acquire(self, groups: Iterable[str]) -> List[asyncio.Lock]:
+        """Acquire the locks of the given groups, in order; none are left held if this is cancelled"""
+        acquired = []
+        try:
+            for group in groups:
+                lock = self._group_locks.setdefault(group, asyncio.Lock())
+                await lock.acquire()
+                acquired.append(lock)
+        except BaseException:
+            self._release(acquired)
+            raise
+        return acquired
+
+    @staticmethod
+    def _release(locks: List[asyncio.Lock]) -> None:
+        for lock in reversed(locks):
+            lock.release()
+
+    @contextlib.asynccontextmanager
+    async def _holding(self, groups: Iterable[str]):
+        """Acquire the locks of the given groups, in order, for the duration of the block"""
+        locks = await self._acquire(groups)
+        try:
+            yield
+        finally:
+            self._release(locks)
+
+    def start(self) -> None:
+        """Start dispatching on the loop; returns immediately"""
+        self.running = True
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs")
+
+    async def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        for job in self.jobs.values():
+            self._arm(job)
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _arm(self, job: Job) -> None:
+        """First run one interval from now plus a random offset, so jobs do not fire on the same boundary"""
+        job.next_run = self.loop.time() + job.interval + random.uniform(0, min(job.interval, self.jitter))
+        self.wake()
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatch(self) -> None:
+        while self.running:
+            now = self.loop.time()
+            upcoming = []
+            for job in list(self.jobs.values()):
+                if job.next_run is None:
+                    continue
+                if job.next_run <= now:
+                    job.last_start = due = job.next_run
+                    # Fixed rate; ticks lost to a stall count as missed instead of bursting
+                    job.next_run += job.interval
+                    if job.next_run <= now and job.interval > 0:
+                        behind = int((now - job.next_run) // job.interval) + 1
+                        job.missed += behind
+                        job.next_run += behind * job.interval
+                    self._tick(job, due)
+                upcoming.append(job.next_run)
+
+            self._wakeup.clear()
+            delay = max(0.0, min(upcoming) - self.loop.time()) if upcoming else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _tick(self, job: Job, due: float) -> None:
+        """Start a due run, or apply the job's overrun policy if it is still busy"""
+        if job.running < job.max_concurrent:
+            self._launch(job, due)
+            return
+
+        job.overruns += 1
+        if job.overrun == 'coalesce' and job.pending:
+            job.coalesced += 1
+        elif job.overrun != 'skip' and len(job.pending) < self.max_queue:
+            job.pending.append(due)
+        else:
+            job.missed += 1
+            logger.debug(f"{job.name} overran its {job.interval:g}s interval; tick dropped")
+
+    def _launch(self, job: Job, due: float) -> None:
+        task = asyncio.ensure_future(self._execute(job, due))
+        job.tasks.add(task)
+        task.add_done_callback(job.tasks.discard)
+
+    async def _execute(self, job: Job, due: float) -> None:
+        job.running += 1
+        try:
+            async with self._holding(job.groups):
+                await self._call(job, due)
+            job.runs += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            logger.warning(f"Job {job.name} exceeded its {job.deadline:g}s deadline")
+        except Exception as e:
+            job.failures += 1
+            logger.error(f"Job {job.name} failed: {e}")
+        finally:
+            job.running -= 1
+            if job.pending and self.running:
+                # Overrun ticks held back by the coalesce and queue policies
+                self._launch(job, job.pending.popleft())
+
+    def _timed(self, job: Job, due: float, func: Callable) -> Callable:
+        """Wrap a call to record its lag behind the tick and its duration"""
+        def record(started: float) -> None:
+            finished = time.monotonic()
+            job.last_lag, job.last_duration = started - due, finished - started
+            job.lag.record_seconds(job.last_lag)
+            job.durations.record_seconds(job.last_duration)
+            job.last_finished = datetime.utcnow().isoformat()
+
+        if job.is_coroutine:
+            async def timed_coroutine():
+                started = time.monotonic()
+                try:
+                    return await func()
+                finally:
+                    record(started)
+            return timed_coroutine
+
+        def timed():
+            started = time.monotonic()
+            try:
+                return func()
+            finally:
+                record(started)
+        return timed
+
+    async def _call(self, job: Job, due: float) -> None:
+        func = self._timed(job, due, job.func)
+        if job.is_coroutine:
+            await asyncio.wait_for(func(), job.deadline or None)
+            return
+        future = self.loop.run_in_executor(self.executor, func)
+        try:
+            # shield: a thread cannot be interrupted, so past the deadline we stop
+            # waiting but keep the job's slot and groups until the thread returns
+            await asyncio.wait_for(asyncio.shield(future), job.deadline or None)
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            logger.warning(f"Job {job.name} exceeded its {job.deadline:g}s deadline, still running")
+            await future
+
+    def cancel(self, name: str) -> None:
+        """Remove a job and cancel its runs in progress (threads finish in the background)"""
+        with self._lock:
+            job = self.jobs.pop(name, None)
+        if job:
+            for task in list(job.tasks):
+                self.loop.call_soon_threadsafe(task.cancel)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    def summary(self) -> Dict[str, Dict]:
+        return {name: job.summary() for name, job in self.jobs.items()}
+
+    def write_stats(self, path: str = None, force: bool = False) -> None:
+        """Write full job stats to a JSON file for local inspection (python -m src.scheduler),
+        at most once per SCHEDULER_STATS_INTERVAL unless forced"""
+        now = time.monotonic()
+        if not force and self._stats_written is not None and now - self._stats_written < config.SCHEDULER_STATS_INTERVAL:
+            return
+        self._stats_written = now
+        path = path or config.SCHEDULER_STATS_PATH
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'timestamp': datetime.utcnow().isoformat(), 'jobs': self.stats()}, f, indent=1)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not write job stats: {e}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop dispatching, cancel runs in progress and drop queued executor work"""
+        if not self.running:
+            return
+        self.running = False
+
+        async def shutdown():
+            tasks: List[asyncio.Task] = [task for job in self.jobs.values() for task in job.tasks]
+            if self._dispatcher:
+                tasks.append(self._dispatcher)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Scheduler shutdown incomplete: {e}")
+        if sys.version_info >= (3, 9):
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self.executor.shutdown(wait=False)
+        logger.info("Scheduler stopped")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Show job timings written by a running monitor')
+    parser.add_argument('--path', default=config.SCHEDULER_STATS_PATH)
+    parser.add_argument('--json', action='store_true', help='print the raw stats')
+    args = parser.parse_args(argv)
+
+    with open(args.path, 'r') as f:
+        stats = json.load(f)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+
+    print(f"Job stats at {stats['timestamp']}")
+    print(f"{'job':<28}{'policy':>9}{'runs':>7}{'fail':>6}{'missed':>8}{'coal':>6}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'lag p99':>10}")
+    for name, job in sorted(stats['jobs'].items()):
+        duration, lag = job['duration_ms'], job['lag_ms']
+        print(f"{name:<28}{job['overrun_policy']:>9}{job['runs']:>7}{job['failures']:>6}"
+              f"{job['missed']:>8}{job['coalesced']:>6}{duration.get('p50', 0):>10.1f}"
+              f"{duration.get('p99', 0):>10.1f}{duration.get('max', 0):>10.1f}{lag.get('p99', 0):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
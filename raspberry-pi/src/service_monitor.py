@@ -1,37 +1,40 @@
 import asyncio
 import logging
 import time
-import statistics
 import subprocess
 import socket
 import struct
 import requests
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-import re
-import platform
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.logger import get_logger
+from src.icmp import get_icmp_engine
 
 logger = get_logger('service_monitor')
 
 class ServiceMonitor:
-    def __init__(self, monitor_id: str, server_url: str):
+    def __init__(self, monitor_id: str, server_url: str, session: requests.Session = None):
         self.monitor_id = monitor_id
         self.server_url = server_url
+        # Shared with the API client so server calls reuse its connection pool
+        self.session = session or requests.Session()
         self.services: List[Dict] = []
         self.last_check_times: Dict[str, float] = {}
         
     async def fetch_service_configs(self) -> List[Dict]:
         """Fetch service monitor configurations from server"""
         try:
-            response = requests.get(
-                f"{self.server_url}/api/service-monitors/monitor/{self.monitor_id}",
-                timeout=10
+            response = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: self.session.get(
+                    f"{self.server_url}/api/service-monitors/monitor/{self.monitor_id}",
+                    timeout=10
+                )
             )
             
             if response.status_code == 200:
@@ -99,95 +102,32 @@ class ServiceMonitor:
         """Perform ping check and calculate metrics"""
         try:
             logger.debug(f"Starting ping check for {host}")
-            # Platform-specific ping command
-            if platform.system().lower() == 'windows':
-                cmd = ['ping', '-n', str(count), '-w', str(timeout * 1000), host]
-            else:
-                cmd = ['ping', '-c', str(count), '-W', str(timeout), host]
-            
-            # Run ping command
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                # Check if host is unreachable
-                if stderr or b'Destination host unreachable' in stdout:
-                    return {
-                        'status': 'down',
-                        'errorMessage': 'Host unreachable'
-                    }
-            
-            # Parse ping output
-            output = stdout.decode('utf-8', errors='ignore')
-            return self._parse_ping_output(output)
+            ping = await get_icmp_engine().ping(host, count=count, timeout=timeout)
             
-        except Exception as e:
-            logger.error(f"Ping check failed for {host}: {e}")
-            return {
-                'status': 'error',
-                'errorMessage': str(e)
-            }
-    
-    def _parse_ping_output(self, output: str) -> Dict:
-        """Parse ping command output to extract metrics"""
-        try:
-            lines = output.strip().split('\n')
-            
-            # Extract RTT values
-            rtt_values = []
-            
-            # Different patterns for different OS
-            if platform.system().lower() == 'windows':
-                # Windows: Reply from X: bytes=32 time=10ms TTL=64
-                rtt_pattern = r'time[<=](\d+)ms'
-            else:
-                # Unix: 64 bytes from X: icmp_seq=1 ttl=64 time=10.1 ms
-                rtt_pattern = r'time=(\d+\.?\d*)\s*ms'
-            
-            for line in lines:
-                match = re.search(rtt_pattern, line)
-                if match:
-                    rtt_values.append(float(match.group(1)))
+            if ping['address'] is None:
+                return {
+                    'status': 'down',
+                    'errorMessage': 'Host unreachable'
+                }
             
-            if not rtt_values:
+            if not ping['rtts']:
                 return {
                     'status': 'down',
                     'errorMessage': 'No ping responses received'
                 }
             
-            # Calculate metrics
-            avg_rtt = statistics.mean(rtt_values)
-            jitter = statistics.stdev(rtt_values) if len(rtt_values) > 1 else 0
-            
-            # Parse packet loss
-            packet_loss = 0
-            if platform.system().lower() == 'windows':
-                # Windows: (4 sent, 4 received, 0% loss)
-                loss_match = re.search(r'\((\d+)% loss\)', output)
-            else:
-                # Unix: 4 packets transmitted, 4 received, 0% packet loss
-                loss_match = re.search(r'(\d+)% packet loss', output)
-            
-            if loss_match:
-                packet_loss = float(loss_match.group(1))
-            
             return {
                 'status': 'up',
-                'latency': round(avg_rtt, 2),
-                'packetLoss': packet_loss,
-                'jitter': round(jitter, 2)
+                'latency': round(ping['avg'], 2),
+                'packetLoss': ping['packet_loss'],
+                'jitter': round(ping['jitter'], 2)
             }
             
         except Exception as e:
-            logger.error(f"Error parsing ping output: {e}")
+            logger.error(f"Ping check failed for {host}: {e}")
             return {
                 'status': 'error',
-                'errorMessage': f'Failed to parse ping output: {e}'
+                'errorMessage': str(e)
             }
     
     async def _http_check(self, scheme: str, host: str, port: int, timeout: int) -> Dict:
@@ -322,10 +262,13 @@ class ServiceMonitor:
             # Add timestamp
             result['timestamp'] = datetime.utcnow().isoformat()
             
-            response = requests.put(
-                f"{self.server_url}/api/service-monitors/{service_id}/check",
-                json=result,
-                timeout=10
+            response = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: self.session.put(
+                    f"{self.server_url}/api/service-monitors/{service_id}/check",
+                    json=result,
+                    timeout=10
+                )
             )
             
             if response.status_code != 200:
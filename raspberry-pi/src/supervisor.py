@@ -0,0 +1,74 @@
+"""
+Task Supervisor for Pi Wireless Monitor
+Runs the agent's long-lived coroutines as tasks on the shared event loop
+"""
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop, run_sync
+
+logger = get_logger('supervisor')
+
+# Restart delays double from 1s up to this many seconds while a task keeps crashing
+MAX_RESTART_DELAY = 60
+# A task that ran this long before crashing starts again from the shortest delay
+STABLE_RUN = 300
+
+
+class TaskSupervisor:
+    """Keeps named coroutines running on one loop, restarting any that crash, and stops them in order.
+
+    Given an executor, it becomes the loop's default, so every run_in_executor(None, ...)
+    on the loop (service checks, DNS lookups) shares the scheduler's worker threads.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None, executor: ThreadPoolExecutor = None):
+        self.loop = loop or get_background_loop()
+        if executor is not None:
+            self.loop.set_default_executor(executor)
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.restarts: Dict[str, int] = {}
+
+    def spawn(self, name: str, factory: Callable[[], Awaitable]) -> None:
+        """Run factory() as a supervised task; it is called again to restart the task after a crash"""
+        def create():
+            self.tasks[name] = self.loop.create_task(self._supervise(name, factory))
+        self.loop.call_soon_threadsafe(create)
+        logger.info(f"Started task {name}")
+
+    async def _supervise(self, name: str, factory: Callable[[], Awaitable]) -> None:
+        failures = 0
+        while True:
+            started = self.loop.time()
+            try:
+                await factory()
+                logger.info(f"Task {name} finished")
+                return
+            except Exception as e:
+                if self.loop.time() - started >= STABLE_RUN:
+                    failures = 0
+                failures += 1
+                self.restarts[name] = self.restarts.get(name, 0) + 1
+                delay = min(MAX_RESTART_DELAY, 2 ** (failures - 1))
+                logger.error(f"Task {name} crashed: {e}; restarting in {delay}s")
+                await asyncio.sleep(delay)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Cancel the tasks, most recently started first, letting each unwind before the next"""
+        async def shutdown():
+            for name, task in reversed(list(self.tasks.items())):
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                logger.debug(f"Stopped task {name}")
+
+        try:
+            run_sync(shutdown(), timeout, self.loop)
+        except Exception as e:
+            logger.warning(f"Task shutdown incomplete: {e}")
+        self.tasks.clear()
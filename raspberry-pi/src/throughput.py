@@ -0,0 +1,216 @@
+"""
+Throughput Tester for Pi Wireless Monitor
+Runs active throughput tests on their own schedule within a daily data budget
+"""
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from datetime import date, datetime
+from typing import Dict, Optional
+import requests
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+
+logger = get_logger('throughput')
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ThroughputTester:
+    """Runs HTTP, iperf3 or speedtest-cli tests and caches the latest result.
+
+    Bytes used are counted against THROUGHPUT_DAILY_BUDGET_MB; a test is skipped
+    when the previous test's size would not fit in what is left of today's budget.
+    """
+
+    def __init__(self, method: str = None):
+        self.method = self._resolve_method(method or config.THROUGHPUT_TEST_METHOD)
+        self.interval = config.THROUGHPUT_TEST_INTERVAL
+        self.daily_budget = config.THROUGHPUT_DAILY_BUDGET_MB * 1024 * 1024
+        self.test_bytes = config.THROUGHPUT_TEST_BYTES
+        self.state_path = os.path.join(config.LOCAL_STORAGE_PATH, 'throughput.json')
+        self.result: Optional[Dict] = None
+        self.last_attempt: Optional[float] = None
+        self.budget_day = date.today().isoformat()
+        self.bytes_today = 0
+        self._lock = threading.Lock()
+        self._load_state()
+        logger.info(f"Throughput tester using {self.method}, budget {config.THROUGHPUT_DAILY_BUDGET_MB} MB/day")
+
+    @staticmethod
+    def _resolve_method(method: str) -> str:
+        method = method.lower()
+        if method != 'auto':
+            return method
+        if config.THROUGHPUT_TEST_URL:
+            return 'http'
+        if config.THROUGHPUT_IPERF_SERVER:
+            return 'iperf3'
+        return 'speedtest'
+
+    def _load_state(self) -> None:
+        """Restore today's byte count and the last result so restarts do not reset the budget"""
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('day') == self.budget_day:
+                self.bytes_today = state.get('bytes', 0)
+            self.result = state.get('result')
+        except (FileNotFoundError, ValueError):
+            pass
+        except OSError as e:
+            logger.debug(f"Could not read throughput state: {e}")
+
+    def _save_state(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(self.state_path, 'w') as f:
+                json.dump({'day': self.budget_day, 'bytes': self.bytes_today, 'result': self.result}, f)
+        except OSError as e:
+            logger.debug(f"Could not save throughput state: {e}")
+
+    def _roll_budget(self) -> None:
+        today = date.today().isoformat()
+        if today != self.budget_day:
+            self.budget_day = today
+            self.bytes_today = 0
+
+    def budget_remaining(self) -> int:
+        self._roll_budget()
+        return max(0, self.daily_budget - self.bytes_today)
+
+    def _estimated_bytes(self) -> int:
+        if self.result and self.result.get('bytes'):
+            return self.result['bytes']
+        return self.test_bytes * (2 if config.THROUGHPUT_UPLOAD_URL or self.method != 'http' else 1)
+
+    def is_due(self) -> bool:
+        return self.last_attempt is None or time.monotonic() - self.last_attempt >= self.interval
+
+    def run_if_due(self) -> Optional[Dict]:
+        """Run a test when the interval has elapsed and the budget allows; never runs two at once"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if not self.is_due():
+                return None
+            self.last_attempt = time.monotonic()
+
+            if self.budget_remaining() < self._estimated_bytes():
+                logger.info(f"Skipping throughput test: {self.budget_remaining() // 1024} KB of daily budget left")
+                return None
+
+            result = self.run_test()
+            if result:
+                self.bytes_today += result['bytes']
+                self.result = result
+                self._save_state()
+                logger.info(f"Throughput test ({self.method}): {result.get('download_throughput')} Mbit/s down, "
+                            f"{result.get('upload_throughput')} Mbit/s up, {result['bytes'] // 1024} KB used")
+            return result
+        finally:
+            self._lock.release()
+
+    def run_test(self) -> Optional[Dict]:
+        """Run one test with the configured method"""
+        try:
+            if self.method == 'http':
+                result = self._test_http()
+            elif self.method == 'iperf3':
+                result = self._test_iperf3()
+            else:
+                result = self._test_speedtest()
+        except Exception as e:
+            logger.error(f"Throughput test failed: {e}")
+            return None
+
+        if result:
+            result['method'] = self.method
+            result['measured_at'] = datetime.utcnow().isoformat()
+            result['measured_ts'] = time.time()
+        return result
+
+    def cached(self) -> Dict:
+        """Most recent result with its age in seconds, for attaching to SSID reports"""
+        if not self.result:
+            return {}
+        return {
+            'download_throughput': self.result.get('download_throughput'),
+            'upload_throughput': self.result.get('upload_throughput'),
+            'throughput_measured_at': self.result.get('measured_at'),
+            'throughput_age': int(time.time() - self.result.get('measured_ts', time.time()))
+        }
+
+    def _test_http(self) -> Optional[Dict]:
+        """Download (and optionally upload) up to THROUGHPUT_TEST_BYTES against an HTTP target"""
+        result = {'target': config.THROUGHPUT_TEST_URL, 'bytes': 0}
+
+        received = 0
+        start = time.monotonic()
+        with requests.get(config.THROUGHPUT_TEST_URL, stream=True, timeout=10) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                received += len(chunk)
+                if received >= self.test_bytes:
+                    break
+        elapsed = time.monotonic() - start
+        result['bytes'] += received
+        result['download_throughput'] = round(received * 8 / elapsed / 1e6, 2) if elapsed > 0 else None
+
+        if config.THROUGHPUT_UPLOAD_URL:
+            payload = bytes(_CHUNK_SIZE)
+            chunks = max(1, self.test_bytes // _CHUNK_SIZE)
+            start = time.monotonic()
+            response = requests.post(config.THROUGHPUT_UPLOAD_URL, data=(payload for _ in range(chunks)),
+                                     timeout=30)
+            response.raise_for_status()
+            elapsed = time.monotonic() - start
+            sent = chunks * _CHUNK_SIZE
+            result['bytes'] += sent
+            result['upload_throughput'] = round(sent * 8 / elapsed / 1e6, 2) if elapsed > 0 else None
+
+        return result
+
+    def _iperf3(self, reverse: bool) -> Dict:
+        host, _, port = config.THROUGHPUT_IPERF_SERVER.partition(':')
+        cmd = ['iperf3', '-c', host, '-J', '-n', str(self.test_bytes)]
+        if port:
+            cmd += ['-p', port]
+        if reverse:
+            cmd.append('-R')
+        completed = subprocess.run(cmd, capture_output=True, timeout=60)
+        report = json.loads(completed.stdout or b'{}')
+        if completed.returncode != 0 or 'error' in report:
+            raise RuntimeError(report.get('error') or completed.stderr.decode(errors='replace'))
+        return report['end']['sum_received']
+
+    def _test_iperf3(self) -> Optional[Dict]:
+        """Upload then download THROUGHPUT_TEST_BYTES against an iperf3 server"""
+        upload = self._iperf3(reverse=False)
+        download = self._iperf3(reverse=True)
+        return {
+            'target': config.THROUGHPUT_IPERF_SERVER,
+            'bytes': int(upload['bytes'] + download['bytes']),
+            'download_throughput': round(download['bits_per_second'] / 1e6, 2),
+            'upload_throughput': round(upload['bits_per_second'] / 1e6, 2)
+        }
+
+    def _test_speedtest(self) -> Optional[Dict]:
+        """Internet test through speedtest-cli (large transfers; keep the interval long)"""
+        completed = subprocess.run(['speedtest-cli', '--json'], capture_output=True, timeout=90)
+        if completed.returncode != 0:
+            logger.error(f"speedtest-cli failed: {completed.stderr.decode(errors='replace')}")
+            return None
+        report = json.loads(completed.stdout)
+        return {
+            'target': report.get('server', {}).get('host'),
+            'bytes': int(report.get('bytes_sent', 0) + report.get('bytes_received', 0)),
+            'download_throughput': round(report.get('download', 0) / 1e6, 2),
+            'upload_throughput': round(report.get('upload', 0) / 1e6, 2)
+        }
@@ -0,0 +1,136 @@
+"""
+Traffic Sampler for Pi Wireless Monitor
+Passive throughput from high-resolution samples of /sys/class/net/<if>/statistics
+"""
+import os
+import sys
+import math
+import time
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+from src.link_reader import LinkReader
+
+logger = get_logger('traffic_sampler')
+
+# Per-sample deltas kept in the ring
+DELTA_FIELDS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+                'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped')
+
+
+def _p95(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class TrafficSampler:
+    """Samples interface counters every TRAFFIC_SAMPLE_INTERVAL into fixed-size rings of deltas"""
+
+    def __init__(self, interface: str, interval: float = None, ring_size: int = None,
+                 reader: LinkReader = None):
+        self.interface = interface
+        self.interval = interval or config.TRAFFIC_SAMPLE_INTERVAL
+        self.size = ring_size or config.TRAFFIC_RING_SIZE
+        self.reader = reader or LinkReader(interface)
+        self.deltas = {field: array('d', bytes(8 * self.size)) for field in DELTA_FIELDS}
+        self.durations = array('d', bytes(8 * self.size))
+        self.times = array('d', bytes(8 * self.size))
+        self.count = 0
+        self.pos = 0
+        self.previous: Optional[Dict[str, int]] = None
+        self.previous_time: Optional[float] = None
+        self.last_report: Optional[float] = None
+        self._handle = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Begin sampling on the shared background loop"""
+        loop = get_background_loop()
+        loop.call_soon_threadsafe(self._tick)
+        logger.info(f"Sampling {self.interface} counters every {self.interval}s")
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _tick(self) -> None:
+        try:
+            self.sample()
+        except Exception as e:
+            logger.error(f"Error sampling interface counters: {e}")
+        self._handle = get_background_loop().call_later(self.interval, self._tick)
+
+    def sample(self) -> None:
+        """Read the counters once and append the deltas since the previous read"""
+        now = time.monotonic()
+        counters = self.reader.counters()
+        if not counters:
+            return
+
+        with self._lock:
+            previous, previous_time = self.previous, self.previous_time
+            self.previous, self.previous_time = counters, now
+            if previous is None:
+                return
+
+            deltas = {field: counters.get(field, 0) - previous.get(field, 0) for field in DELTA_FIELDS}
+            if any(value < 0 for value in deltas.values()):
+                # Counters reset (driver reload or interface re-created)
+                return
+
+            pos = self.pos
+            for field, value in deltas.items():
+                self.deltas[field][pos] = value
+            self.durations[pos] = now - previous_time
+            self.times[pos] = now
+            self.pos = (pos + 1) % self.size
+            self.count += 1
+
+    def _window(self, since: Optional[float]) -> List[int]:
+        """Ring positions of samples taken after `since`, oldest first"""
+        stored = min(self.count, self.size)
+        positions = [(self.pos - stored + i) % self.size for i in range(stored)]
+        if since is None:
+            return positions
+        return [p for p in positions if self.times[p] > since]
+
+    def stats(self, since: Optional[float] = None) -> Dict:
+        """Current, peak and p95 throughput plus error and drop rates over the window"""
+        with self._lock:
+            positions = self._window(since)
+            if not positions:
+                return {'samples': 0}
+
+            duration = sum(self.durations[p] for p in positions)
+            totals = {field: sum(self.deltas[field][p] for p in positions) for field in DELTA_FIELDS}
+            stats = {'samples': len(positions), 'window_seconds': round(duration, 1)}
+
+            for direction in ('rx', 'tx'):
+                rates = [self.deltas[f'{direction}_bytes'][p] * 8 / self.durations[p] / 1e6
+                         for p in positions if self.durations[p] > 0]
+                packets = totals[f'{direction}_packets']
+                stats[f'{direction}_mbps'] = round(rates[-1], 3) if rates else 0.0
+                stats[f'{direction}_mbps_avg'] = round(totals[f'{direction}_bytes'] * 8 / duration / 1e6, 3) if duration else 0.0
+                stats[f'{direction}_mbps_peak'] = round(max(rates), 3) if rates else 0.0
+                stats[f'{direction}_mbps_p95'] = round(_p95(rates), 3) if rates else 0.0
+                stats[f'{direction}_pps'] = round(packets / duration, 1) if duration else 0.0
+                stats[f'{direction}_errors_per_sec'] = round(totals[f'{direction}_errors'] / duration, 3) if duration else 0.0
+                # Drops as a percentage of packets seen in that direction
+                seen = packets + totals[f'{direction}_dropped']
+                stats[f'{direction}_drop_rate'] = round(totals[f'{direction}_dropped'] * 100.0 / seen, 3) if seen else 0.0
+
+            return stats
+
+    def report(self) -> Dict:
+        """Stats for the samples taken since the previous report (the reporting window)"""
+        now = time.monotonic()
+        stats = self.stats(since=self.last_report)
+        self.last_report = now
+        return stats
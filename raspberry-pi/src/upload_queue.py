@@ -0,0 +1,198 @@
+"""
+Upload Queue for Pi Wireless Monitor
+Store-and-forward outbox for server uploads, kept in SQLite so nothing is lost while the server is unreachable
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src.utils.background_loop import get_background_loop
+
+logger = get_logger('upload_queue')
+
+# Records read per query while draining an endpoint
+DRAIN_BATCH = 100
+# First delay after a failed drain; it doubles up to UPLOAD_RETRY_MAX
+RETRY_MIN = 5
+# Seconds between age checks while nothing is queued
+EXPIRE_INTERVAL = 3600
+# Size eviction trims the queue to this share of LOCAL_STORAGE_MAX_MB, so it does not run on every put
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    created REAL NOT NULL,
+    crc INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_endpoint ON outbox (endpoint, id);
+"""
+
+
+class UploadQueue:
+    """Durable FIFO of records bound for the server.
+
+    put() commits a compressed, CRC-checked record before returning, so callers
+    can treat it as sent. drain() uploads the backlog oldest first, in order per
+    endpoint with endpoints side by side, and deletes each record once the
+    server accepts it. Records older than MAX_LOCAL_STORAGE_DAYS or beyond
+    LOCAL_STORAGE_MAX_MB are dropped, oldest first.
+    """
+
+    def __init__(self, deliver: Callable[[str, Dict], Optional[bool]], path: str = None,
+                 max_age_days: float = None, max_mb: float = None, loop: asyncio.AbstractEventLoop = None):
+        self.deliver = deliver
+        self.path = path or os.path.join(config.LOCAL_STORAGE_PATH, 'outbox.db')
+        self.max_age = (max_age_days or config.MAX_LOCAL_STORAGE_DAYS) * 86400
+        self.max_bytes = int((max_mb or config.LOCAL_STORAGE_MAX_MB) * 1024 * 1024)
+        self.loop = loop or get_background_loop()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # WAL: puts never wait for an upload reading the queue; NORMAL: no fsync per
+        # commit (a power cut can lose the last moments, an agent crash loses nothing)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.db.executescript(SCHEMA)
+        self.count, self.bytes = self.db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox').fetchone()
+
+        self.counters = {'queued': 0, 'delivered': 0, 'rejected': 0, 'corrupt': 0, 'expired': 0, 'evicted': 0}
+        if self.count:
+            logger.info(f"{self.count} queued uploads ({self.bytes / 1024:.0f} KB) from a previous run")
+
+    def put(self, endpoint: str, data: Dict) -> None:
+        """Store a record for upload and wake the drainer"""
+        payload = zlib.compress(json.dumps(data, separators=(',', ':'), default=str).encode())
+        with self._lock:
+            self.db.execute('INSERT INTO outbox (endpoint, created, crc, payload) VALUES (?, ?, ?, ?)',
+                            (endpoint, time.time(), zlib.crc32(payload), payload))
+            self.count += 1
+            self.bytes += len(payload)
+            self.counters['queued'] += 1
+            if self.bytes > self.max_bytes:
+                self._evict()
+        self.wake()
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self._set_wakeup)
+
+    def _set_wakeup(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _delete(self, condition: str, params: tuple) -> int:
+        """Delete matching records, keeping the counters in step; call with the lock held"""
+        removed, size = self.db.execute(
+            f'SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox WHERE {condition}', params).fetchone()
+        if removed:
+            self.db.execute(f'DELETE FROM outbox WHERE {condition}', params)
+            self.count -= removed
+            self.bytes -= size
+        return removed
+
+    def _evict(self) -> None:
+        """Drop the oldest records until the queue is back under its size limit"""
+        target = self.bytes - int(self.max_bytes * EVICT_TO)
+        freed, last_id = 0, None
+        for row_id, size in self.db.execute('SELECT id, LENGTH(payload) FROM outbox ORDER BY id'):
+            freed += size
+            last_id = row_id
+            if freed >= target:
+                break
+        if last_id is not None:
+            removed = self._delete('id <= ?', (last_id,))
+            self.counters['evicted'] += removed
+            self.db.execute('PRAGMA incremental_vacuum')
+            logger.warning(f"Upload queue over {self.max_bytes / (1024 * 1024):g} MB, "
+                           f"dropped the {removed} oldest records")
+
+    def expire(self) -> None:
+        """Drop records older than MAX_LOCAL_STORAGE_DAYS"""
+        with self._lock:
+            removed = self._delete('created < ?', (time.time() - self.max_age,))
+            if removed:
+                self.counters['expired'] += removed
+                self.db.execute('PRAGMA incremental_vacuum')
+                logger.warning(f"Dropped {removed} queued uploads older than {self.max_age / 86400:g} days")
+
+    def endpoints(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self.db.execute('SELECT DISTINCT endpoint FROM outbox')]
+
+    def drain_endpoint(self, endpoint: str) -> bool:
+        """Upload an endpoint's records in order; False when the server could not take them now"""
+        while True:
+            with self._lock:
+                rows = self.db.execute('SELECT id, crc, payload FROM outbox WHERE endpoint = ? ORDER BY id LIMIT ?',
+                                       (endpoint, DRAIN_BATCH)).fetchall()
+            if not rows:
+                return True
+            for row_id, crc, payload in rows:
+                if zlib.crc32(payload) != crc:
+                    logger.error(f"Dropping corrupt queued {endpoint} record {row_id}")
+                    outcome = 'corrupt'
+                else:
+                    accepted = self.deliver(endpoint, json.loads(zlib.decompress(payload)))
+                    if accepted is None:
+                        return False
+                    outcome = 'delivered' if accepted else 'rejected'
+                with self._lock:
+                    self._delete('id = ?', (row_id,))
+                    self.counters[outcome] += 1
+
+    async def _drain_once(self) -> bool:
+        """Expire, then drain every endpoint (UPLOAD_QUEUE_WORKERS at a time); True when all got through"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.expire)
+        workers = asyncio.Semaphore(config.UPLOAD_QUEUE_WORKERS)
+
+        async def drain(endpoint):
+            async with workers:
+                return await loop.run_in_executor(None, self.drain_endpoint, endpoint)
+
+        endpoints = await loop.run_in_executor(None, self.endpoints)
+        return all(await asyncio.gather(*(drain(endpoint) for endpoint in endpoints)))
+
+    async def drain(self) -> None:
+        """Upload whatever is queued whenever records arrive, backing off while the server is unreachable"""
+        self._wakeup = asyncio.Event()
+        if self.count:
+            self._wakeup.set()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), EXPIRE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            retry = RETRY_MIN
+            backlog = self.count
+            started = time.monotonic()
+            while not await self._drain_once():
+                # Records keep landing in the queue meanwhile; the next attempt takes them all
+                logger.info(f"Server unreachable, {self.count} uploads queued; retrying in {retry}s")
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, config.UPLOAD_RETRY_MAX)
+                backlog = max(backlog, self.count)
+            if backlog > DRAIN_BATCH:
+                logger.info(f"Caught up on {backlog} queued uploads in {time.monotonic() - started:.1f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, pending=self.count, bytes=self.bytes)
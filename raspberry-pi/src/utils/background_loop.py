@@ -0,0 +1,33 @@
+"""
+Background event loop for Pi Wireless Monitor
+Lets synchronous code run the asyncio probes on one shared loop thread
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared loop, starting its daemon thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='probe-loop', daemon=True).start()
+        return _loop
+
+
+def run_sync(coro: Coroutine, timeout: float = None, loop: asyncio.AbstractEventLoop = None) -> Any:
+    """Run a coroutine on the shared loop (or the given one) and block for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, loop or get_background_loop())
+    return future.result(timeout=timeout)
+
+
+async def run_on(coro: Coroutine, loop: asyncio.AbstractEventLoop) -> Any:
+    """Await a coroutine that must run on another loop (e.g. one owning its sockets)"""
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
@@ -0,0 +1,86 @@
+"""
+Log-linear histogram for Pi Wireless Monitor
+HDR-style fixed-memory recording of durations with bounded relative error
+"""
+from array import array
+from typing import Dict
+
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two: values are kept to within 1/32 (~3%)
+SUB_BUCKET_BITS = 6
+# Largest value tracked, in recorded units (microseconds: about 19 hours)
+MAX_VALUE_BITS = 36
+
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF = _SUB_BUCKETS >> 1
+_MAX_VALUE = (1 << MAX_VALUE_BITS) - 1
+_SIZE = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 2) * _HALF
+
+
+def _index(value: int) -> int:
+    bucket = max(0, value.bit_length() - SUB_BUCKET_BITS)
+    return bucket * _HALF + (value >> bucket)
+
+
+def _highest_equivalent(index: int) -> int:
+    """Largest value that lands in the same counter as index"""
+    if index < _SUB_BUCKETS:
+        return index
+    bucket = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    sub = index - bucket * _HALF
+    return ((sub + 1) << bucket) - 1
+
+
+class HdrHistogram:
+    """Counts values (recorded in microseconds, reported in milliseconds) in log-linear buckets"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = array('I', bytes(4 * _SIZE))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record_seconds(self, seconds: float) -> None:
+        value = min(_MAX_VALUE, max(0, int(seconds * 1e6)))
+        self.counts[_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent: float) -> float:
+        """Value in ms at or below which `percent` of the recorded values fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    return min(_highest_equivalent(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def snapshot(self) -> Dict:
+        """Count, mean, extremes and the usual percentiles, in milliseconds"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count / 1000.0, 3),
+            'min': round(self.min / 1000.0, 3),
+            'p50': round(self.percentile(50), 3),
+            'p90': round(self.percentile(90), 3),
+            'p99': round(self.percentile(99), 3),
+            'p999': round(self.percentile(99.9), 3),
+            'max': round(self.max / 1000.0, 3)
+        }
+
+    def reset(self) -> None:
+        self.counts = array('I', bytes(4 * _SIZE))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
@@ -0,0 +1,60 @@
+"""
+Single-flight calls for Pi Wireless Monitor
+Concurrent callers of the same operation share one execution, and recent results can be reused
+"""
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile wait for its result"""
+
+    def __init__(self):
+        self._flights: Dict[str, Future] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self.executed = 0
+        self.shared = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any], max_age: float = 0) -> Any:
+        """Result of func: a call already in flight, one that finished within max_age seconds, or a new one"""
+        with self._lock:
+            finished = self._results.get(key)
+            if finished and max_age and time.monotonic() - finished[0] <= max_age:
+                self.reused += 1
+                return finished[1]
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = Future()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not owner:
+            return flight.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._flights[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            self._results[key] = (time.monotonic(), result)
+            del self._flights[key]
+        flight.set_result(result)
+        return result
+
+    def age(self, key: str) -> float:
+        """Seconds since the last call for key finished (inf if never)"""
+        with self._lock:
+            finished = self._results.get(key)
+        return time.monotonic() - finished[0] if finished else float('inf')
+
+    def stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'shared': self.shared, 'reused': self.reused}
@@ -0,0 +1,295 @@
+"""
+Scan Backends for Pi Wireless Monitor
+Pluggable sources of raw network scan results
+"""
+import os
+import sys
+import time
+import errno
+import socket
+import subprocess
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from src.utils.logger import get_logger
+from src import parsers
+from src.nl80211 import Nl80211Client, Nl80211Error, channel_to_frequency
+
+logger = get_logger('wifi_scanner')
+
+# Channels scanned for a band assignment
+BAND_CHANNELS = {
+    '2.4GHz': list(range(1, 14)),
+    '5GHz': list(range(36, 65, 4)) + list(range(100, 145, 4)) + list(range(149, 166, 4)),
+    '6GHz': list(range(1, 234, 4))
+}
+
+
+class ScanBackend:
+    """Base class for scan backends returning raw (un-normalized) network records"""
+
+    name = 'base'
+
+    def __init__(self, interface: str):
+        self.interface = interface
+
+    def scan(self, active: bool = True, frequencies: List[int] = None) -> List[Dict]:
+        """Return raw network records, triggering a new scan when active is set,
+        otherwise reading the kernel's cached BSS table. Backends that can limit
+        a scan to some frequencies (MHz) do so; others scan everything."""
+        raise NotImplementedError
+
+    def survey(self) -> List[Dict]:
+        """Return cumulative per-frequency survey counters (active/busy/rx/tx time)"""
+        try:
+            result = subprocess.run(
+                ['iw', 'dev', self.interface, 'survey', 'dump'],
+                capture_output=True,
+                timeout=10
+            )
+            if result.returncode != 0:
+                logger.debug(f"Survey dump failed: {result.stderr.decode(errors='replace')}")
+                return []
+            return parsers.parse_iw_survey(result.stdout)
+        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+            logger.debug(f"Survey dump unavailable: {e}")
+        return []
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
+        pass
+
+
+class Nl80211ScanBackend(ScanBackend):
+    """Scans through nl80211 over a generic-netlink socket"""
+
+    name = 'nl80211'
+
+    def __init__(self, interface: str, fixture_path: str = None, record_path: str = None,
+                 timeout: int = None):
+        super().__init__(interface)
+        self.fixture_path = fixture_path
+        self.timeout = timeout or config.SCAN_TIMEOUT
+        self.client = Nl80211Client(fixture_path=fixture_path, record_path=record_path)
+        self.client.subscribe('scan')
+        self.ifindex = self._get_ifindex()
+
+    def _get_ifindex(self) -> int:
+        """Resolve the interface index (0 matches any interface in fixture mode)"""
+        try:
+            return socket.if_nametoindex(self.interface)
+        except OSError:
+            if self.fixture_path:
+                return 0
+            raise Nl80211Error(f"Interface {self.interface} not found", errno.ENODEV)
+
+    def scan(self, active: bool = True, frequencies: List[int] = None) -> List[Dict]:
+        with self.client.lock:
+            if active:
+                try:
+                    self.client.trigger_scan(self.ifindex, frequencies)
+                except Nl80211Error as e:
+                    # Another scan is already running; its results are just as good
+                    if e.errno != errno.EBUSY:
+                        raise
+                self.client.wait_for_scan(self.ifindex, self.timeout)
+            return self.client.get_scan(self.ifindex)
+
+    def survey(self) -> List[Dict]:
+        return self.client.get_survey(self.ifindex)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class IwlistScanBackend(ScanBackend):
+    """Scans by running iwlist and parsing its text output"""
+
+    name = 'iwlist'
+
+    def scan(self, active: bool = True, frequencies: List[int] = None) -> List[Dict]:
+        try:
+            cmd = ['sudo', 'iwlist', self.interface, 'scan']
+            if active:
+                # First, bring interface up
+                subprocess.run(['sudo', 'ip', 'link', 'set', self.interface, 'up'],
+                               capture_output=True)
+            else:
+                # Return the results of the last scan without triggering a new one
+                cmd.append('last')
+
+            # Perform scan
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=30
+            )
+
+            if result.returncode != 0:
+                logger.error(f"Scan failed: {result.stderr.decode(errors='replace')}")
+                return []
+
+            return parsers.parse_iwlist_scan(result.stdout)
+
+        except subprocess.TimeoutExpired:
+            logger.error("Network scan timed out")
+        return []
+
+
+def create_scan_backend(interface: str, name: str = None) -> ScanBackend:
+    """Create the configured scan backend, falling back to iwlist when nl80211 is unavailable"""
+    name = (name or config.SCAN_BACKEND).lower()
+
+    if name in ('nl80211', 'auto'):
+        try:
+            backend = Nl80211ScanBackend(
+                interface,
+                fixture_path=config.NL80211_FIXTURE_PATH or None,
+                record_path=config.NL80211_RECORD_PATH or None
+            )
+            logger.info(f"Using nl80211 scan backend on {interface}")
+            return backend
+        except (Nl80211Error, OSError) as e:
+            if name == 'nl80211':
+                logger.error(f"nl80211 scan backend unavailable: {e}")
+            else:
+                logger.info(f"nl80211 scan backend unavailable, using iwlist: {e}")
+    elif name != 'iwlist':
+        logger.warning(f"Unknown scan backend '{name}', using iwlist")
+
+    return IwlistScanBackend(interface)
+
+
+def parse_channel_assignments(spec: str) -> Dict[str, List[int]]:
+    """Parse 'wlan0=2.4GHz;wlan1=5GHz' or 'wlan1=36,40,44,48' into scan frequencies (MHz) per interface"""
+    assignments = {}
+    for entry in (spec or '').split(';'):
+        interface, _, channels = entry.partition('=')
+        interface = interface.strip()
+        if not interface or not channels.strip():
+            continue
+        frequencies = []
+        for token in channels.split(','):
+            token = token.strip()
+            # Only a GHz suffix names a band; a bare 5 or 6 is a channel
+            band = None
+            if token.lower().endswith('ghz'):
+                band = {'2.4': '2.4GHz', '5': '5GHz', '6': '6GHz'}.get(token[:-3].strip())
+            if band:
+                frequencies += [channel_to_frequency(c, band) for c in BAND_CHANNELS[band]]
+            elif token.isdigit():
+                frequencies.append(channel_to_frequency(int(token)))
+            elif token:
+                logger.warning(f"Ignoring unknown channel '{token}' for {interface}")
+        assignments[interface] = sorted(set(frequencies))
+    return assignments
+
+
+class ScanRadio:
+    """One scanning interface: its backend, the iwlist fallback, its channel assignment
+    and the scan-cache schedule"""
+
+    def __init__(self, interface: str, frequencies: List[int] = None):
+        self.interface = interface
+        self.frequencies = frequencies or None
+        self.fallback_backend = IwlistScanBackend(interface)
+        self.scan_backend = create_scan_backend(interface)
+        if self.scan_backend.name == self.fallback_backend.name:
+            self.scan_backend = self.fallback_backend
+        self.trigger_denied = False
+        self.scan_tick = 0
+        self.last_active_scan: Optional[float] = None
+
+    def scan(self) -> List[Dict]:
+        """Raw records from this radio's assigned channels, each tagged with the interface"""
+        active = self._should_active_scan()
+        raw_networks = self._run_scan(active)
+        if not active and self._scan_cache_expired(raw_networks):
+            logger.debug(f"Cached scan results on {self.interface} are too old, running active scan")
+            active = True
+            raw_networks = self._run_scan(active)
+
+        if active:
+            self.last_active_scan = time.monotonic()
+        self.scan_tick += 1
+
+        if self.frequencies:
+            # The BSS table (and iwlist) also hold networks outside the assignment
+            assigned = set(self.frequencies)
+            raw_networks = [n for n in raw_networks
+                            if round(n.get('frequency', 0) * 1000) in assigned]
+        for network in raw_networks:
+            network['interface'] = self.interface
+        logger.debug(f"{len(raw_networks)} networks on {self.interface} "
+                     f"({'active' if active else 'cached'} scan)")
+        return raw_networks
+
+    def _run_scan(self, active: bool) -> List[Dict]:
+        """Run a scan on the primary backend, falling back to iwlist on failure"""
+        backend = self.scan_backend
+        if active and self.trigger_denied:
+            backend = self.fallback_backend
+
+        if backend is not self.fallback_backend:
+            try:
+                return backend.scan(active=active, frequencies=self.frequencies)
+            except (Nl80211Error, OSError) as e:
+                if active and self.frequencies and getattr(e, 'errno', None) == errno.EINVAL:
+                    # The radio does not support some assigned channel
+                    logger.warning(f"{self.interface} rejected its channel assignment, scanning all channels")
+                    self.frequencies = None
+                    return self._run_scan(active)
+                logger.warning(f"{backend.name} scan failed on {self.interface}, falling back to iwlist: {e}")
+                if active and getattr(e, 'errno', None) == errno.EPERM:
+                    # Triggering scans needs CAP_NET_ADMIN, but cache dumps do not;
+                    # keep nl80211 for cached reads and stop retrying active scans
+                    self.trigger_denied = True
+
+        return self.fallback_backend.scan(active=active)
+
+    def _should_active_scan(self) -> bool:
+        """Decide whether this tick triggers an active scan or reads the scan cache"""
+        if not config.SCAN_CACHE_ENABLED or self.last_active_scan is None:
+            return True
+        if self.scan_tick % max(1, config.ACTIVE_SCAN_EVERY) == 0:
+            return True
+        return time.monotonic() - self.last_active_scan >= config.SCAN_CACHE_MAX_AGE
+
+    def _scan_cache_expired(self, raw_networks: List[Dict]) -> bool:
+        """Check whether a cache read returned nothing fresh enough to report"""
+        if not raw_networks:
+            return True
+        ages = [n['last_seen_ms'] for n in raw_networks if n.get('last_seen_ms') is not None]
+        return bool(ages) and min(ages) >= config.SCAN_CACHE_MAX_AGE * 1000
+
+    def survey(self) -> List[Dict]:
+        """Per-frequency survey counters, falling back to iw when the backend fails"""
+        try:
+            return self.scan_backend.survey()
+        except (Nl80211Error, OSError) as e:
+            logger.debug(f"{self.scan_backend.name} survey failed on {self.interface}, falling back to iw: {e}")
+            return self.fallback_backend.survey()
+
+
+def merge_scans(scans: List[List[Dict]]) -> List[Dict]:
+    """Merge raw records from several radios into one per BSSID, keeping the freshest
+    (then strongest) sighting and listing every interface that heard it"""
+    merged: Dict[str, Dict] = {}
+    heard_by: Dict[str, set] = {}
+    unkeyed = []
+    for records in scans:
+        for network in records:
+            bssid = network.get('bssid')
+            if not bssid:
+                unkeyed.append(network)
+                continue
+            heard_by.setdefault(bssid, set()).add(network['interface'])
+            best = merged.get(bssid)
+            if best is None or ((network.get('last_seen_ms') or 0, -network.get('signal_strength', -100))
+                                < (best.get('last_seen_ms') or 0, -best.get('signal_strength', -100))):
+                merged[bssid] = network
+    for bssid, network in merged.items():
+        network['interfaces'] = sorted(heard_by[bssid])
+    return list(merged.values()) + unkeyed
@@ -0,0 +1,23 @@
+"""
+Test configuration for Pi Wireless Monitor
+Puts the agent and its src directory on the import path and locates recorded tool output
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, 'src'))
+
+
+@pytest.fixture(scope='session')
+def fixture_bytes():
+    """Read a recorded output from tests/fixtures as the bytes subprocess.run would return"""
+    def read(name: str) -> bytes:
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            return f.read()
+    return read
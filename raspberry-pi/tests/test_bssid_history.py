@@ -0,0 +1,128 @@
+"""
+BSSID history tests for Pi Wireless Monitor
+Ring buffers, rolling statistics and eviction in src/bssid_history.py, and its memory over a day of scans
+"""
+import random
+import tracemalloc
+
+from src.bssid_history import SAMPLE_FIELDS, BssidHistory, BssidRecord
+
+RING_SIZE = 120
+MAX_ENTRIES = 4096
+# Bytes per record beyond its rings: the record, four array headers, the key and its table slot
+RECORD_OVERHEAD = 1024
+
+
+def network(bssid, rssi, channel=6, ssid='HomeNet', quality=50):
+    return {'bssid': bssid, 'ssid': ssid, 'signal_strength': rssi, 'channel': channel,
+            'quality_percentage': quality}
+
+
+def test_ring_wraps_and_keeps_the_newest_samples():
+    record = BssidRecord('aa:bb:cc:00:00:01', 'HomeNet', 5, now=1000)
+    for i in range(1, 9):
+        record.add(-i, i * 10, 6, 1000 + i)
+
+    assert record.count == 8
+    assert record.samples('rssi') == [-4, -5, -6, -7, -8]
+    assert record.samples('rssi', window=3) == [-6, -7, -8]
+    assert record.samples('time') == [1004, 1005, 1006, 1007, 1008]
+    assert record.first_seen == 1000 and record.last_seen == 1008
+    assert record.nbytes() == 5 * sum(record.rssi.itemsize if f != 'time' else record.time.itemsize
+                                      for f in SAMPLE_FIELDS)
+
+
+def test_partial_ring():
+    record = BssidRecord('aa:bb:cc:00:00:01', '', 5, now=0)
+    record.add(-50, 0, 1, 1)
+    record.add(-60, 0, 1, 2)
+    assert record.samples('rssi') == [-50, -60]
+    assert record.samples('rssi', window=10) == [-50, -60]
+
+
+def test_rolling_statistics():
+    history = BssidHistory(ring_size=4, max_entries=10)
+    for now, rssi in enumerate([-80, -70, -60, -50, -40, -30], 100):
+        history.record_scan([network('aa', rssi)], now=now)
+
+    # The ring holds the last four samples: -60, -50, -40, -30
+    assert history.rolling_mean('aa') == -45
+    assert history.rolling_min('aa') == -60
+    assert history.rolling_max('aa') == -30
+    assert history.rolling_mean('aa', window=2) == -35
+    assert history.rolling_min('aa', field='channel') == 6
+    assert history.summary('aa', window=2) == {
+        'bssid': 'aa', 'ssid': 'HomeNet', 'samples': 2, 'rssi_mean': -35.0, 'rssi_min': -40,
+        'rssi_max': -30, 'first_seen': 100, 'last_seen': 105
+    }
+    assert history.rolling_mean('missing') is None
+    assert history.summary('missing') is None
+
+
+def test_last_seen_queries():
+    history = BssidHistory(ring_size=8, max_entries=10)
+    history.record_scan([network('aa', -50), network('bb', -60)], now=1000)
+    history.record_scan([network('aa', -52), network('cc', -70, ssid='')], now=1060)
+    history.record_scan([{'ssid': 'no bssid', 'signal_strength': -40}], now=1120)
+
+    assert history.last_seen('aa') == 1060
+    assert history.last_seen('bb') == 1000
+    assert history.last_seen('dd') is None
+    assert history.seen_since(1060) == ['aa', 'cc']
+    assert history.not_seen_since(1060) == ['bb']
+    assert len(history) == 3
+
+
+def test_ssid_follows_the_latest_scan():
+    history = BssidHistory(ring_size=4, max_entries=10)
+    history.record_scan([network('aa', -50, ssid='Old')], now=1)
+    history.record_scan([network('aa', -50, ssid='')], now=2)
+    assert history.get('aa').ssid == 'Old'
+    history.record_scan([network('aa', -50, ssid='New')], now=3)
+    assert history.get('aa').ssid == 'New'
+
+
+def test_evicts_least_recently_seen():
+    history = BssidHistory(ring_size=4, max_entries=3)
+    history.record_scan([network('aa', -50), network('bb', -50), network('cc', -50)], now=1)
+    history.record_scan([network('aa', -50)], now=2)
+    history.record_scan([network('dd', -50)], now=3)
+
+    assert [record.bssid for record in history] == ['cc', 'aa', 'dd']
+    assert history.get('bb') is None
+    assert history.evicted == 1
+
+    history.record_scan([network('ee', -50), network('ff', -50)], now=4)
+    assert [record.bssid for record in history] == ['dd', 'ee', 'ff']
+    usage = history.memory_usage()
+    assert (usage['entries'], usage['max_entries'], usage['evicted']) == (3, 3, 3)
+    assert usage['ring_bytes'] == 3 * history.get('dd').nbytes()
+
+
+def test_memory_over_a_day_of_scans(benchmark):
+    """24 h of 60 s scans, each seeing 300 of 6000 BSSIDs, against the default sizing"""
+    rng = random.Random(5)
+    networks = [network(f'02:00:00:{i >> 8:02x}:{i & 0xff:02x}:01', -40 - i % 50, channel=1 + i % 11)
+                for i in range(6000)]
+    scans = [[networks[i] for i in sorted(rng.sample(range(len(networks)), 300))] for _ in range(24 * 60)]
+
+    def run():
+        tracemalloc.start()
+        history = BssidHistory(ring_size=RING_SIZE, max_entries=MAX_ENTRIES)
+        for tick, scan in enumerate(scans):
+            history.record_scan(scan, now=1_700_000_000 + tick * 60)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return history, current, peak
+
+    history, current, peak = benchmark.pedantic(run, rounds=1, iterations=1)
+
+    ring_bytes = BssidRecord('', '', RING_SIZE, 0).nbytes()
+    bound = MAX_ENTRIES * (ring_bytes + RECORD_OVERHEAD)
+    usage = history.memory_usage()
+    benchmark.extra_info.update(peak_bytes=peak, current_bytes=current, **usage)
+
+    assert usage['entries'] == MAX_ENTRIES
+    assert usage['evicted'] > 0
+    assert usage['ring_bytes'] == MAX_ENTRIES * ring_bytes
+    assert peak < bound, f"peak {peak / 1e6:.1f} MB over the {bound / 1e6:.1f} MB bound"
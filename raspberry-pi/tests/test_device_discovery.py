@@ -0,0 +1,178 @@
+"""
+Device discovery tests for Pi Wireless Monitor
+Replays recorded ARP frames through DeviceDiscovery.sweep and reads a captured /proc/net/arp
+"""
+import os
+import asyncio
+import ipaddress
+
+import pytest
+
+from config import config
+from src import parsers
+from src.device_discovery import (
+    ARP_REQUEST, ETH_P_ARP, DeviceDiscovery, ReplayPacketSocket, parse_arp_frame, sweep_rate, sweep_targets
+)
+from src.link_reader import PersistentFile
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ARP_SWEEP = os.path.join(FIXTURES, 'arp_sweep.rec')
+PROC_NET_ARP = os.path.join(FIXTURES, 'proc_net_arp.txt')
+
+
+class FakeReader:
+    """LinkReader stand-in for an interface at 192.168.1.50/24"""
+
+    def __init__(self, address='192.168.1.50', netmask='255.255.255.0'):
+        self.address = address
+        self.mask = netmask
+
+    def ip_address(self):
+        return self.address
+
+    def netmask(self):
+        return self.mask
+
+    def mac_address(self):
+        return 'B8:27:EB:12:34:56'
+
+
+class VirtualClock:
+    """Stands in for the loop clock and asyncio.sleep so a paced sweep runs instantly"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    async def sleep(self, delay, result=None):
+        self.sleeps.append(delay)
+        self.now += delay
+        return result
+
+
+class ClockedReplay(ReplayPacketSocket):
+    """Replay socket noting the virtual time of every frame sent"""
+
+    def __init__(self, fixture_path, clock):
+        super().__init__(fixture_path)
+        self.clock = clock
+        self.sent_at = []
+
+    def send(self, frame):
+        super().send(frame)
+        self.sent_at.append(self.clock.now)
+
+
+@pytest.fixture
+def discovery():
+    discovery = DeviceDiscovery('wlan0', reader=FakeReader(), fixture_path=ARP_SWEEP)
+    discovery.arp_table = PersistentFile(PROC_NET_ARP)
+    return discovery
+
+
+def run_sweep(discovery, monkeypatch):
+    """Sweep on a loop whose clock only moves when the sweep sleeps"""
+    clock = VirtualClock()
+    sockets = []
+
+    def open_socket():
+        sockets.append(ClockedReplay(discovery.fixture_path, clock))
+        return sockets[-1]
+
+    monkeypatch.setattr(discovery, '_open_socket', open_socket)
+    monkeypatch.setattr(asyncio, 'sleep', clock.sleep)
+    loop = asyncio.new_event_loop()
+    monkeypatch.setattr(loop, 'time', lambda: clock.now)
+    try:
+        stats = loop.run_until_complete(discovery.sweep())
+    finally:
+        loop.close()
+    return stats, sockets[0], clock
+
+
+def test_replayed_sweep_finds_devices(discovery, monkeypatch):
+    stats, sock, _ = run_sweep(discovery, monkeypatch)
+
+    # Three replies, one other host's request; our own frame, the off-subnet and
+    # unaddressed senders, the truncated frame and the IPv4 frame are skipped
+    assert stats['targets'] == 253
+    assert stats['replies'] == 5
+    assert all(entry['source'] == 'arp' for entry in discovery.devices.values())
+    assert {mac: entry['ip'] for mac, entry in discovery.devices.items()} == {
+        'a4:2b:b0:11:22:33': '192.168.1.1',
+        'dc:a6:32:aa:bb:01': '192.168.1.20',
+        '3c:22:fb:00:00:07': '192.168.1.77',
+        '6c:ad:f8:10:20:30': '192.168.1.143',
+    }
+
+    # Every host but ours was asked, from our MAC and address
+    assert len(sock.sent) == 253
+    targets = [parse_arp_frame(frame) for frame in sock.sent]
+    assert all(target == (ARP_REQUEST, 'b8:27:eb:12:34:56', '192.168.1.50') for target in targets)
+    assert sock.sent[0][12:14] == ETH_P_ARP.to_bytes(2, 'big')
+    assert sock.sent[0][38:42] == bytes([192, 168, 1, 1])
+    assert sock.sent[-1][38:42] == bytes([192, 168, 1, 254])
+
+
+def test_snapshot_merges_the_neighbor_table(discovery, monkeypatch):
+    run_sweep(discovery, monkeypatch)
+    snapshot = {entry['mac']: entry for entry in discovery.snapshot(max_age=60)}
+
+    # The kernel table re-marks the entries it shares with the sweep (MACs matched case-insensitively);
+    # its incomplete, zero-MAC and other-interface rows add nothing
+    assert snapshot['dc:a6:32:aa:bb:01']['source'] == 'neighbor'
+    assert snapshot['6c:ad:f8:10:20:30']['source'] == 'arp'
+    assert '5e:11:22:33:44:55' not in snapshot
+    assert len(snapshot) == 4
+
+
+@pytest.mark.parametrize('network, hosts, rate', [
+    ('192.168.1.0/24', 253, 25.3),
+    ('192.168.0.0/22', 1021, 100.0),
+])
+def test_sweep_paces_by_subnet_size(network, hosts, rate, monkeypatch):
+    monkeypatch.setattr(config, 'ARP_SWEEP_DURATION', 10.0)
+    monkeypatch.setattr(config, 'ARP_SWEEP_MAX_RATE', 100)
+    monkeypatch.setattr(config, 'ARP_SWEEP_MAX_HOSTS', 1024)
+    discovery = DeviceDiscovery('wlan0', reader=FakeReader(), fixture_path=ARP_SWEEP, network=network)
+
+    stats, sock, clock = run_sweep(discovery, monkeypatch)
+
+    assert stats['targets'] == hosts == len(sock.sent)
+    assert stats['rate'] == rate
+    # Requests go out evenly at the rate: a /24 is spread over ARP_SWEEP_DURATION,
+    # a /22 is capped at ARP_SWEEP_MAX_RATE and takes a little longer
+    gaps = [later - earlier for earlier, later in zip(sock.sent_at, sock.sent_at[1:])]
+    assert min(gaps) == pytest.approx(1 / rate) and max(gaps) == pytest.approx(1 / rate)
+    assert stats['duration'] == pytest.approx((hosts - 1) / rate, abs=0.01)
+    assert max(clock.sleeps) <= 1 / rate + 1e-9
+
+
+def test_sweep_rate_and_targets(monkeypatch):
+    monkeypatch.setattr(config, 'ARP_SWEEP_DURATION', 10.0)
+    monkeypatch.setattr(config, 'ARP_SWEEP_MAX_RATE', 100)
+
+    assert sweep_rate(5) == 1.0
+    assert sweep_rate(253) == pytest.approx(25.3)
+    assert sweep_rate(1021) == 100.0
+    assert sweep_rate(0) == 100
+
+    targets = sweep_targets(ipaddress.IPv4Network('192.168.0.0/22'), '192.168.1.50', 1024)
+    assert len(targets) == 1021 and '192.168.1.50' not in targets
+    # Larger subnets are cut at ARP_SWEEP_MAX_HOSTS
+    assert sweep_targets(ipaddress.IPv4Network('10.0.0.0/16'), '10.0.0.1', 1024)[-1] == '10.0.4.1'
+
+
+def test_parse_proc_net_arp():
+    with open(PROC_NET_ARP, 'rb') as f:
+        data = f.read()
+
+    # Incomplete (flags 0x0) and zero-MAC entries are left out; MACs come back lower-case
+    assert parsers.parse_proc_net_arp(data, 'wlan0') == [
+        ('192.168.1.1', 'a4:2b:b0:11:22:33'),
+        ('192.168.1.20', 'dc:a6:32:aa:bb:01'),
+        ('192.168.1.77', '3c:22:fb:00:00:07'),
+    ]
+    assert parsers.parse_proc_net_arp(data, 'eth0') == [('192.168.0.10', 'b8:27:eb:99:88:77')]
+    assert len(parsers.parse_proc_net_arp(data)) == 5
+    assert parsers.parse_proc_net_arp(data, 'wlan1') == []
@@ -0,0 +1,161 @@
+"""
+DNS probe tests for Pi Wireless Monitor
+Runs src/dns_probe.query() against a local UDP/TCP stub resolver
+"""
+import time
+import struct
+import asyncio
+
+from src.dns_probe import FLAG_QR, FLAG_TC, RCODE_NOERROR, RCODE_NXDOMAIN, query
+
+RCODE_SERVFAIL = 2
+
+
+def response(packet: bytes, rcode: int = RCODE_NOERROR, truncated: bool = False, id_offset: int = 0) -> bytes:
+    """Answer a query by echoing its question with the response flags set"""
+    query_id, flags = struct.unpack_from('!HH', packet)
+    flags |= FLAG_QR | rcode | (FLAG_TC if truncated else 0)
+    return struct.pack('!HHHHHH', (query_id + id_offset) & 0xffff, flags, 1, 0, 0, 0) + packet[12:]
+
+
+class StubResolver(asyncio.DatagramProtocol):
+    """UDP and TCP listeners on one local port, answering as the test script says.
+
+    udp: 'answer', 'truncate', 'silent' or 'wrong_id' (a stray reply with another id, then the answer);
+    None leaves UDP closed so the probe gets ICMP port unreachable.
+    tcp: 'answer' or 'wrong_id'; None leaves TCP closed.
+    """
+
+    def __init__(self, udp='answer', tcp='answer', rcode=RCODE_NOERROR):
+        self.udp = udp
+        self.tcp = tcp
+        self.rcode = rcode
+        self.udp_queries = []
+        self.tcp_queries = []
+        self.transport = None
+        self.server = None
+        self.port = None
+
+    async def start(self) -> 'StubResolver':
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.udp is not None:
+                self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=('127.0.0.1', 0))
+                self.port = self.transport.get_extra_info('sockname')[1]
+            try:
+                if self.tcp is not None:
+                    self.server = await asyncio.start_server(self._serve_tcp, '127.0.0.1', self.port or 0)
+                    self.port = self.server.sockets[0].getsockname()[1]
+                return self
+            except OSError:
+                # The TCP side of this port is taken; try another
+                self.transport.close()
+                self.port = None
+
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+        if self.server:
+            self.server.close()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.udp_queries.append(data)
+        if self.udp == 'silent':
+            return
+        if self.udp == 'wrong_id':
+            self.transport.sendto(response(data, RCODE_NXDOMAIN, id_offset=1), addr)
+        self.transport.sendto(response(data, self.rcode, truncated=self.udp == 'truncate'), addr)
+
+    async def _serve_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        (length,) = struct.unpack('!H', await reader.readexactly(2))
+        data = await reader.readexactly(length)
+        self.tcp_queries.append(data)
+        answer = response(data, self.rcode, id_offset=1 if self.tcp == 'wrong_id' else 0)
+        writer.write(struct.pack('!H', len(answer)) + answer)
+        await writer.drain()
+        writer.close()
+
+
+def run(stub: StubResolver, timeout: float = 1.0):
+    """Query example.com at the stub; returns the result and the seconds it took"""
+    async def main():
+        await stub.start()
+        try:
+            started = time.monotonic()
+            result = await query(f'127.0.0.1:{stub.port}', 'example.com', timeout)
+            return result, time.monotonic() - started
+        finally:
+            stub.close()
+    return asyncio.run(main())
+
+
+def test_udp_answer():
+    stub = StubResolver()
+    result, _ = run(stub)
+
+    assert result['transport'] == 'udp'
+    assert result['rcode'] == RCODE_NOERROR
+    assert result['error'] is None
+    assert result['latency'] is not None and result['latency'] >= 0
+    assert len(stub.udp_queries) == 1 and stub.tcp_queries == []
+    assert b'\x07example\x03com\x00' in stub.udp_queries[0]
+
+
+def test_truncated_answer_retries_over_tcp():
+    stub = StubResolver(udp='truncate')
+    result, _ = run(stub)
+
+    assert result['transport'] == 'tcp'
+    assert result['latency'] is not None
+    assert result['error'] is None
+    # The TCP retry repeats the same query, id included
+    assert stub.tcp_queries == stub.udp_queries
+
+
+def test_unreachable_udp_falls_back_to_tcp():
+    stub = StubResolver(udp=None)
+    result, _ = run(stub)
+
+    assert result['transport'] == 'tcp'
+    assert result['latency'] is not None
+    assert len(stub.tcp_queries) == 1
+
+
+def test_timeout_does_not_fall_back():
+    stub = StubResolver(udp='silent')
+    result, elapsed = run(stub, timeout=0.2)
+
+    assert result['error'] == 'timeout'
+    assert result['latency'] is None
+    assert result['transport'] == 'udp'
+    assert stub.tcp_queries == []
+    assert elapsed < 1.0
+
+
+def test_mismatched_udp_id_is_ignored():
+    stub = StubResolver(udp='wrong_id')
+    result, _ = run(stub)
+
+    # The stray NXDOMAIN carried another id; the answer that counts is the matching NOERROR
+    assert result['rcode'] == RCODE_NOERROR
+    assert result['transport'] == 'udp'
+    assert result['latency'] is not None
+
+
+def test_mismatched_tcp_id_is_rejected():
+    stub = StubResolver(udp='truncate', tcp='wrong_id')
+    result, _ = run(stub)
+
+    assert result['transport'] == 'tcp'
+    assert result['latency'] is None
+    assert 'Mismatched DNS response over TCP' in result['error']
+
+
+def test_rcodes():
+    result, _ = run(StubResolver(rcode=RCODE_NXDOMAIN))
+    assert result['rcode'] == RCODE_NXDOMAIN
+    assert result['latency'] is not None
+
+    result, _ = run(StubResolver(rcode=RCODE_SERVFAIL))
+    assert result['error'] == f'rcode {RCODE_SERVFAIL}'
+    assert result['latency'] is None
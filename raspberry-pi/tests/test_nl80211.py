@@ -0,0 +1,194 @@
+"""
+nl80211 tests for Pi Wireless Monitor
+Replays a recorded scan and survey dump through Nl80211Client and parse_bss
+"""
+import struct
+
+import pytest
+
+from src import nl80211
+from src.nl80211 import (
+    CTRL_ATTR_FAMILY_ID, CTRL_ATTR_FAMILY_NAME, CTRL_ATTR_MCAST_GROUPS, CTRL_ATTR_MCAST_GRP_ID,
+    CTRL_ATTR_MCAST_GRP_NAME, CTRL_CMD_GETFAMILY, GENL_ID_CTRL, NLA_F_NESTED, NLM_F_DUMP, NLM_F_MULTI, NLMSG_DONE,
+    NLMSG_ERROR, NL80211_ATTR_BSS, NL80211_ATTR_IFINDEX, NL80211_ATTR_SCAN_FREQUENCIES,
+    NL80211_ATTR_SURVEY_INFO, NL80211_BSS_BSSID, NL80211_BSS_CAPABILITY, NL80211_BSS_FREQUENCY,
+    NL80211_BSS_INFORMATION_ELEMENTS, NL80211_BSS_SEEN_MS_AGO, NL80211_BSS_SIGNAL_MBM,
+    NL80211_BSS_STATUS, NL80211_CMD_GET_SCAN, NL80211_CMD_GET_SURVEY, NL80211_CMD_NEW_SCAN_RESULTS,
+    NL80211_CMD_TRIGGER_SCAN, NL80211_SURVEY_INFO_FREQUENCY, NL80211_SURVEY_INFO_IN_USE,
+    NL80211_SURVEY_INFO_NOISE, NL80211_SURVEY_INFO_TIME, NL80211_SURVEY_INFO_TIME_BUSY,
+    NL80211_SURVEY_INFO_TIME_RX, NL80211_SURVEY_INFO_TIME_TX, WLAN_CAPABILITY_PRIVACY,
+    Nl80211Client, build_genl_message, channel_to_frequency, frequency_to_channel, iter_messages,
+    pack_attr, pack_string, pack_u32, parse_attrs, parse_bss
+)
+
+FAMILY = 0x1c
+SCAN_GROUP = 5
+IFINDEX = 3
+
+_NLMSGHDR = struct.Struct('=IHHII')
+
+
+def control(msg_type: int, seq: int) -> bytes:
+    """An ACK (NLMSG_ERROR with code 0) or NLMSG_DONE for a request"""
+    payload = struct.pack('=i', 0) + (_NLMSGHDR.pack(0, 0, 0, seq, 0) if msg_type == NLMSG_ERROR else b'')
+    return _NLMSGHDR.pack(_NLMSGHDR.size + len(payload), msg_type, 0, seq, 0) + payload
+
+
+def family_reply(seq: int) -> bytes:
+    groups = b''.join(
+        pack_attr(index | NLA_F_NESTED, pack_string(CTRL_ATTR_MCAST_GRP_NAME, name)
+                  + pack_u32(CTRL_ATTR_MCAST_GRP_ID, group))
+        for index, (name, group) in enumerate([('scan', SCAN_GROUP), ('mlme', SCAN_GROUP + 1)], 1))
+    attrs = (pack_attr(CTRL_ATTR_FAMILY_ID, struct.pack('=H', FAMILY))
+             + pack_string(CTRL_ATTR_FAMILY_NAME, 'nl80211')
+             + pack_attr(CTRL_ATTR_MCAST_GROUPS | NLA_F_NESTED, groups))
+    return build_genl_message(GENL_ID_CTRL, 1, 0, seq, attrs, version=2) + control(NLMSG_ERROR, seq)
+
+
+def event(cmd: int, ifindex: int = IFINDEX) -> bytes:
+    return build_genl_message(FAMILY, cmd, 0, 0, pack_u32(NL80211_ATTR_IFINDEX, ifindex))
+
+
+def ie(eid: int, body: bytes) -> bytes:
+    return bytes([eid, len(body)]) + body
+
+
+def bss(bssid: str, freq: int, signal_dbm: int, ssid: str, privacy: bool = True,
+        extra_ies: bytes = b'', associated: bool = False) -> bytes:
+    attrs = (pack_attr(NL80211_BSS_BSSID, bytes.fromhex(bssid.replace(':', '')))
+             + pack_u32(NL80211_BSS_FREQUENCY, freq)
+             + pack_attr(NL80211_BSS_CAPABILITY, struct.pack('=H', 0x0401 | (WLAN_CAPABILITY_PRIVACY if privacy else 0)))
+             + pack_attr(NL80211_BSS_INFORMATION_ELEMENTS, ie(0, ssid.encode()) + extra_ies)
+             + pack_attr(NL80211_BSS_SIGNAL_MBM, struct.pack('=i', signal_dbm * 100))
+             + pack_u32(NL80211_BSS_SEEN_MS_AGO, 120))
+    if associated:
+        attrs += pack_u32(NL80211_BSS_STATUS, 1)
+    return pack_attr(NL80211_ATTR_BSS | NLA_F_NESTED, attrs)
+
+
+def survey(freq: int, active: int = 0, busy: int = 0, in_use: bool = False) -> bytes:
+    attrs = pack_u32(NL80211_SURVEY_INFO_FREQUENCY, freq) + pack_attr(NL80211_SURVEY_INFO_NOISE, struct.pack('=b', -92))
+    if in_use:
+        attrs += pack_attr(NL80211_SURVEY_INFO_IN_USE, b'')
+    if active:
+        attrs += b''.join(pack_attr(key, struct.pack('=Q', value)) for key, value in [
+            (NL80211_SURVEY_INFO_TIME, active), (NL80211_SURVEY_INFO_TIME_BUSY, busy),
+            (NL80211_SURVEY_INFO_TIME_RX, busy // 2), (NL80211_SURVEY_INFO_TIME_TX, busy // 10)])
+    return pack_attr(NL80211_ATTR_SURVEY_INFO | NLA_F_NESTED, attrs)
+
+
+def dump_part(seq: int, cmd: int, records: list) -> bytes:
+    ifindex = pack_u32(NL80211_ATTR_IFINDEX, IFINDEX)
+    return b''.join(build_genl_message(FAMILY, cmd, NLM_F_MULTI, seq, ifindex + record) for record in records)
+
+
+RSN = ie(48, bytes.fromhex('0100000fac040100000fac040100000fac02'))
+WPA = ie(221, bytes.fromhex('0050f20101000050f20201000050f20201000050f202'))
+
+SCAN = [
+    [
+        bss('b8:27:eb:00:00:01', 2437, -48, 'HomeNet', extra_ies=ie(3, b'\x06') + RSN, associated=True),
+        bss('b8:27:eb:00:00:02', 5180, -61, 'HomeNet', extra_ies=RSN),
+        bss('b8:27:eb:00:00:03', 4940, -77, 'CITY-PS', extra_ies=RSN),
+    ],
+    [
+        bss('b8:27:eb:00:00:04', 5975, -70, 'Lab6E', extra_ies=RSN),
+        bss('b8:27:eb:00:00:05', 2412, -85, '', privacy=False),
+        bss('b8:27:eb:00:00:06', 2462, -80, 'OldRouter', extra_ies=WPA),
+    ],
+]
+
+SURVEY = [
+    survey(2412, 600000, 210000),
+    survey(2437, 900000, 450000, in_use=True),
+    survey(5180),
+    survey(0),
+]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A session recorded with NL80211_RECORD_PATH: family lookup, a triggered scan, its results and a survey dump"""
+    datagrams = [
+        family_reply(1),
+        control(NLMSG_ERROR, 2),
+        event(NL80211_CMD_NEW_SCAN_RESULTS, ifindex=IFINDEX + 1),
+        event(NL80211_CMD_NEW_SCAN_RESULTS),
+        dump_part(3, NL80211_CMD_NEW_SCAN_RESULTS, SCAN[0]),
+        dump_part(3, NL80211_CMD_NEW_SCAN_RESULTS, SCAN[1]) + control(NLMSG_DONE, 3),
+        event(NL80211_CMD_TRIGGER_SCAN) + dump_part(4, NL80211_CMD_GET_SURVEY, SURVEY) + control(NLMSG_DONE, 4),
+    ]
+    path = tmp_path / 'nl80211.rec'
+    with open(path, 'wb') as f:
+        for datagram in datagrams:
+            f.write(nl80211._RECORD_LEN.pack(len(datagram)) + datagram)
+    return str(path)
+
+
+@pytest.mark.parametrize('freq, channel', [
+    (2412, 1), (2472, 13), (2484, 14),
+    (4920, 184), (4940, 188), (4980, 196),
+    (5180, 36), (5825, 165), (5885, 177),
+    (5935, 2), (5955, 1), (7115, 233),
+])
+def test_frequency_channel_mapping(freq, channel):
+    assert frequency_to_channel(freq) == channel
+    assert channel_to_frequency(channel, '6GHz' if freq >= 5925 else None) == freq
+
+
+def test_replay_scan(recording):
+    client = Nl80211Client(fixture_path=recording)
+    assert client.family_id == FAMILY
+    assert client.mcast_groups == {'scan': SCAN_GROUP, 'mlme': SCAN_GROUP + 1}
+
+    client.subscribe('scan')
+    client.trigger_scan(IFINDEX, [2437, 5180])
+    client.wait_for_scan(IFINDEX, timeout=1.0)
+    networks = client.get_scan(IFINDEX)
+
+    by_bssid = {network['bssid']: network for network in networks}
+    assert list(by_bssid) == [f'B8:27:EB:00:00:0{i}' for i in range(1, 7)]
+    assert by_bssid['B8:27:EB:00:00:01'] == {
+        'bssid': 'B8:27:EB:00:00:01', 'frequency': 2.437, 'channel': 6, 'signal_strength': -48,
+        'quality': 62, 'quality_max': 70, 'encryption': True, 'ssid': 'HomeNet', 'wpa_version': ['WPA2'],
+        'last_seen_ms': 120, 'associated': True
+    }
+    assert [(n['channel'], n['ssid']) for n in networks] == [
+        (6, 'HomeNet'), (36, 'HomeNet'), (188, 'CITY-PS'), (5, 'Lab6E'), (1, ''), (11, 'OldRouter')]
+    assert by_bssid['B8:27:EB:00:00:05']['encryption'] is False
+    assert 'wpa_version' not in by_bssid['B8:27:EB:00:00:05']
+    assert by_bssid['B8:27:EB:00:00:06']['wpa_version'] == ['WPA']
+    assert not any('associated' in n for n in networks[1:])
+
+    requests = [next(iter_messages(data)) for data in client.sock.sent]
+    commands = [payload[0] for _, _, _, payload in requests]
+    assert commands == [CTRL_CMD_GETFAMILY, NL80211_CMD_TRIGGER_SCAN, NL80211_CMD_GET_SCAN]
+    trigger = parse_attrs(requests[1][3][4:])  # after the genl header
+    assert list(parse_attrs(trigger[NL80211_ATTR_SCAN_FREQUENCIES]).values()) == [
+        struct.pack('=I', 2437), struct.pack('=I', 5180)]
+    assert requests[2][1] & NLM_F_DUMP == NLM_F_DUMP
+
+
+def test_replay_survey(recording):
+    client = Nl80211Client(fixture_path=recording)
+    client.trigger_scan(IFINDEX)
+    client.wait_for_scan(IFINDEX, timeout=1.0)
+    client.get_scan(IFINDEX)
+
+    surveys = client.get_survey(IFINDEX)
+    assert [s['frequency'] for s in surveys] == [2412, 2437, 5180]
+    assert surveys[1] == {'frequency': 2437, 'noise': -92, 'in_use': True, 'active_ms': 900000,
+                          'busy_ms': 450000, 'rx_ms': 225000, 'tx_ms': 45000}
+    assert surveys[2]['active_ms'] is None and not surveys[2]['in_use']
+    # An event that arrived in the middle of the dump is kept for next_event
+    assert client.next_event(0)[0] == NL80211_CMD_TRIGGER_SCAN
+    assert client.next_event(0) is None
+
+
+def test_parse_bss_takes_channel_from_ds_params():
+    attrs = parse_attrs(bss('b8:27:eb:00:00:07', 2437, -60, 'NoFreq', extra_ies=ie(3, b'\x0b'))[4:])
+    del attrs[NL80211_BSS_FREQUENCY]
+
+    network = parse_bss(attrs)
+    assert network['channel'] == 11
+    assert 'frequency' not in network
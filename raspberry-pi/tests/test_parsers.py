@@ -0,0 +1,212 @@
+"""
+Parser tests for Pi Wireless Monitor
+Checks and benchmarks src/parsers.py against recorded iwlist, iw, arp-scan, ping, nmcli and /proc output
+"""
+import re
+import itertools
+
+import pytest
+
+from src import parsers
+from src.link_state import NMCLI_FIELDS
+
+
+def renumber(data: bytes, pattern: bytes, copies: int, replace) -> bytes:
+    """Concatenate copies of a capture, passing every match of pattern through replace(match, n)
+    with a running count so addresses stay unique"""
+    counter = itertools.count()
+    return re.sub(pattern, lambda match: replace(match, next(counter)), data * copies)
+
+
+@pytest.fixture(scope='module')
+def large_iwlist(fixture_bytes):
+    """2000 cells: the recorded scan 50 times over with fresh cell numbers and BSSIDs"""
+    header, _, cells = fixture_bytes('iwlist_scan.txt').partition(b'\n')
+    return header + b'\n' + renumber(
+        cells, rb'Cell \d+ - Address: [0-9A-F:]{17}', 50,
+        lambda match, n: b'Cell %02d - Address: 02:00:00:00:%02X:%02X' % (n + 1, n >> 8, n & 0xff))
+
+
+@pytest.fixture(scope='module')
+def large_survey(fixture_bytes):
+    """2600 survey entries from several radios' dumps"""
+    return fixture_bytes('iw_survey_dump.txt') * 100
+
+
+@pytest.fixture(scope='module')
+def large_arp_scan(fixture_bytes):
+    """3200 replies: the recorded sweep's host lines across a /20"""
+    lines = fixture_bytes('arp_scan.txt').split(b'\n')
+    hosts = b'\n'.join(line for line in lines if line[:1].isdigit()) + b'\n'
+    return renumber(hosts, rb'(?m)^192\.168\.1\.\d+', 50,
+                    lambda match, n: b'10.0.%d.%d' % (n >> 8, n & 0xff))
+
+
+def test_parse_iwlist_scan(fixture_bytes):
+    networks = parsers.parse_iwlist_scan(fixture_bytes('iwlist_scan.txt'))
+
+    assert len(networks) == 40
+    first = networks[0]
+    assert first['bssid'] == 'CA:18:25:30:BB:1D'
+    assert first['ssid'] == 'HomeNet'
+    assert first['channel'] == 52
+    assert first['frequency'] == 5.26
+    assert (first['quality'], first['quality_max']) == (29, 70)
+    assert first['signal_strength'] == -81
+    assert first['encryption'] is False
+    assert 'wpa_version' not in first
+    assert first['last_seen_ms'] == 3736
+
+    assert networks[1]['wpa_version'] == ['WPA2']
+    assert [n['ssid'] for n in networks].count('') == 4
+    assert all(-100 < n['signal_strength'] < 0 for n in networks)
+
+
+def test_parse_iw_survey(fixture_bytes):
+    surveys = parsers.parse_iw_survey(fixture_bytes('iw_survey_dump.txt'))
+
+    assert len(surveys) == 26
+    in_use = [s for s in surveys if s['in_use']]
+    assert [s['frequency'] for s in in_use] == [2437]
+    first = surveys[0]
+    assert first == {'frequency': 2412, 'noise': -90, 'in_use': False, 'active_ms': 552483,
+                     'busy_ms': 190410, 'rx_ms': 116398, 'tx_ms': 3451}
+    # 5 GHz channels the radio never dwelt on report the frequency alone
+    assert surveys[-1]['frequency'] == 5805
+    assert surveys[-1]['busy_ms'] is None
+
+
+def test_parse_arp_scan(fixture_bytes):
+    devices = parsers.parse_arp_scan(fixture_bytes('arp_scan.txt'))
+
+    assert len(devices) == 64
+    assert devices[0] == ('192.168.1.1', '42:16:7a:38:52:86', 'Raspberry Pi Trading Ltd')
+    assert devices[1][2] == 'Apple, Inc.'
+    # arp-scan repeats a host that answers twice with a (DUP: n) vendor suffix
+    assert sum(vendor.endswith('(DUP: 2)') for _, _, vendor in devices) == 4
+    assert len({mac for _, mac, _ in devices}) == 60
+
+
+def test_parse_ping_iputils(fixture_bytes):
+    ping = parsers.parse_ping(fixture_bytes('ping_iputils.txt'))
+
+    assert (ping['transmitted'], ping['received'], ping['packet_loss']) == (10, 9, 10.0)
+    assert len(ping['rtts']) == 9 and ping['rtts'][2] == 21.5
+    assert (ping['min'], ping['avg'], ping['max'], ping['mdev']) == (13.812, 15.322, 21.512, 2.329)
+
+
+def test_parse_ping_busybox(fixture_bytes):
+    ping = parsers.parse_ping(fixture_bytes('ping_busybox.txt'))
+
+    assert (ping['transmitted'], ping['received'], ping['packet_loss']) == (4, 4, 0.0)
+    assert ping['rtts'] == [2.931, 1.874, 3.406, 2.112]
+    assert (ping['min'], ping['avg'], ping['max']) == (1.874, 2.580, 3.406)
+    # busybox prints no mdev; it is worked out from the replies
+    assert ping['mdev'] == pytest.approx(0.6170, abs=1e-4)
+
+
+def test_parse_ping_total_loss(fixture_bytes):
+    ping = parsers.parse_ping(fixture_bytes('ping_total_loss.txt'))
+
+    assert (ping['transmitted'], ping['received'], ping['packet_loss']) == (5, 0, 100.0)
+    assert ping['rtts'] == []
+    assert ping['min'] is ping['avg'] is ping['max'] is ping['mdev'] is None
+
+
+def test_parse_ping_without_summary():
+    # Killed before the statistics were printed: loss and RTTs come from the replies alone
+    ping = parsers.parse_ping(b'64 bytes from 1.1.1.1: icmp_seq=1 ttl=58 time=9.5 ms\n'
+                              b'64 bytes from 1.1.1.1: icmp_seq=2 ttl=58 time=10.5 ms\n')
+    assert (ping['transmitted'], ping['received'], ping['packet_loss']) == (0, 2, None)
+    assert (ping['min'], ping['avg'], ping['max'], ping['mdev']) == (9.5, 10.0, 10.5, 0.5)
+
+
+def test_split_nmcli_fields():
+    assert parsers.split_nmcli_fields(rb'yes:Cafe\:Guest:A4\:2B\:B0\:11\:22\:33:36') == [
+        'yes', 'Cafe:Guest', 'A4:2B:B0:11:22:33', '36']
+    assert parsers.split_nmcli_fields(rb'no:Back\\slash::') == ['no', 'Back\\slash', '', '']
+    assert parsers.split_nmcli_fields(b'') == ['']
+
+
+def test_parse_nmcli_active(fixture_bytes):
+    active = parsers.parse_nmcli_active(fixture_bytes('nmcli_wifi_list.txt'), NMCLI_FIELDS)
+
+    assert active == {'ACTIVE': 'yes', 'SSID': 'Cafe:Guest', 'BSSID': 'A4:2B:B0:11:22:33', 'CHAN': '36',
+                      'FREQ': '5180 MHz', 'RATE': '540 Mbit/s', 'SIGNAL': '78', 'MODE': 'Infra'}
+    assert parsers.parse_number(active['FREQ']) == 5180.0
+    assert parsers.parse_number(active['RATE']) == 540.0
+    assert parsers.parse_number('--') is None
+    assert parsers.parse_nmcli_active(b'no:Other:00\\:11:1:2412 MHz:54 Mbit/s:20:Infra\n', NMCLI_FIELDS) is None
+    assert parsers.parse_nmcli_active(b'yes:Short\n', NMCLI_FIELDS) is None
+
+
+def test_parse_proc_net_wireless(fixture_bytes):
+    data = fixture_bytes('proc_net_wireless.txt')
+
+    assert parsers.parse_proc_net_wireless(data, 'wlan0') == {
+        'link_quality': 54, 'signal_level': -56, 'noise_level': -256}
+    assert parsers.parse_proc_net_wireless(data, 'wlan1') == {
+        'link_quality': 0, 'signal_level': 0, 'noise_level': 0}
+    assert parsers.parse_proc_net_wireless(data, 'wlan2') == {}
+
+
+def test_parse_proc_net_route(fixture_bytes):
+    data = fixture_bytes('proc_net_route.txt')
+
+    assert parsers.parse_proc_net_route(data, 'wlan0') == '192.168.1.1'
+    assert parsers.parse_proc_net_route(data, 'eth0') == '192.168.0.1'
+    # No default route on the interface: the first default route wins
+    assert parsers.parse_proc_net_route(data, 'wlan1') == '192.168.0.1'
+    assert parsers.parse_proc_net_route(data) == '192.168.0.1'
+
+
+def test_parse_iwlist_scan_speed(benchmark, large_iwlist):
+    networks = benchmark(parsers.parse_iwlist_scan, large_iwlist)
+    assert len(networks) == 2000
+    assert len({network['bssid'] for network in networks}) == 2000
+
+
+def test_parse_iw_survey_speed(benchmark, large_survey):
+    assert len(benchmark(parsers.parse_iw_survey, large_survey)) == 2600
+
+
+def test_parse_arp_scan_speed(benchmark, large_arp_scan):
+    devices = benchmark(parsers.parse_arp_scan, large_arp_scan)
+    assert len(devices) == 3200
+    assert devices[-1][0] == '10.0.12.127'
+
+
+def test_parse_ping_speed(benchmark, fixture_bytes):
+    # A 1000 packet run, as a flood or long-running ping would print
+    lines = fixture_bytes('ping_iputils.txt').split(b'\n')
+    output = b'\n'.join(lines[:1] + lines[1:10] * 111 + lines[1:2] + lines[10:])
+    ping = benchmark(parsers.parse_ping, output)
+    assert len(ping['rtts']) == 1000
+    assert ping['mdev'] == 2.329
+
+
+def test_parse_nmcli_active_speed(benchmark, fixture_bytes):
+    # A crowded listing with the active row last
+    rows = fixture_bytes('nmcli_wifi_list.txt').splitlines()
+    output = b'\n'.join([row for row in rows if not row.startswith(b'yes:')] * 500 + rows[3:4])
+    assert benchmark(parsers.parse_nmcli_active, output, NMCLI_FIELDS)['SSID'] == 'Cafe:Guest'
+
+
+def test_split_nmcli_fields_speed(benchmark, fixture_bytes):
+    rows = fixture_bytes('nmcli_wifi_list.txt').splitlines() * 400
+
+    def split_all():
+        return [parsers.split_nmcli_fields(row) for row in rows]
+
+    fields = benchmark(split_all)
+    assert len(fields) == 2000 and all(len(row) == len(NMCLI_FIELDS) for row in fields)
+
+
+def test_parse_proc_speed(benchmark, fixture_bytes):
+    wireless = fixture_bytes('proc_net_wireless.txt')
+    route = fixture_bytes('proc_net_route.txt')
+
+    def read_link():
+        return parsers.parse_proc_net_wireless(wireless, 'wlan0'), parsers.parse_proc_net_route(route, 'wlan0')
+
+    assert benchmark(read_link)[1] == '192.168.1.1'
@@ -0,0 +1,177 @@
+"""
+Upload queue tests for Pi Wireless Monitor
+Drives src/upload_queue.py against a temporary SQLite file and a scripted deliver()
+"""
+import os
+import json
+import zlib
+import asyncio
+
+import pytest
+
+from src.upload_queue import EVICT_TO, UploadQueue
+
+
+class FakeServer:
+    """deliver() stand-in: True accepted, False rejected (4xx), None unreachable or 5xx"""
+
+    def __init__(self):
+        self.received = []
+        self.responses = {}
+        self.available = True
+
+    def deliver(self, endpoint, data):
+        if not self.available:
+            return None
+        outcome = self.responses.get(data.get('seq'), True)
+        if outcome:
+            self.received.append((endpoint, data['seq']))
+        return outcome
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+@pytest.fixture
+def open_queue(tmp_path, server):
+    """Open queues on one database file; reopening the same path simulates an agent restart"""
+    loop = asyncio.new_event_loop()
+    queues = []
+
+    def open_queue(**kwargs):
+        queue = UploadQueue(server.deliver, path=str(tmp_path / 'outbox.db'), loop=loop, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield open_queue
+    for queue in queues:
+        queue.db.close()
+    loop.close()
+
+
+def record_size(data):
+    """Bytes a record takes in the queue (its compressed payload)"""
+    return len(zlib.compress(json.dumps(data, separators=(',', ':'), default=str).encode()))
+
+
+def drain_all(queue):
+    return all([queue.drain_endpoint(endpoint) for endpoint in queue.endpoints()])
+
+
+def test_drain_keeps_order_per_endpoint(open_queue, server):
+    queue = open_queue()
+    for seq, endpoint in enumerate(['networks', 'devices', 'networks', 'metrics', 'devices', 'networks']):
+        queue.put(endpoint, {'seq': seq})
+
+    assert sorted(queue.endpoints()) == ['devices', 'metrics', 'networks']
+    assert drain_all(queue)
+
+    by_endpoint = {}
+    for endpoint, seq in server.received:
+        by_endpoint.setdefault(endpoint, []).append(seq)
+    assert by_endpoint == {'networks': [0, 2, 5], 'devices': [1, 4], 'metrics': [3]}
+    stats = queue.stats()
+    assert (stats['queued'], stats['delivered'], stats['pending'], stats['bytes']) == (6, 6, 0, 0)
+    assert queue.endpoints() == []
+
+
+def test_reopen_recovers_backlog(open_queue, server):
+    queue = open_queue()
+    for seq in range(5):
+        queue.put('networks', {'seq': seq, 'bssid': f'aa:bb:cc:dd:ee:{seq:02x}'})
+    pending, size = queue.count, queue.bytes
+    # Crash: the connection goes away without a drain or a clean shutdown
+    queue.db.close()
+
+    reopened = open_queue()
+    assert (reopened.count, reopened.bytes) == (pending, size)
+    reopened.put('networks', {'seq': 5})
+    assert reopened.drain_endpoint('networks')
+    assert [seq for _, seq in server.received] == [0, 1, 2, 3, 4, 5]
+    assert (reopened.count, reopened.bytes) == (0, 0)
+
+
+def test_corrupt_record_is_dropped(open_queue, server):
+    queue = open_queue()
+    for seq in range(3):
+        queue.put('devices', {'seq': seq})
+    queue.db.execute('UPDATE outbox SET crc = crc + 1 WHERE id = (SELECT MIN(id) + 1 FROM outbox)')
+
+    assert queue.drain_endpoint('devices')
+    assert [seq for _, seq in server.received] == [0, 2]
+    assert queue.counters['corrupt'] == 1
+    assert queue.counters['delivered'] == 2
+    assert (queue.count, queue.bytes) == (0, 0)
+
+
+def test_unavailable_server_keeps_records(open_queue, server):
+    queue = open_queue()
+    for seq in range(4):
+        queue.put('metrics', {'seq': seq})
+    size = queue.bytes
+
+    server.available = False
+    assert not queue.drain_endpoint('metrics')
+    assert (queue.count, queue.bytes) == (4, size)
+    assert server.received == []
+
+    # A retryable answer part way through keeps that record and everything after it
+    server.available = True
+    server.responses[2] = None
+    assert not queue.drain_endpoint('metrics')
+    assert [seq for _, seq in server.received] == [0, 1]
+    assert queue.count == 2
+
+    del server.responses[2]
+    assert queue.drain_endpoint('metrics')
+    assert [seq for _, seq in server.received] == [0, 1, 2, 3]
+    assert queue.counters['delivered'] == 4
+
+
+def test_rejected_record_is_dropped(open_queue, server):
+    queue = open_queue()
+    for seq in range(3):
+        queue.put('networks', {'seq': seq})
+    server.responses[1] = False
+
+    assert queue.drain_endpoint('networks')
+    assert [seq for _, seq in server.received] == [0, 2]
+    assert queue.counters['rejected'] == 1
+    assert queue.count == 0
+
+
+def test_expire_drops_old_records(open_queue, server):
+    queue = open_queue(max_age_days=1)
+    for seq in range(3):
+        queue.put('networks', {'seq': seq})
+    queue.db.execute('UPDATE outbox SET created = created - 2 * 86400 WHERE id < (SELECT MAX(id) FROM outbox)')
+
+    queue.expire()
+    assert queue.counters['expired'] == 2
+    assert queue.count == 1
+    assert queue.drain_endpoint('networks')
+    assert [seq for _, seq in server.received] == [2]
+
+
+def test_size_limit_evicts_oldest_down_to_evict_to(open_queue, server):
+    queue = open_queue(max_mb=0.01)
+    target = int(queue.max_bytes * EVICT_TO)
+    records = []
+    while not queue.counters['evicted']:
+        data = {'seq': len(records), 'blob': os.urandom(600).hex()}
+        records.append(data)
+        queue.put('networks', data)
+
+    evicted = queue.counters['evicted']
+    kept = records[evicted:]
+    assert queue.count == len(kept)
+    assert queue.bytes == sum(record_size(data) for data in kept)
+    assert queue.bytes == queue.db.execute('SELECT SUM(LENGTH(payload)) FROM outbox').fetchone()[0]
+    # Trimmed under the target, but by no more than the last record it dropped
+    assert queue.bytes <= target
+    assert queue.bytes + record_size(records[evicted - 1]) > target
+
+    assert queue.drain_endpoint('networks')
+    assert [seq for _, seq in server.received] == [data['seq'] for data in kept]
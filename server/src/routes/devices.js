@@ -22,7 +22,10 @@ const validate = (req, res, next) => {
 
 // Submit device scan data
 router.post('/', authenticateMonitor, [
-  body('devices').isArray().notEmpty(),
+  body('devices').isArray(),
+  body('roster').optional().isBoolean(),
+  body('events').optional().isArray(),
+  body('events.*.type').optional().isIn(['join', 'leave']),
   body('devices.*.macAddress').optional({ checkFalsy: false }).isString()
     .custom((value) => {
       if (!value || value === '') return true; // Allow empty
@@ -40,11 +43,32 @@ router.post('/', authenticateMonitor, [
 ], validate, async (req, res) => {
   try {
     const { devices, timestamp } = req.body;
+    const events = req.body.events || [];
     const processedDevices = [];
 
     // Update monitor's last scan time
     await req.monitor.updateLastScan();
 
+    // Join/leave events come first: a device that left and came back within one
+    // upload is in the rows below and ends up online
+    const left = new Set();
+    for (const event of events) {
+      try {
+        if (event.type === 'leave') {
+          left.add(event.macAddress);
+          const device = await Device.findOne({ monitorId: req.monitorId, macAddress: event.macAddress });
+          if (device && device.isOnline) {
+            await device.markOffline();
+          }
+        } else {
+          left.delete(event.macAddress);
+        }
+        await redis.publish('device:event', { monitorId: req.monitorId, ...event });
+      } catch (error) {
+        logger.error(`Error processing ${event.type} event for ${event.macAddress}:`, error);
+      }
+    }
+
     // Process each device
     for (const deviceData of devices) {
       try {
@@ -70,10 +94,20 @@ router.post('/', authenticateMonitor, [
     // Mark inactive devices as offline
     await Device.markInactiveDevicesOffline(req.monitorId, 5);
 
-    // Cache latest scan results
+    // Cache latest scan results. A roster carries every online device; a delta
+    // (roster: false) only the joined and changed ones, so it is merged into the cached list
+    const cacheKey = `monitor:${req.monitorId}:devices:latest`;
+    let latest = processedDevices.map(d => d.toJSON());
+    if (req.body.roster === false) {
+      const cached = (await redis.getJson(cacheKey)) || [];
+      const updated = new Set(latest.map(d => d.macAddress));
+      latest = cached
+        .filter(d => !left.has(d.macAddress) && !updated.has(d.macAddress))
+        .concat(latest);
+    }
     await redis.setEx(
-      `monitor:${req.monitorId}:devices:latest`,
-      processedDevices.map(d => d.toJSON()),
+      cacheKey,
+      latest,
       300 // 5 minutes TTL
     );
 
@@ -81,10 +115,10 @@ router.post('/', authenticateMonitor, [
     await redis.publish('device:scan', {
       monitorId: req.monitorId,
       timestamp,
-      deviceCount: processedDevices.length,
+      deviceCount: latest.length,
     });
 
-    logger.info(`Processed ${processedDevices.length} devices from monitor ${req.monitorId}`);
+    logger.info(`Processed ${processedDevices.length} devices and ${events.length} events from monitor ${req.monitorId}`);
 
     res.status(201).json({
       success: true,
@@ -72,10 +72,21 @@ router.post('/', authenticateMonitor, [
       }
     }
 
-    // Cache latest scan results
+    // Cache latest scan results. A keyframe carries every network in range; a delta
+    // (keyframe: false) only the changed ones, so it is merged into the cached list
+    const cacheKey = `monitor:${req.monitorId}:networks:latest`;
+    let latest = processedNetworks.map(n => n.toJSON());
+    if (req.body.keyframe === false) {
+      const cached = (await redis.getJson(cacheKey)) || [];
+      const removed = new Set(req.body.removed || []);
+      const updated = new Set(latest.map(n => n.bssid));
+      latest = cached
+        .filter(n => !removed.has(n.bssid) && !updated.has(n.bssid))
+        .concat(latest);
+    }
     await redis.setEx(
-      `monitor:${req.monitorId}:networks:latest`,
-      processedNetworks.map(n => n.toJSON()),
+      cacheKey,
+      latest,
       300 // 5 minutes TTL
     );
 